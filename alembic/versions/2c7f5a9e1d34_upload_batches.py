@@ -0,0 +1,46 @@
+"""upload batches
+
+Revision ID: 2c7f5a9e1d34
+Revises: 0b8d2e4f6a13
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7f5a9e1d34'
+down_revision: Union[str, Sequence[str], None] = '0b8d2e4f6a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "upload_batches",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("rejected", sa.JSON(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_upload_batches_user_id"), "upload_batches", ["user_id"], unique=False)
+    op.add_column("documents", sa.Column("batch_id", postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        "fk_documents_batch_id_upload_batches", "documents", "upload_batches", ["batch_id"], ["id"], ondelete="SET NULL"
+    )
+    op.create_index(op.f("ix_documents_batch_id"), "documents", ["batch_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_documents_batch_id"), table_name="documents")
+    op.drop_constraint("fk_documents_batch_id_upload_batches", "documents", type_="foreignkey")
+    op.drop_column("documents", "batch_id")
+    op.drop_index(op.f("ix_upload_batches_user_id"), table_name="upload_batches")
+    op.drop_table("upload_batches")
@@ -0,0 +1,30 @@
+"""document content hash and size
+
+Revision ID: 5d2f8a1c6e93
+Revises: 3a9c2e7b1d40
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8a1c6e93'
+down_revision: Union[str, Sequence[str], None] = '3a9c2e7b1d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("documents", sa.Column("content_sha256", sa.String(length=64), nullable=True))
+    op.add_column("documents", sa.Column("size_bytes", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("documents", "size_bytes")
+    op.drop_column("documents", "content_sha256")
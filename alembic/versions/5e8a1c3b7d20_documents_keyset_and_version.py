@@ -0,0 +1,32 @@
+"""documents keyset index and per-tenant documents version
+
+Revision ID: 5e8a1c3b7d20
+Revises: 2c7f5a9e1d34
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1c3b7d20'
+down_revision: Union[str, Sequence[str], None] = '2c7f5a9e1d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("documents_version", sa.Integer(), nullable=False, server_default="0"))
+    op.create_index(
+        "ix_documents_user_uploaded_at_id", "documents", ["user_id", "uploaded_at", "id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_documents_user_uploaded_at_id", table_name="documents")
+    op.drop_column("users", "documents_version")
@@ -0,0 +1,30 @@
+"""chunk page numbers
+
+Revision ID: 8b41d0e7c2a5
+Revises: 5d2f8a1c6e93
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41d0e7c2a5'
+down_revision: Union[str, Sequence[str], None] = '5d2f8a1c6e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chunks", sa.Column("page_start", sa.Integer(), nullable=True))
+    op.add_column("chunks", sa.Column("page_end", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chunks", "page_end")
+    op.drop_column("chunks", "page_start")
@@ -0,0 +1,30 @@
+"""chunk token counts
+
+Revision ID: 9b4d2e6f1a83
+Revises: 5e8a1c3b7d20
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4d2e6f1a83'
+down_revision: Union[str, Sequence[str], None] = '5e8a1c3b7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chunks", sa.Column("token_count", sa.Integer(), nullable=True))
+    # Same estimate as app.rag.embedding.estimate_tokens: ~4 characters per token, at least 1.
+    op.execute("UPDATE chunks SET token_count = CASE WHEN length(text) < 8 THEN 1 ELSE length(text) / 4 END")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chunks", "token_count")
@@ -0,0 +1,46 @@
+"""at most one pending index job per document
+
+Revision ID: a4c7e2d9b815
+Revises: 9b4d2e6f1a83
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e2d9b815'
+down_revision: Union[str, Sequence[str], None] = '9b4d2e6f1a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the oldest pending job per document; the others would rebuild the same document.
+    op.execute(
+        """
+        UPDATE index_jobs SET status = 'superseded', finished_at = now()
+        WHERE status = 'pending' AND EXISTS (
+            SELECT 1 FROM index_jobs older
+            WHERE older.document_id = index_jobs.document_id
+              AND older.status = 'pending'
+              AND (older.created_at, older.id) < (index_jobs.created_at, index_jobs.id)
+        )
+        """
+    )
+    op.create_index(
+        "uq_index_jobs_pending_document",
+        "index_jobs",
+        ["document_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_index_jobs_pending_document", table_name="index_jobs")
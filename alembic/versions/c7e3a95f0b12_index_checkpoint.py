@@ -0,0 +1,30 @@
+"""document indexing checkpoint
+
+Revision ID: c7e3a95f0b12
+Revises: 8b41d0e7c2a5
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e3a95f0b12'
+down_revision: Union[str, Sequence[str], None] = '8b41d0e7c2a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("documents", sa.Column("index_checkpoint", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("documents", sa.Column("index_params", sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("documents", "index_params")
+    op.drop_column("documents", "index_checkpoint")
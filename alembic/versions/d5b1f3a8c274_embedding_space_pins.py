@@ -0,0 +1,37 @@
+"""pin each embedding space to the model that produced its vectors
+
+Revision ID: d5b1f3a8c274
+Revises: a4c7e2d9b815
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b1f3a8c274'
+down_revision: Union[str, Sequence[str], None] = 'a4c7e2d9b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are written on the first app/worker start (app.services.embedding_backfill.pin_embedding_spaces),
+    # which pins existing vectors to the configuration they were written with.
+    op.create_table(
+        "embedding_space_pins",
+        sa.Column("space", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=255), nullable=False),
+        sa.Column("dims", sa.Integer(), nullable=True),
+        sa.Column("pinned_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("space"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("embedding_space_pins")
@@ -0,0 +1,50 @@
+"""versioned chunk sets per document
+
+Revision ID: e1f94b2d7a60
+Revises: c7e3a95f0b12
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f94b2d7a60'
+down_revision: Union[str, Sequence[str], None] = 'c7e3a95f0b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chunks", sa.Column("index_version", sa.Integer(), nullable=False, server_default="1"))
+    op.drop_constraint("uq_chunks_document_chunk_index", "chunks", type_="unique")
+    op.create_unique_constraint(
+        "uq_chunks_document_version_chunk_index", "chunks", ["document_id", "index_version", "chunk_index"]
+    )
+    op.add_column("documents", sa.Column("active_version", sa.Integer(), nullable=True))
+    op.add_column("documents", sa.Column("building_version", sa.Integer(), nullable=True))
+    # Existing chunk sets become version 1: served if complete, resumable if checkpointed.
+    op.execute("UPDATE documents SET active_version = 1 WHERE status = 'indexed'")
+    op.execute("UPDATE documents SET building_version = 1 WHERE index_checkpoint > 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "DELETE FROM chunk_embeddings WHERE chunk_id IN ("
+        "SELECT c.id FROM chunks c JOIN documents d ON d.id = c.document_id "
+        "WHERE d.active_version IS NULL OR c.index_version <> d.active_version)"
+    )
+    op.execute(
+        "DELETE FROM chunks c USING documents d "
+        "WHERE d.id = c.document_id AND (d.active_version IS NULL OR c.index_version <> d.active_version)"
+    )
+    op.drop_column("documents", "building_version")
+    op.drop_column("documents", "active_version")
+    op.drop_constraint("uq_chunks_document_version_chunk_index", "chunks", type_="unique")
+    op.create_unique_constraint("uq_chunks_document_chunk_index", "chunks", ["document_id", "chunk_index"])
+    op.drop_column("chunks", "index_version")
@@ -0,0 +1,63 @@
+"""named embedding spaces and backfills
+
+Revision ID: f3a6c81d9e27
+Revises: e1f94b2d7a60
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6c81d9e27'
+down_revision: Union[str, Sequence[str], None] = 'e1f94b2d7a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing vectors become the "default" space; the column drops its fixed dimension
+    # so spaces with other models/dimensions can live alongside it.
+    op.add_column(
+        "chunk_embeddings", sa.Column("space", sa.String(length=64), nullable=False, server_default="default")
+    )
+    op.drop_constraint("chunk_embeddings_pkey", "chunk_embeddings", type_="primary")
+    op.create_primary_key("chunk_embeddings_pkey", "chunk_embeddings", ["chunk_id", "space"])
+    op.alter_column("chunk_embeddings", "embedding", type_=Vector(), existing_nullable=False)
+
+    op.add_column("users", sa.Column("embedding_space", sa.String(length=64), nullable=True))
+    op.create_table(
+        "embedding_backfills",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("space", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("embedded_chunks", sa.Integer(), nullable=False),
+        sa.Column("tokens_estimate", sa.Integer(), nullable=False),
+        sa.Column("locked_by", sa.String(length=255), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_embedding_backfills_user_id"), "embedding_backfills", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_embedding_backfills_user_id"), table_name="embedding_backfills")
+    op.drop_table("embedding_backfills")
+    op.drop_column("users", "embedding_space")
+
+    op.execute("DELETE FROM chunk_embeddings WHERE space <> 'default'")
+    op.alter_column("chunk_embeddings", "embedding", type_=Vector(1536), existing_nullable=False)
+    op.drop_constraint("chunk_embeddings_pkey", "chunk_embeddings", type_="primary")
+    op.create_primary_key("chunk_embeddings_pkey", "chunk_embeddings", ["chunk_id"])
+    op.drop_column("chunk_embeddings", "space")
@@ -1,39 +1,140 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+import structlog
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.models.schemas import ChatRequest, ChatResponse
+from app.config import get_settings
+from app.models.schemas import BatchChatRequest, ChatRequest, ChatResponse
 from app.db.models import User
 from app.db.session import get_db
-from app.rag.prompting import generate_answer
+from app.observability.metrics import get_metrics
+from app.observability.openai import OpenAICallTimeout, observed_mean_tokens
+from app.rag.batch_chat import answer_batch, retrieve_batch
+from app.rag.cancellation import CancelScope, RequestCancelled, bind_cancel_scope
+from app.rag.deadline import Deadline, resolve_deadline
+from app.rag.prompting import NO_CONTEXT_ANSWER, generate_answer
 from app.rag.retrieval import retrieve_with_debug
 from app.services.auth_dependencies import get_current_user
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
+# How often the route checks whether the client is still connected.
+_DISCONNECT_POLL_S = 0.25
+# Non-standard "client closed request" status (nginx convention); nobody reads the body anyway.
+_CLIENT_CLOSED_REQUEST = 499
+
+
+def _answer(db: Session, user: User, query: str, deadline: Deadline | None, debug_requested: bool) -> ChatResponse:
+    try:
+        result = retrieve_with_debug(db=db, user=user, user_query=query, deadline=deadline)
+    except OpenAICallTimeout as exc:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded during retrieval") from exc
+    chunks = result.final_chunks
+
+    if not chunks:
+        return ChatResponse(answer=NO_CONTEXT_ANSWER, citations=[])
+
+    try:
+        response = generate_answer(query=query, chunks=chunks, deadline=deadline)
+    except OpenAICallTimeout as exc:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded during answer generation") from exc
+    if debug_requested:
+        response.debug = result.debug
+    return response
+
+
+async def _cancel_on_disconnect(request: Request, scope: CancelScope) -> None:
+    while not scope.cancelled:
+        if await request.is_disconnected():
+            # Cancel callbacks block (psycopg's cancel_safe round-trips to the server); keep them off the loop.
+            await run_in_threadpool(scope.cancel, "client_disconnected")
+            return
+        await asyncio.sleep(_DISCONNECT_POLL_S)
+
+
+def _estimate_tokens_saved(scope: CancelScope) -> int:
+    """Average token cost of the pipeline calls that had not completed when the request was cancelled."""
+
+    settings = get_settings()
+    planned = ["query_embedding", "answer"]
+    if settings.enable_query_rewrite:
+        planned.append("rewrite")
+    if settings.enable_rerank:
+        planned.append("rerank")
+    for name in scope.completed_calls:
+        if name in planned:
+            planned.remove(name)
+    return int(sum(observed_mean_tokens(name) or 0.0 for name in planned))
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_documents(
     payload: ChatRequest,
+    request: Request,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    deadline_header: str | None = Header(default=None, alias="X-Request-Deadline-Ms"),
 ) -> ChatResponse:
     query = payload.query.strip()
     if not query:
         raise HTTPException(status_code=400, detail="Query must not be empty")
 
-    debug_requested = bool(payload.debug)
-    result = retrieve_with_debug(db=db, user=user, user_query=query)
-    chunks = result.final_chunks
+    try:
+        deadline = resolve_deadline(payload.deadline_ms, deadline_header)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    if not chunks:
-        return ChatResponse(
-            answer="I could not find relevant context in uploaded documents. Could you clarify your question?",
-            citations=[],
-        )
+    # The pipeline is blocking, so it runs in a worker thread (which inherits the bound cancel
+    # scope via contextvars) while this coroutine watches for the client going away.
+    scope = CancelScope()
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, scope))
+    try:
+        with bind_cancel_scope(scope):
+            return await run_in_threadpool(_answer, db, user, query, deadline, bool(payload.debug))
+    except RequestCancelled as exc:
+        tokens_saved = _estimate_tokens_saved(scope)
+        get_metrics().observe_request_cancelled(tokens_saved_estimate=tokens_saved)
+        structlog.get_logger("chat").info("chat_cancelled", reason=scope.reason, tokens_saved_estimate=tokens_saved)
+        raise HTTPException(status_code=_CLIENT_CLOSED_REQUEST, detail="Client closed request") from exc
+    except asyncio.CancelledError:
+        # The server cancelled this handler (e.g. shutdown); stop the worker thread as well.
+        # Fire and forget: this task is being torn down and must not await anything.
+        asyncio.get_running_loop().run_in_executor(None, scope.cancel, "handler_cancelled")
+        raise
+    finally:
+        watcher.cancel()
 
-    response = generate_answer(query=query, chunks=chunks)
-    if debug_requested:
-        response.debug = result.debug
-    return response
+
+@router.post("/chat/batch")
+async def chat_batch(
+    payload: BatchChatRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Answer many questions; streams one BatchChatResult JSON line per question (NDJSON).
+
+    Retrieval for the whole batch (one embeddings call, one vector search) finishes before
+    the response starts, so it can still fail with a status code; after that, a question
+    whose answer fails gets a line with `error` set instead.
+    """
+
+    settings = get_settings()
+    if len(payload.queries) > settings.batch_chat_max_queries:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_chat_max_queries} queries per batch")
+    queries = [q.strip() for q in payload.queries]
+    empty = [i for i, q in enumerate(queries) if not q]
+    if empty:
+        raise HTTPException(status_code=400, detail=f"Queries must not be empty (index {empty[0]})")
+
+    try:
+        batch = await run_in_threadpool(retrieve_batch, db, user, queries)
+    except OpenAICallTimeout as exc:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded during retrieval") from exc
+
+    lines = (result.model_dump_json(exclude_none=True) + "\n" for result in answer_batch(batch, payload.ordered, payload.debug))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
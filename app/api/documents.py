@@ -1,29 +1,114 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+import asyncio
+import json
+import uuid
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.models.schemas import DocumentMetadata, DocumentsResponse
 from app.db.models import User
 from app.db.session import get_db
 from app.services.auth_dependencies import get_current_user
+from app.config import get_settings
 from app.services.document_service import (
     delete_document_everywhere,
+    documents_etag,
     get_document,
-    index_document_task,
     list_documents,
+    list_documents_page,
     mark_queued,
 )
+from app.services.job_queue import enqueue_index_job, run_index_job_task
+from app.services.status_feed import broadcaster
 
 router = APIRouter(prefix="/api", tags=["documents"])
 
 
+_MAX_PAGE_SIZE = 1000
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+
 @router.get("/documents", response_model=DocumentsResponse)
-async def get_documents(
+def get_documents(
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=_MAX_PAGE_SIZE),
+    fields: str | None = Query(default=None, description="Comma-separated document fields to return"),
+    if_none_match: str | None = Header(default=None),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
-) -> DocumentsResponse:
-    return DocumentsResponse(documents=list_documents(db=db, user=user))
+) -> Response:
+    """A page of documents, newest first; `next_cursor` continues the listing.
+
+    The ETag follows the tenant's documents_version, so a matching If-None-Match is
+    answered with 304 from the already-loaded user row, without reading documents.
+    """
+
+    limit = limit or get_settings().documents_page_size
+    projection = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    etag = documents_etag(user, cursor, limit, projection)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        documents, next_cursor = list_documents_page(db=db, user=user, limit=limit, cursor=cursor, fields=projection)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return JSONResponse({"documents": documents, "next_cursor": next_cursor}, headers=headers)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/documents/events")
+async def document_events(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """Server-Sent Events: a `snapshot` of all documents, then `document`/`deleted` changes.
+
+    Subscribing happens before the snapshot is read, so no change falls between them. A
+    browser EventSource reconnects on its own and gets a fresh snapshot.
+    """
+
+    queue = broadcaster.subscribe(user.id)
+    try:
+        snapshot = [doc.model_dump(mode="json") for doc in list_documents(db=db, user=user)]
+    except BaseException:
+        broadcaster.unsubscribe(user.id, queue)
+        raise
+    # The stream outlives the request's use of the session; release its connection now.
+    db.close()
+    keepalive_s = get_settings().status_feed_keepalive_s
+
+    async def _stream() -> AsyncIterator[str]:
+        try:
+            yield _sse("snapshot", {"documents": snapshot})
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=keepalive_s)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(payload["type"], payload)
+        finally:
+            broadcaster.unsubscribe(user.id, queue)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/documents/{doc_id}", response_model=DocumentMetadata)
@@ -63,5 +148,7 @@ async def reindex_document(
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
 
-    background_tasks.add_task(index_document_task, str(user.id), doc_id)
+    job = enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(doc.id))
+    if get_settings().index_in_process:
+        background_tasks.add_task(run_index_job_task, str(job.id))
     return doc
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.models import User
+from app.db.session import get_db
+from app.models.schemas import EmbeddingSpacesResponse
+from app.services.auth_dependencies import get_current_user
+from app.services.embedding_backfill import describe_spaces, run_backfill_task, start_backfill
+
+router = APIRouter(prefix="/api", tags=["embedding-spaces"])
+
+
+@router.get("/embedding-spaces", response_model=EmbeddingSpacesResponse)
+async def get_embedding_spaces(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> EmbeddingSpacesResponse:
+    return describe_spaces(db=db, user=user)
+
+
+@router.post("/embedding-spaces/{space}/backfill", response_model=EmbeddingSpacesResponse)
+async def backfill_embedding_space(
+    space: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> EmbeddingSpacesResponse:
+    try:
+        backfill = start_backfill(db=db, user=user, space_name=space)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    if get_settings().index_in_process:
+        background_tasks.add_task(run_backfill_task, str(backfill.id))
+    return describe_spaces(db=db, user=user)
@@ -1,16 +1,48 @@
 from __future__ import annotations
 
+import uuid
+import zipfile
+import zlib
+
+from collections.abc import AsyncIterator
+from pathlib import PurePosixPath
+from typing import IO
+
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app.models.schemas import UploadResponse
+from app.models.schemas import DocumentMetadata, RejectedFile, UploadBatchStatus, UploadResponse
 from app.db.models import User
 from app.db.session import get_db
 from app.services.auth_dependencies import get_current_user
-from app.services.document_service import create_document_record, index_document_task
+from app.config import get_settings
+from app.services.document_service import create_document_from_stream
+from app.services.job_queue import enqueue_index_job, run_index_job_task
+from app.services.upload_batches import create_upload_batch, describe_batch, enqueue_batch, get_upload_batch, record_rejected
 
 router = APIRouter(prefix="/api", tags=["upload"])
 
+_READ_CHUNK_BYTES = 1024 * 1024
+# Raised while streaming a corrupt member: bad CRC, bad deflate data, truncated data.
+_MEMBER_READ_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)
+
+
+async def _iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while data := await file.read(_READ_CHUNK_BYTES):
+        yield data
+
+
+async def _iter_member(member: IO[bytes]) -> AsyncIterator[bytes]:
+    # Zip members decompress synchronously; keep that off the event loop.
+    while data := await run_in_threadpool(member.read, _READ_CHUNK_BYTES):
+        yield data
+
+
+def _is_archive_noise(name: str) -> bool:
+    parts = PurePosixPath(name).parts
+    return not parts or parts[0] == "__MACOSX" or any(p.startswith(".") for p in parts)
+
 
 @router.post("/upload", response_model=UploadResponse)
 async def upload_document(
@@ -22,11 +54,85 @@ async def upload_document(
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is required")
 
-    content = await file.read()
     try:
-        metadata = create_document_record(db=db, user=user, filename=file.filename, content=content)
+        metadata = await create_document_from_stream(db=db, user=user, filename=file.filename, chunks=_iter_upload(file))
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    background_tasks.add_task(index_document_task, str(user.id), metadata.id)
+    job = enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(metadata.id))
+    if get_settings().index_in_process:
+        background_tasks.add_task(run_index_job_task, str(job.id))
     return UploadResponse(document=metadata)
+
+
+@router.post("/upload/batch", response_model=UploadBatchStatus)
+async def upload_batch(
+    files: list[UploadFile],
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> UploadBatchStatus:
+    """Store several files (and the members of any .zip among them) as one batch."""
+
+    settings = get_settings()
+    batch = create_upload_batch(db, user)
+    accepted: list[DocumentMetadata] = []
+    rejected: list[RejectedFile] = []
+
+    async def _store(filename: str, chunks: AsyncIterator[bytes]) -> None:
+        if len(accepted) >= settings.batch_upload_max_files:
+            rejected.append(
+                RejectedFile(filename=filename, error=f"Batch exceeds {settings.batch_upload_max_files} files")
+            )
+            return
+        try:
+            accepted.append(
+                await create_document_from_stream(db=db, user=user, filename=filename, chunks=chunks, batch_id=batch.id)
+            )
+        except (ValueError, *_MEMBER_READ_ERRORS) as exc:
+            rejected.append(RejectedFile(filename=filename, error=str(exc) or type(exc).__name__))
+
+    for file in files:
+        name = file.filename or ""
+        if not name.lower().endswith(".zip"):
+            await _store(name, _iter_upload(file))
+            continue
+        try:
+            archive = await run_in_threadpool(zipfile.ZipFile, file.file)
+        except zipfile.BadZipFile as exc:
+            rejected.append(RejectedFile(filename=name, error=f"Invalid zip archive: {exc}"))
+            continue
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir() or _is_archive_noise(info.filename):
+                    continue
+                member_name = PurePosixPath(info.filename).name
+                try:
+                    member = await run_in_threadpool(archive.open, info)
+                except (RuntimeError, NotImplementedError, zipfile.BadZipFile) as exc:
+                    # Encrypted members or unsupported compression methods.
+                    rejected.append(RejectedFile(filename=member_name, error=str(exc)))
+                    continue
+                with member:
+                    await _store(member_name, _iter_member(member))
+
+    record_rejected(db, batch, rejected)
+    job_ids = enqueue_batch(db, user, accepted)
+    if settings.index_in_process:
+        # Each task claims up to INDEX_BATCH_MAX_DOCUMENTS sibling jobs along with its own.
+        for job_id in job_ids[:: max(1, settings.index_batch_max_documents)]:
+            background_tasks.add_task(run_index_job_task, str(job_id))
+
+    return describe_batch(db, batch)
+
+
+@router.get("/upload/batches/{batch_id}", response_model=UploadBatchStatus)
+def get_batch_status(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> UploadBatchStatus:
+    status = get_upload_batch(db, user, batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Upload batch not found")
+    return status
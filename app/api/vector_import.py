@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from app.db.models import User
+from app.db.session import get_db
+from app.models.schemas import VectorImportResponse
+from app.services.auth_dependencies import get_current_user
+from app.services.embedding_backfill import active_space
+from app.services.vector_import import expected_dims, import_vectors, iter_binary_records, iter_jsonl_records
+
+router = APIRouter(prefix="/api", tags=["import"])
+
+
+@router.post("/import/vectors", response_model=VectorImportResponse)
+def import_chunk_vectors(
+    chunks: UploadFile,
+    vectors: UploadFile | None = None,
+    dims: int | None = Form(default=None, gt=0),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> VectorImportResponse:
+    """Import precomputed chunks and embeddings (see app.services.vector_import for the formats).
+
+    A plain `def` route: parsing and bulk inserts run in the threadpool, reading the
+    spooled upload files line by line.
+    """
+
+    space = active_space(user)
+    try:
+        if vectors is None:
+            records = iter_jsonl_records(chunks.file)
+        else:
+            records = iter_binary_records(chunks.file, vectors.file, dims or expected_dims(db, space))
+        return import_vectors(db, user, records, space)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
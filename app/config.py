@@ -1,5 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
+from typing import Any, Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,14 +12,90 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
     openai_model: str = Field(default="gpt-4o-mini", alias="OPENAI_MODEL")
     embedding_model: str = Field(default="text-embedding-3-small", alias="EMBEDDING_MODEL")
+    # Named embedding spaces besides "default" (which is EMBEDDING_MODEL), e.g.
+    # {"large-1024": {"model": "text-embedding-3-large", "dims": 1024, "price_per_mtok": 0.13}}.
+    embedding_spaces: dict[str, dict[str, Any]] = Field(default_factory=dict, alias="EMBEDDING_SPACES")
+    # Space used by tenants that have not been switched to another one by a backfill.
+    embedding_space: str = Field(default="default", alias="EMBEDDING_SPACE")
+    embedding_price_per_mtok: float = Field(default=0.02, alias="EMBEDDING_PRICE_PER_MTOK")
+    # Backfill throttle: chunks re-embedded per batch and the pause between batches.
+    embedding_backfill_batch_size: int = Field(default=64, alias="EMBEDDING_BACKFILL_BATCH_SIZE")
+    embedding_backfill_interval_s: float = Field(default=1.0, alias="EMBEDDING_BACKFILL_INTERVAL_S")
     chunk_size: int = Field(default=500, alias="CHUNK_SIZE")
     chunk_overlap: int = Field(default=50, alias="CHUNK_OVERLAP")
     top_k: int = Field(default=5, alias="TOP_K")
     enable_query_rewrite: bool = Field(default=True, alias="ENABLE_QUERY_REWRITE")
     enable_rerank: bool = Field(default=True, alias="ENABLE_RERANK")
     rerank_top_n: int = Field(default=5, alias="RERANK_TOP_N")
+    # Prompt tokens for retrieved context (see app.rag.context_packing); 0 disables the cap.
+    context_token_budget: int = Field(default=2000, alias="CONTEXT_TOKEN_BUDGET")
+    # Confidence gating: skip rewrite/rerank when they are unlikely to change the result.
+    # Off until thresholds are calibrated (python -m app.eval.calibrate_gates).
+    enable_adaptive_gating: bool = Field(default=False, alias="ENABLE_ADAPTIVE_GATING")
+    # Calibrated thresholds (JSON); when the file exists it overrides the three below.
+    gate_thresholds_path: str = Field(default="", alias="GATE_THRESHOLDS_PATH")
+    rewrite_gate_max_terms: int = Field(default=3, alias="REWRITE_GATE_MAX_TERMS")
+    rerank_gate_margin: float = Field(default=0.15, alias="RERANK_GATE_MARGIN")
+    rerank_gate_zscore: float = Field(default=3.0, alias="RERANK_GATE_ZSCORE")
     rewrite_model: str = Field(default="gpt-4o-mini", alias="REWRITE_MODEL")
     rerank_model: str = Field(default="gpt-4o-mini", alias="RERANK_MODEL")
+    # "llm" (listwise chat-model rerank) or "local" (CPU feature scoring, see app.rag.local_rerank).
+    rerank_mode: Literal["llm", "local"] = Field(default="llm", alias="RERANK_MODE")
+    local_rerank_weights_path: str = Field(default="", alias="LOCAL_RERANK_WEIGHTS_PATH")
+    # LLM rerank shards candidate pools larger than this (0 disables sharding).
+    rerank_shard_size: int = Field(default=10, alias="RERANK_SHARD_SIZE")
+    rerank_max_concurrency: int = Field(default=4, alias="RERANK_MAX_CONCURRENCY")
+    # How shard winners are combined: "tournament" (final LLM round) or "interleave" (no extra call).
+    rerank_shard_merge: Literal["tournament", "interleave"] = Field(default="tournament", alias="RERANK_SHARD_MERGE")
+    openai_max_retries: int = Field(default=2, alias="OPENAI_MAX_RETRIES")
+    openai_backoff_base_ms: float = Field(default=250.0, alias="OPENAI_BACKOFF_BASE_MS")
+    openai_backoff_max_ms: float = Field(default=4000.0, alias="OPENAI_BACKOFF_MAX_MS")
+    # Overall per-call deadline (including retries); 0 disables it.
+    openai_call_timeout_s: float = Field(default=30.0, alias="OPENAI_CALL_TIMEOUT_S")
+    enable_hedged_requests: bool = Field(default=False, alias="ENABLE_HEDGED_REQUESTS")
+    hedge_min_delay_ms: float = Field(default=100.0, alias="HEDGE_MIN_DELAY_MS")
+    # Per-operation overrides, e.g. {"rewrite": {"max_retries": 0, "deadline_s": 3}}.
+    openai_call_policies: dict[str, dict[str, Any]] = Field(default_factory=dict, alias="OPENAI_CALL_POLICIES")
+    # Default end-to-end chat budget; 0 disables it (a request body/header can still set one).
+    chat_deadline_ms: int = Field(default=0, alias="CHAT_DEADLINE_MS")
+    # POST /api/chat/batch: questions per request, and rewrite/answer calls in flight at once.
+    batch_chat_max_queries: int = Field(default=500, alias="BATCH_CHAT_MAX_QUERIES")
+    batch_chat_concurrency: int = Field(default=8, alias="BATCH_CHAT_CONCURRENCY")
+    # Estimated stage costs used to decide whether a stage fits the remaining budget,
+    # until enough calls have been observed to use their p95 instead.
+    embedding_budget_ms: float = Field(default=500.0, alias="EMBEDDING_BUDGET_MS")
+    rewrite_budget_ms: float = Field(default=1500.0, alias="REWRITE_BUDGET_MS")
+    rerank_budget_ms: float = Field(default=2500.0, alias="RERANK_BUDGET_MS")
+    answer_budget_ms: float = Field(default=5000.0, alias="ANSWER_BUDGET_MS")
+    # Indexing job queue (see app.worker). With INDEX_IN_PROCESS the web process also runs
+    # jobs it enqueues via BackgroundTasks; turn it off when dedicated workers are deployed.
+    index_in_process: bool = Field(default=True, alias="INDEX_IN_PROCESS")
+    index_job_max_attempts: int = Field(default=3, alias="INDEX_JOB_MAX_ATTEMPTS")
+    index_job_retry_base_s: float = Field(default=30.0, alias="INDEX_JOB_RETRY_BASE_S")
+    index_job_heartbeat_s: float = Field(default=10.0, alias="INDEX_JOB_HEARTBEAT_S")
+    index_job_stale_after_s: float = Field(default=60.0, alias="INDEX_JOB_STALE_AFTER_S")
+    worker_concurrency: int = Field(default=2, alias="WORKER_CONCURRENCY")
+    worker_poll_interval_s: float = Field(default=1.0, alias="WORKER_POLL_INTERVAL_S")
+    # Comment lines sent on idle document status feeds so proxies keep the connection open.
+    status_feed_keepalive_s: float = Field(default=15.0, alias="STATUS_FEED_KEEPALIVE_S")
+    # Default page size of GET /api/documents (keyset pagination; `limit` overrides it).
+    documents_page_size: int = Field(default=100, alias="DOCUMENTS_PAGE_SIZE")
+    # Documents of one upload batch a worker indexes through one shared pipeline.
+    index_batch_max_documents: int = Field(default=50, alias="INDEX_BATCH_MAX_DOCUMENTS")
+    # Files (including zip members) accepted per batch upload.
+    batch_upload_max_files: int = Field(default=1000, alias="BATCH_UPLOAD_MAX_FILES")
+    # Chunks embedded and inserted per round while indexing.
+    index_batch_size: int = Field(default=100, alias="INDEX_BATCH_SIZE")
+    # Items buffered between indexing pipeline stages (backpressure bound).
+    index_pipeline_queue_size: int = Field(default=2, alias="INDEX_PIPELINE_QUEUE_SIZE")
+    # Chunks deleted per transaction when garbage-collecting replaced index versions.
+    index_gc_batch_size: int = Field(default=1000, alias="INDEX_GC_BATCH_SIZE")
+    # "executemany" (portable) or "copy" (binary COPY, Postgres + psycopg only).
+    bulk_insert_method: Literal["executemany", "copy"] = Field(default="executemany", alias="BULK_INSERT_METHOD")
+    # 0 = one extraction process per CPU.
+    pdf_extract_workers: int = Field(default=0, alias="PDF_EXTRACT_WORKERS")
+    pdf_parallel_min_pages: int = Field(default=32, alias="PDF_PARALLEL_MIN_PAGES")
+    pdf_pages_per_task: int = Field(default=8, alias="PDF_PAGES_PER_TASK")
     upload_dir: str = Field(default="data", alias="UPLOAD_DIR")
     chroma_dir: str = Field(default=".chroma", alias="CHROMA_DIR")
     chroma_collection: str = Field(default="documents", alias="CHROMA_COLLECTION")
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import uuid
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.models import Chunk, ChunkEmbedding
+from app.rag.embedding import estimate_tokens
+
+
+def chunk_rows(document_id: uuid.UUID, chunks: Sequence[Any], index_version: int = 1) -> list[dict[str, Any]]:
+    """Row dicts for `chunks` (app.models.schemas.Chunk) with client-side UUIDs."""
+
+    return [
+        {
+            "id": uuid.uuid4(),
+            "document_id": document_id,
+            "index_version": index_version,
+            "chunk_index": c.chunk_index,
+            "start_char": c.start_char,
+            "end_char": c.end_char,
+            "text": c.text,
+            "page_start": c.page_start,
+            "page_end": c.page_end,
+            "token_count": estimate_tokens([c.text]),
+        }
+        for c in chunks
+    ]
+
+
+def _use_copy(db: Session) -> bool:
+    bind = db.get_bind()
+    return (
+        get_settings().bulk_insert_method == "copy"
+        and bind.dialect.name == "postgresql"
+        and bind.dialect.driver == "psycopg"
+    )
+
+
+def _embedding_rows(
+    rows: list[dict[str, Any]], embeddings: Mapping[str, Sequence[Sequence[float]]]
+) -> list[dict[str, Any]]:
+    return [
+        {"chunk_id": r["id"], "space": space, "embedding": list(e)}
+        for space, vectors in embeddings.items()
+        for r, e in zip(rows, vectors)
+    ]
+
+
+def _copy_rows(db: Session, rows: list[dict[str, Any]], embeddings: list[dict[str, Any]]) -> None:
+    """psycopg COPY ... FORMAT BINARY; vectors go over the wire as pgvector's binary format."""
+
+    from pgvector.psycopg import register_vector
+
+    pooled = db.connection().connection
+    raw = pooled.driver_connection
+    # `info` lives as long as the DBAPI connection, so the type lookup runs once per connection.
+    if not pooled.info.get("pgvector_registered"):
+        register_vector(raw)
+        pooled.info["pgvector_registered"] = True
+    with raw.cursor() as cur:
+        with cur.copy(
+            "COPY chunks (id, document_id, index_version, chunk_index, start_char, end_char, text, page_start, page_end, "
+            "token_count) FROM STDIN WITH (FORMAT BINARY)"
+        ) as copy:
+            copy.set_types(["uuid", "uuid", "int4", "int4", "int4", "int4", "text", "int4", "int4", "int4"])
+            for r in rows:
+                copy.write_row(
+                    (
+                        r["id"],
+                        r["document_id"],
+                        r["index_version"],
+                        r["chunk_index"],
+                        r["start_char"],
+                        r["end_char"],
+                        r["text"],
+                        r["page_start"],
+                        r["page_end"],
+                        r["token_count"],
+                    )
+                )
+        with cur.copy("COPY chunk_embeddings (chunk_id, space, embedding) FROM STDIN WITH (FORMAT BINARY)") as copy:
+            copy.set_types(["uuid", "text", "vector"])
+            for e in embeddings:
+                copy.write_row((e["chunk_id"], e["space"], e["embedding"]))
+
+
+def bulk_insert_chunks(
+    db: Session,
+    rows: list[dict[str, Any]],
+    embeddings: Mapping[str, Sequence[Sequence[float]]],
+) -> None:
+    """Insert chunk rows and their embeddings in two statements (no per-row flush).
+
+    `embeddings` maps an embedding space name to one vector per row. Uses `insert().values`
+    executemany by default; `BULK_INSERT_METHOD=copy` switches to binary COPY on
+    Postgres/psycopg. Does not commit: callers own the transaction.
+    """
+
+    if any(len(vectors) != len(rows) for vectors in embeddings.values()):
+        raise ValueError("rows and embeddings must have the same length")
+    if not rows:
+        return
+
+    embedding_rows = _embedding_rows(rows, embeddings)
+    if _use_copy(db):
+        _copy_rows(db, rows, embedding_rows)
+        return
+
+    db.execute(insert(Chunk), rows)
+    if embedding_rows:
+        db.execute(insert(ChunkEmbedding), embedding_rows)
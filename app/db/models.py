@@ -4,7 +4,7 @@ import uuid
 from datetime import datetime
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.types import JSON, TypeDecorator
@@ -17,12 +17,14 @@ class Base(DeclarativeBase):
 class EmbeddingType(TypeDecorator):
     """
     Use pgvector when on Postgres; fall back to JSON for SQLite tests.
+
+    `dims=None` is pgvector's dimensionless `vector`, so one column can hold every space.
     """
 
     cache_ok = True
     impl = JSON
 
-    def __init__(self, dims: int) -> None:
+    def __init__(self, dims: int | None) -> None:
         super().__init__()
         self.dims = dims
 
@@ -39,12 +41,46 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(320), unique=True, index=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    # Embedding space retrieval uses for this tenant; None means settings.embedding_space.
+    # Switched by a completed backfill (app.services.embedding_backfill).
+    embedding_space: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Bumped whenever a listed document field changes; the /api/documents ETag.
+    documents_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     documents: Mapped[list["Document"]] = relationship(back_populates="user")
 
 
+class Blob(Base):
+    """Uploaded bytes stored once by sha256 (see app.services.blob_store).
+
+    `refcount` is the number of documents whose `content_sha256` points here; the file is
+    deleted when the last one goes.
+    """
+
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+
+class UploadBatch(Base):
+    """Files uploaded together (multi-file or zip); their documents are indexed together."""
+
+    __tablename__ = "upload_batches"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    # Files/archive members that were not stored: [{"filename": ..., "error": ...}].
+    rejected: Mapped[list[dict]] = mapped_column(JSON, nullable=False, default=list)
+
+
 class Document(Base):
     __tablename__ = "documents"
+    # Keyset pagination of a tenant's documents, newest first.
+    __table_args__ = (Index("ix_documents_user_uploaded_at_id", "user_id", "uploaded_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
@@ -55,6 +91,21 @@ class Document(Base):
     uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     indexed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Key into `blobs` for uploads stored content-addressed; older uploads live under
+    # `<upload_dir>/<user_id>/<stored_filename>` and have no blob row.
+    content_sha256: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
+    size_bytes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Chunk set served to retrieval; a reindex builds `building_version` alongside it and
+    # flips `active_version` in one update when complete. Older versions are GC'd after.
+    active_version: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    building_version: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Resume point of the unfinished build of `building_version`: chunks committed so far,
+    # valid only while `index_params` matches the current chunking/embedding settings.
+    index_checkpoint: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    index_params: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    batch_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("upload_batches.id", ondelete="SET NULL"), index=True, nullable=True
+    )
 
     user: Mapped["User"] = relationship(back_populates="documents")
     chunks: Mapped[list["Chunk"]] = relationship(back_populates="document", cascade="all, delete-orphan")
@@ -62,24 +113,105 @@ class Document(Base):
 
 class Chunk(Base):
     __tablename__ = "chunks"
-    __table_args__ = (UniqueConstraint("document_id", "chunk_index", name="uq_chunks_document_chunk_index"),)
+    __table_args__ = (
+        UniqueConstraint("document_id", "index_version", "chunk_index", name="uq_chunks_document_version_chunk_index"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     document_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("documents.id"), index=True, nullable=False)
+    index_version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     start_char: Mapped[int] = mapped_column(Integer, nullable=False)
     end_char: Mapped[int] = mapped_column(Integer, nullable=False)
     text: Mapped[str] = mapped_column(Text, nullable=False)
+    # 1-based source pages spanned by the chunk (PDFs only).
+    page_start: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    page_end: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Estimated prompt tokens of `text` (app.rag.embedding.estimate_tokens), set at index time.
+    token_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     document: Mapped["Document"] = relationship(back_populates="chunks")
-    embedding: Mapped["ChunkEmbedding"] = relationship(back_populates="chunk", uselist=False, cascade="all, delete-orphan")
+    embeddings: Mapped[list["ChunkEmbedding"]] = relationship(back_populates="chunk", cascade="all, delete-orphan")
 
 
 class ChunkEmbedding(Base):
+    """One vector per (chunk, embedding space); spaces may differ in model and dimensions."""
+
     __tablename__ = "chunk_embeddings"
 
     chunk_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("chunks.id"), primary_key=True)
-    embedding: Mapped[list[float]] = mapped_column(EmbeddingType(dims=1536), nullable=False)
+    space: Mapped[str] = mapped_column(String(64), primary_key=True, default="default", server_default="default")
+    embedding: Mapped[list[float]] = mapped_column(EmbeddingType(dims=None), nullable=False)
+
+    chunk: Mapped["Chunk"] = relationship(back_populates="embeddings")
 
-    chunk: Mapped["Chunk"] = relationship(back_populates="embedding")
 
+class EmbeddingSpacePin(Base):
+    """The model (and `dims`) that produced a space's stored vectors.
+
+    Checked when the app and workers start: a space whose configuration changed while it
+    holds vectors would mix two models' vectors, so startup fails instead.
+    """
+
+    __tablename__ = "embedding_space_pins"
+
+    space: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(255), nullable=False)
+    dims: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    pinned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+
+class EmbeddingBackfill(Base):
+    """Re-embedding of one tenant's chunks into another embedding space.
+
+    Retrieval switches the tenant to `space` only once every served chunk has a vector there.
+    """
+
+    __tablename__ = "embedding_backfills"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), index=True, nullable=False)
+    space: Mapped[str] = mapped_column(String(64), nullable=False)
+    # pending -> running -> done | failed
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="pending")
+    embedded_chunks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tokens_estimate: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    locked_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+
+class IndexJob(Base):
+    """Durable indexing work item, claimed by workers with `SELECT ... FOR UPDATE SKIP LOCKED`."""
+
+    __tablename__ = "index_jobs"
+    # At most one pending job per document; a reindex during a run queues behind the running one.
+    __table_args__ = (
+        Index(
+            "uq_index_jobs_pending_document",
+            "document_id",
+            unique=True,
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    # pending -> running -> succeeded | pending (retry) | dead (retries exhausted)
+    #   | superseded (a retry found another pending job for the document, which rebuilds it)
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    locked_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
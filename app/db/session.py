@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import Callable, Generator, Iterator
+from contextlib import contextmanager
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import get_settings
+from app.rag.cancellation import current_cancel_scope
 
 
 def get_engine():
@@ -23,3 +25,31 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+
+
+def interrupt_callback(db: Session) -> Callable[[], None]:
+    """Return a callback that aborts the statement currently running on `db`'s connection."""
+
+    raw = db.connection().connection.driver_connection
+
+    def _interrupt() -> None:
+        if hasattr(raw, "cancel_safe"):  # psycopg >= 3.2
+            raw.cancel_safe()
+        elif hasattr(raw, "cancel"):  # older psycopg
+            raw.cancel()
+        elif hasattr(raw, "interrupt"):  # sqlite3
+            raw.interrupt()
+
+    return _interrupt
+
+
+@contextmanager
+def cancellable(db: Session) -> Iterator[None]:
+    """Interrupt queries run inside the block if the current request gets cancelled."""
+
+    scope = current_cancel_scope()
+    if scope is None:
+        yield
+        return
+    with scope.on_cancel(interrupt_callback(db)):
+        yield
@@ -0,0 +1,105 @@
+"""Chunker microbenchmark on multi-megabyte synthetic inputs.
+
+Times `chunk_text` on the whole string and `iter_chunks` over 64K-character segments (the
+shape `index_document` feeds it), checks both produce identical chunks, and prints MB/s.
+
+    python -m app.eval.bench_chunking --size-mb 8 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from collections.abc import Callable
+from time import perf_counter
+
+from app.config import get_settings
+from app.rag.chunking import chunk_text, iter_chunks
+
+_SEGMENT_CHARS = 64 * 1024
+_WORDS = "retrieval augmented generation grounds answers in cited chunks of uploaded documents".split()
+
+
+def _prose(size: int, rng: random.Random) -> str:
+    """Paragraphs of sentences: every split marker is common."""
+
+    paragraphs: list[str] = []
+    total = 0
+    while total < size:
+        sentences = [" ".join(rng.choices(_WORDS, k=rng.randint(6, 20))).capitalize() + "." for _ in range(rng.randint(2, 8))]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\r\n\r\n".join(paragraphs)[:size]
+
+
+def _unbroken_lines(size: int, rng: random.Random) -> str:
+    """Words and newlines only: no paragraph or sentence markers, so every fallback is tried."""
+
+    lines: list[str] = []
+    total = 0
+    while total < size:
+        line = " ".join(rng.choices(_WORDS, k=rng.randint(3, 30)))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def _no_whitespace(size: int, rng: random.Random) -> str:
+    """No split markers at all: every chunk is cut at chunk_size."""
+
+    return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=size))
+
+
+INPUTS: dict[str, Callable[[int, random.Random], str]] = {
+    "prose": _prose,
+    "unbroken_lines": _unbroken_lines,
+    "no_whitespace": _no_whitespace,
+}
+
+
+def _best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def run(size_mb: float, repeat: int, chunk_size: int, overlap: int) -> None:
+    rng = random.Random(0)
+    size = int(size_mb * 1024 * 1024)
+    print(f"chunk_size={chunk_size} overlap={overlap} input={size_mb:g} MB best of {repeat}")
+    for name, make in INPUTS.items():
+        text = make(size, rng)
+        segments = [text[i : i + _SEGMENT_CHARS] for i in range(0, len(text), _SEGMENT_CHARS)]
+
+        whole = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
+        streamed = list(iter_chunks(segments, chunk_size=chunk_size, overlap=overlap))
+        if streamed != whole:
+            raise SystemExit(f"{name}: iter_chunks output differs from chunk_text")
+
+        mb = len(text) / (1024 * 1024)
+        t_whole = _best_of(repeat, lambda: chunk_text(text, chunk_size=chunk_size, overlap=overlap))
+        t_stream = _best_of(repeat, lambda: sum(1 for _ in iter_chunks(segments, chunk_size=chunk_size, overlap=overlap)))
+        print(
+            f"{name:>15}: {len(whole):>7} chunks  "
+            f"chunk_text {t_whole * 1000:8.1f} ms ({mb / t_whole:6.1f} MB/s)  "
+            f"iter_chunks {t_stream * 1000:8.1f} ms ({mb / t_stream:6.1f} MB/s)"
+        )
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Benchmark the chunker on multi-MB inputs")
+    parser.add_argument("--size-mb", type=float, default=8.0, help="Characters per input, in MiB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--chunk-size", type=int, default=settings.chunk_size)
+    parser.add_argument("--overlap", type=int, default=settings.chunk_overlap)
+    args = parser.parse_args()
+    run(size_mb=args.size_mb, repeat=max(1, args.repeat), chunk_size=args.chunk_size, overlap=args.overlap)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Calibrate the adaptive gating thresholds (app.rag.gating) offline from the eval dataset.
+
+A gate may only skip a stage where the eval set shows the stage would not have helped:
+
+- rerank: the vector top-1 candidate already comes from a `must_cite_document_names`
+  document. The margin and z-score thresholds are the lowest values at or above which
+  that holds for at least `--precision` of the cases (and at least `--min-cases` of them).
+- rewrite: the raw question already retrieves a cited document within TOP_K. The term
+  limit is the largest one up to which that holds for keyword-style questions.
+
+A signal with no safe threshold is written as null (never skip on it). The JSON is read
+through GATE_THRESHOLDS_PATH.
+
+    python -m app.eval.calibrate_gates --mock --out eval/gate_thresholds.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from app.config import get_settings
+from app.eval.runner import load_cases
+from app.eval.train_reranker import scored_candidates
+from app.rag.embedding import set_embedding_client
+from app.rag.gating import GateThresholds, is_keyword_query, rerank_signals
+
+# Term counts tried for REWRITE_GATE_MAX_TERMS.
+_MAX_KEYWORD_TERMS = 8
+
+
+def lowest_safe_threshold(observations: list[tuple[float, bool]], precision: float, min_cases: int) -> float | None:
+    """Lowest value `t` such that the cases with signal >= t are right at least `precision` of the time."""
+
+    for threshold in sorted({value for value, _ in observations}):
+        above = [ok for value, ok in observations if value >= threshold]
+        if len(above) >= min_cases and sum(above) / len(above) >= precision:
+            return round(threshold, 4)
+    return None
+
+
+def calibrate(dataset_path: str, precision: float = 0.95, min_cases: int = 3) -> GateThresholds:
+    settings = get_settings()
+    margins: list[tuple[float, bool]] = []
+    zscores: list[tuple[float, bool]] = []
+    keyword_hits: list[tuple[int, bool]] = []
+    for case in load_cases(dataset_path):
+        cited = set(case.expects.must_cite_document_names)
+        if not cited:
+            continue
+        ranked = sorted(scored_candidates(case), key=lambda c: c.score, reverse=True)
+        if not ranked:
+            continue
+
+        if len(ranked) >= 2:
+            top_is_cited = ranked[0].document_name in cited
+            margin, z = rerank_signals([c.score for c in ranked])
+            margins.append((margin, top_is_cited))
+            if z is not None:
+                zscores.append((z, top_is_cited))
+
+        if is_keyword_query(case.question, _MAX_KEYWORD_TERMS):
+            terms = len(case.question.split())
+            keyword_hits.append((terms, any(c.document_name in cited for c in ranked[: settings.top_k])))
+
+    max_terms = 0
+    for limit in range(1, _MAX_KEYWORD_TERMS + 1):
+        within = [hit for terms, hit in keyword_hits if terms <= limit]
+        if len(within) < min_cases:
+            continue
+        if sum(within) / len(within) < precision:
+            break
+        max_terms = limit
+
+    return GateThresholds(
+        rewrite_max_terms=max_terms,
+        rerank_margin=lowest_safe_threshold(margins, precision, min_cases),
+        rerank_zscore=lowest_safe_threshold(zscores, precision, min_cases),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate adaptive gating thresholds from the eval set")
+    parser.add_argument("--dataset", default="eval/golden.jsonl", help="Path to JSONL dataset")
+    parser.add_argument("--out", default="eval/gate_thresholds.json", help="Where to write the thresholds JSON")
+    parser.add_argument("--precision", type=float, default=0.95, help="Required share of skips that lose nothing")
+    parser.add_argument("--min-cases", type=int, default=3, help="Fewest cases a threshold must be backed by")
+    parser.add_argument("--mock", action="store_true", help="Use deterministic OpenAI mocks (no network)")
+    args = parser.parse_args()
+
+    if args.mock:
+        from app.eval.mock_openai import MockOpenAIClient
+
+        set_embedding_client(MockOpenAIClient())
+
+    thresholds = calibrate(args.dataset, precision=args.precision, min_cases=args.min_cases)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(thresholds.to_dict(), indent=2), encoding="utf-8")
+    print(f"Wrote gate thresholds to {out}: {thresholds.to_dict()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,9 +23,11 @@ class _EmbeddingsResponse:
 
 
 class MockEmbeddingsApi:
-    def create(self, model: str, input: list[str]) -> _EmbeddingsResponse:
-        _ = model
-        return _EmbeddingsResponse([_text_to_vector(item) for item in input])
+    def create(
+        self, model: str, input: list[str], dimensions: int | None = None, timeout: float | None = None
+    ) -> _EmbeddingsResponse:
+        _ = model, timeout
+        return _EmbeddingsResponse([_text_to_vector(item, dimensions or 8) for item in input])
 
 
 class _Message:
@@ -44,8 +46,8 @@ class _ChatResponse:
 
 
 class MockChatCompletionsApi:
-    def create(self, model: str, messages: list[dict], temperature: float) -> _ChatResponse:
-        _ = model, temperature
+    def create(self, model: str, messages: list[dict], temperature: float, timeout: float | None = None) -> _ChatResponse:
+        _ = model, temperature, timeout
         system = (messages[0].get("content") or "").lower()
         user = messages[-1].get("content") or ""
 
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import shutil
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
@@ -10,8 +9,7 @@ from time import perf_counter
 from sqlalchemy import delete, select
 from sqlalchemy.orm import sessionmaker
 
-from app.config import get_settings
-from app.db.models import Chunk, ChunkEmbedding, Document, User
+from app.db.models import Chunk, ChunkEmbedding, User
 from app.db.session import get_engine
 from app.eval.schemas import (
     EvalCase,
@@ -27,7 +25,7 @@ from app.rag.embedding import set_embedding_client
 from app.rag.query_rewrite import set_rewrite_client
 from app.rag.rerank import set_rerank_client
 from app.services.auth_service import hash_password
-from app.services.document_service import create_document_record, index_document
+from app.services.document_service import create_document_record, delete_document_everywhere, index_document
 
 
 def load_cases(dataset_path: str) -> list[EvalCase]:
@@ -157,18 +155,13 @@ def run_eval(
                 )
             finally:
                 if cleanup:
-                    # Remove stored files for this user.
-                    settings = get_settings()
-                    user_dir = settings.upload_path / str(user_id)
-                    if user_dir.exists():
-                        shutil.rmtree(user_dir, ignore_errors=True)
-
                     for doc_id in created_doc_ids:
                         chunk_ids = db.execute(select(Chunk.id).where(Chunk.document_id == doc_id)).scalars().all()
                         if chunk_ids:
                             db.execute(delete(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(chunk_ids)))
                         db.execute(delete(Chunk).where(Chunk.document_id == doc_id))
-                        db.execute(delete(Document).where(Document.id == doc_id))
+                        # Drops the blob reference (and the file with the last one).
+                        delete_document_everywhere(db=db, user=user, doc_id=str(doc_id))
 
                     db.execute(delete(User).where(User.id == user_id))
                     db.commit()
@@ -0,0 +1,118 @@
+"""Fit local reranker weights offline from the eval dataset.
+
+Every chunk of every case's documents is a candidate; chunks from `must_cite_document_names`
+are positives. A small logistic regression over `app.rag.local_rerank.FEATURE_NAMES` is fit by
+gradient descent and written as JSON for `LOCAL_RERANK_WEIGHTS_PATH`.
+
+    python -m app.eval.train_reranker --mock --out eval/local_rerank_weights.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from pathlib import Path
+
+from app.config import get_settings
+from app.eval.runner import load_cases
+from app.eval.schemas import EvalCase
+from app.models.schemas import RetrievedChunk
+from app.rag.chunking import chunk_text
+from app.rag.embedding import get_embeddings, set_embedding_client
+from app.rag.local_rerank import FEATURE_NAMES, LocalRerankWeights, feature_matrix
+from app.rag.retrieval import _cosine_similarity
+
+
+def scored_candidates(case: EvalCase) -> list[RetrievedChunk]:
+    """Every chunk of the case's documents, scored by vector similarity to the question."""
+
+    settings = get_settings()
+    candidates: list[RetrievedChunk] = []
+    for doc in case.docs:
+        for chunk in chunk_text(doc.content, chunk_size=settings.chunk_size, overlap=settings.chunk_overlap):
+            candidates.append(
+                RetrievedChunk(
+                    id=f"{doc.filename}:{chunk.chunk_index}",
+                    text=chunk.text,
+                    doc_id=doc.filename,
+                    document_name=doc.filename,
+                    chunk_index=chunk.chunk_index,
+                    start_char=chunk.start_char,
+                    end_char=chunk.end_char,
+                    score=0.0,
+                )
+            )
+    if not candidates:
+        return []
+
+    query_vec, *chunk_vecs = get_embeddings([case.question, *[c.text for c in candidates]])
+    return [c.model_copy(update={"score": _cosine_similarity(query_vec, v)}) for c, v in zip(candidates, chunk_vecs)]
+
+
+def build_training_set(dataset_path: str) -> tuple[list[list[float]], list[float]]:
+    features: list[list[float]] = []
+    labels: list[float] = []
+    for case in load_cases(dataset_path):
+        if not case.expects.must_cite_document_names:
+            continue
+        candidates = scored_candidates(case)
+        if not candidates:
+            continue
+
+        features.extend(feature_matrix(case.question, candidates))
+        labels.extend(1.0 if c.document_name in case.expects.must_cite_document_names else 0.0 for c in candidates)
+    return features, labels
+
+
+def fit_logistic(
+    features: list[list[float]],
+    labels: list[float],
+    *,
+    epochs: int = 2000,
+    learning_rate: float = 0.5,
+    l2: float = 0.01,
+) -> LocalRerankWeights:
+    n_features = len(FEATURE_NAMES)
+    weights = [0.0] * n_features
+    bias = 0.0
+    n = len(features) or 1
+    for _ in range(epochs):
+        grad_w = [0.0] * n_features
+        grad_b = 0.0
+        for row, label in zip(features, labels):
+            z = bias + sum(w * x for w, x in zip(weights, row))
+            err = 1.0 / (1.0 + math.exp(-z)) - label
+            grad_b += err
+            for j, x in enumerate(row):
+                grad_w[j] += err * x
+        bias -= learning_rate * grad_b / n
+        weights = [w - learning_rate * (g / n + l2 * w) for w, g in zip(weights, grad_w)]
+    return LocalRerankWeights(bias=bias, weights=tuple(weights))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train local reranker weights from the eval set")
+    parser.add_argument("--dataset", default="eval/golden.jsonl", help="Path to JSONL dataset")
+    parser.add_argument("--out", default="eval/local_rerank_weights.json", help="Where to write the weights JSON")
+    parser.add_argument("--mock", action="store_true", help="Use deterministic OpenAI mocks (no network)")
+    args = parser.parse_args()
+
+    if args.mock:
+        from app.eval.mock_openai import MockOpenAIClient
+
+        set_embedding_client(MockOpenAIClient())
+
+    features, labels = build_training_set(args.dataset)
+    if not features:
+        raise SystemExit("No labelled candidates found in dataset")
+    weights = fit_logistic(features, labels)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(weights.to_dict(), indent=2), encoding="utf-8")
+    print(f"Wrote weights for {len(features)} candidates to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,17 @@ import structlog
 from app.api.auth import router as auth_router
 from app.api.chat import router as chat_router
 from app.api.documents import router as documents_router
+from app.api.embedding_spaces import router as embedding_spaces_router
 from app.api.metrics import router as metrics_router
 from app.api.upload import router as upload_router
+from app.api.vector_import import router as vector_import_router
 from app.config import get_settings
 from app.db.models import User
-from app.db.session import get_db
+from app.db.session import get_db, get_engine
 from app.observability.logging import configure_logging
 from app.observability.middleware import RequestContextMiddleware
 from app.services.auth_service import decode_session_token
+from app.services.embedding_backfill import pin_embedding_spaces
 
 
 app = FastAPI(title="RAG Notebook", version="0.1.0")
@@ -28,7 +31,9 @@ app.include_router(auth_router)
 app.include_router(upload_router)
 app.include_router(chat_router)
 app.include_router(documents_router)
+app.include_router(embedding_spaces_router)
 app.include_router(metrics_router)
+app.include_router(vector_import_router)
 
 
 @app.on_event("startup")
@@ -37,6 +42,8 @@ def _startup() -> None:
     settings = get_settings()
     settings.upload_path.mkdir(parents=True, exist_ok=True)
     settings.chroma_path.mkdir(parents=True, exist_ok=True)
+    with Session(get_engine()) as db:
+        pin_embedding_spaces(db)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -11,6 +11,8 @@ class Chunk(BaseModel):
     chunk_index: int
     start_char: int
     end_char: int
+    page_start: int | None = None
+    page_end: int | None = None
 
 
 class RetrievedChunk(BaseModel):
@@ -22,6 +24,8 @@ class RetrievedChunk(BaseModel):
     start_char: int
     end_char: int
     score: float
+    # Chunk.token_count from the index; None for rows without one.
+    token_count: int | None = None
 
 
 class Citation(BaseModel):
@@ -34,6 +38,16 @@ class Citation(BaseModel):
 class ChatRequest(BaseModel):
     query: str = Field(min_length=1)
     debug: bool = False
+    # End-to-end time budget; overrides the X-Request-Deadline-Ms header and CHAT_DEADLINE_MS.
+    deadline_ms: int | None = Field(default=None, gt=0)
+
+
+class GateDecision(BaseModel):
+    stage: Literal["rewrite", "rerank"]
+    run: bool
+    reason: str
+    # The statistic the decision was based on (term count, score margin, z-score).
+    value: float | None = None
 
 
 class ChatDebug(BaseModel):
@@ -43,6 +57,10 @@ class ChatDebug(BaseModel):
     final_chunks: list[RetrievedChunk]
     rewrite_enabled: bool
     rerank_enabled: bool
+    # Stages skipped because the request deadline could not cover them.
+    skipped_stages: list[str] = Field(default_factory=list)
+    gate_decisions: list[GateDecision] = Field(default_factory=list)
+    deadline_remaining_ms: float | None = None
 
 
 class ChatResponse(BaseModel):
@@ -51,6 +69,22 @@ class ChatResponse(BaseModel):
     debug: ChatDebug | None = None
 
 
+class BatchChatRequest(BaseModel):
+    queries: list[str] = Field(min_length=1)
+    # Stream results in request order, or each one as soon as it is answered.
+    ordered: bool = True
+    debug: bool = False
+
+
+class BatchChatResult(BaseModel):
+    """One NDJSON line of a batch chat response; `index` is the query's position in the request."""
+
+    index: int
+    query: str
+    response: ChatResponse | None = None
+    error: str | None = None
+
+
 class DocumentMetadata(BaseModel):
     id: str
     filename: str
@@ -60,6 +94,9 @@ class DocumentMetadata(BaseModel):
     stored_filename: str | None = None
     indexed_at: datetime | None = None
     error_message: str | None = None
+    size_bytes: int | None = None
+    content_sha256: str | None = None
+    active_version: int | None = None
 
 
 class UploadResponse(BaseModel):
@@ -68,3 +105,74 @@ class UploadResponse(BaseModel):
 
 class DocumentsResponse(BaseModel):
     documents: list[DocumentMetadata]
+    # Pass back as `cursor` for the next page; None on the last page.
+    next_cursor: str | None = None
+
+
+class EmbeddingSpaceInfo(BaseModel):
+    name: str
+    model: str
+    dims: int | None = None
+    active: bool = False
+
+
+class EmbeddingBackfillStatus(BaseModel):
+    id: str
+    space: str
+    status: Literal["pending", "running", "done", "failed"]
+    total_chunks: int
+    covered_chunks: int
+    coverage_pct: float
+    embedded_chunks: int
+    tokens_estimate: int
+    cost_estimate_usd: float
+    remaining_cost_estimate_usd: float
+    created_at: datetime
+    finished_at: datetime | None = None
+    last_error: str | None = None
+
+
+class EmbeddingSpacesResponse(BaseModel):
+    active_space: str
+    spaces: list[EmbeddingSpaceInfo]
+    backfills: list[EmbeddingBackfillStatus]
+
+
+class RejectedFile(BaseModel):
+    filename: str
+    error: str
+
+
+class UploadBatchStatus(BaseModel):
+    id: str
+    created_at: datetime
+    total_documents: int
+    status_counts: dict[str, int]
+    # Chunks committed so far across the batch (finished documents plus in-progress checkpoints).
+    chunks_indexed: int
+    progress_pct: float
+    done: bool
+    documents: list[DocumentMetadata]
+    rejected: list[RejectedFile] = Field(default_factory=list)
+
+
+class VectorImportRecord(BaseModel):
+    """One line of a vector import: a chunk of `document` with its precomputed embedding.
+
+    `embedding` is omitted when vectors come as a separate float32 payload.
+    """
+
+    document: str = Field(min_length=1)
+    text: str = Field(min_length=1)
+    start_char: int = Field(ge=0)
+    end_char: int = Field(gt=0)
+    page_start: int | None = None
+    page_end: int | None = None
+    embedding: list[float] | None = None
+
+
+class VectorImportResponse(BaseModel):
+    space: str
+    dims: int
+    chunk_count: int
+    documents: list[DocumentMetadata]
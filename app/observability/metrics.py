@@ -18,6 +18,21 @@ class _LatencyAgg:
             self.max_ms = float(elapsed_ms)
 
 
+@dataclass
+class _GateAgg:
+    evaluated: int = 0
+    skipped: int = 0
+
+    def observe(self, run: bool) -> None:
+        self.evaluated += 1
+        if not run:
+            self.skipped += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        rate = (self.skipped / self.evaluated) if self.evaluated else 0.0
+        return {"evaluated": self.evaluated, "skipped": self.skipped, "skip_rate": round(rate, 4)}
+
+
 class InMemoryMetrics:
     """Thread-safe, process-local metrics (resets on restart)."""
 
@@ -26,8 +41,16 @@ class InMemoryMetrics:
         self.http_requests_total: int = 0
         self.openai_calls_total: int = 0
         self.openai_tokens_total: int = 0
+        self.openai_retries_total: int = 0
+        self.openai_timeouts_total: int = 0
+        self.openai_hedges_total: int = 0
+        self.openai_hedge_wins_total: int = 0
+        self.openai_wasted_tokens_total: int = 0
+        self.chat_requests_cancelled_total: int = 0
+        self.cancelled_tokens_saved_estimate_total: int = 0
         self.http_request_ms = _LatencyAgg()
         self.openai_call_ms = _LatencyAgg()
+        self.gates: dict[str, _GateAgg] = {}
 
     def observe_http_request(self, elapsed_ms: float) -> None:
         with self._lock:
@@ -45,6 +68,42 @@ class InMemoryMetrics:
                     # Don't let strange usage shapes break the app.
                     pass
 
+    def observe_openai_retry(self) -> None:
+        with self._lock:
+            self.openai_retries_total += 1
+
+    def observe_openai_timeout(self) -> None:
+        with self._lock:
+            self.openai_timeouts_total += 1
+
+    def observe_openai_hedge(self) -> None:
+        with self._lock:
+            self.openai_hedges_total += 1
+
+    def observe_openai_hedge_win(self) -> None:
+        with self._lock:
+            self.openai_hedge_wins_total += 1
+
+    def observe_openai_wasted_tokens(self, tokens_total: int | None) -> None:
+        """Tokens paid for by responses nobody used (hedge losers, calls past their deadline)."""
+
+        if tokens_total is None:
+            return
+        with self._lock:
+            try:
+                self.openai_wasted_tokens_total += int(tokens_total)
+            except Exception:
+                pass
+
+    def observe_request_cancelled(self, tokens_saved_estimate: int = 0) -> None:
+        with self._lock:
+            self.chat_requests_cancelled_total += 1
+            self.cancelled_tokens_saved_estimate_total += int(tokens_saved_estimate)
+
+    def observe_gate_decision(self, stage: str, run: bool) -> None:
+        with self._lock:
+            self.gates.setdefault(stage, _GateAgg()).observe(run)
+
     def snapshot(self) -> dict[str, Any]:
         with self._lock:
             return {
@@ -52,11 +111,19 @@ class InMemoryMetrics:
                     "http_requests_total": self.http_requests_total,
                     "openai_calls_total": self.openai_calls_total,
                     "openai_tokens_total": self.openai_tokens_total,
+                    "openai_retries_total": self.openai_retries_total,
+                    "openai_timeouts_total": self.openai_timeouts_total,
+                    "openai_hedges_total": self.openai_hedges_total,
+                    "openai_hedge_wins_total": self.openai_hedge_wins_total,
+                    "openai_wasted_tokens_total": self.openai_wasted_tokens_total,
+                    "chat_requests_cancelled_total": self.chat_requests_cancelled_total,
+                    "cancelled_tokens_saved_estimate_total": self.cancelled_tokens_saved_estimate_total,
                 },
                 "latency_ms": {
                     "http_request_ms": asdict(self.http_request_ms),
                     "openai_call_ms": asdict(self.openai_call_ms),
                 },
+                "gating": {stage: agg.as_dict() for stage, agg in self.gates.items()},
             }
 
     def reset(self) -> None:
@@ -64,8 +131,16 @@ class InMemoryMetrics:
             self.http_requests_total = 0
             self.openai_calls_total = 0
             self.openai_tokens_total = 0
+            self.openai_retries_total = 0
+            self.openai_timeouts_total = 0
+            self.openai_hedges_total = 0
+            self.openai_hedge_wins_total = 0
+            self.openai_wasted_tokens_total = 0
+            self.chat_requests_cancelled_total = 0
+            self.cancelled_tokens_saved_estimate_total = 0
             self.http_request_ms = _LatencyAgg()
             self.openai_call_ms = _LatencyAgg()
+            self.gates = {}
 
 
 _METRICS: InMemoryMetrics | None = None
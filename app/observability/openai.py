@@ -1,15 +1,168 @@
 from __future__ import annotations
 
+import contextvars
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from threading import Lock
 from time import perf_counter
 from typing import Any, Callable, TypeVar
 
 import structlog
+from openai import APIConnectionError, APIStatusError
 
+from app.config import get_settings
 from app.observability.metrics import get_metrics
+from app.rag.cancellation import CancelScope, RequestCancelled, current_cancel_scope
 
 
 T = TypeVar("T")
 
+# Status codes worth retrying: request timeout, conflict, rate limit and server-side errors.
+_RETRYABLE_STATUS = {408, 409, 429}
+# Operations whose requests can safely be duplicated (no side effects, same result).
+_HEDGEABLE_POLICIES = {"embedding", "query_embedding", "rerank"}
+# Policies that start from another one's OPENAI_CALL_POLICIES overrides (and add their own).
+_POLICY_PARENTS = {"query_embedding": "embedding"}
+# Need a few samples before a p95 estimate is meaningful enough to hedge on.
+_HEDGE_MIN_SAMPLES = 20
+_LATENCY_WINDOW_SIZE = 200
+# How often a waiting call re-checks its request's cancel scope.
+_CANCEL_POLL_S = 0.05
+_EXECUTOR_WORKERS = 32
+# Hedges are extra load by design; past this many in flight, slow calls are not duplicated.
+_MAX_HEDGES_IN_FLIGHT = _EXECUTOR_WORKERS // 4
+
+# Seconds left for the attempt running in this context (see `call_timeout`).
+_CALL_TIMEOUT: contextvars.ContextVar[float | None] = contextvars.ContextVar("openai_call_timeout", default=None)
+
+
+class OpenAICallTimeout(TimeoutError):
+    """Raised when an OpenAI call does not finish within its policy deadline."""
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """Retry/deadline/hedging behaviour for one kind of OpenAI call."""
+
+    name: str = "default"
+    max_retries: int = 0
+    backoff_base_ms: float = 250.0
+    backoff_max_ms: float = 4000.0
+    # Overall deadline across all attempts; None disables it.
+    deadline_s: float | None = None
+    hedge: bool = False
+    hedge_min_delay_ms: float = 100.0
+
+
+def get_call_policy(name: str, remaining_s: float | None = None) -> CallPolicy:
+    """Build the policy for `name` (embedding, query_embedding, rewrite, rerank, answer) from settings.
+
+    Global defaults come from `OPENAI_*` settings; `OPENAI_CALL_POLICIES` (JSON) can
+    override any field per operation, e.g. `{"rewrite": {"max_retries": 0, "deadline_s": 3}}`.
+    `remaining_s` (the request's leftover budget) caps the call deadline.
+    """
+
+    settings = get_settings()
+    policy = CallPolicy(
+        name=name,
+        max_retries=settings.openai_max_retries,
+        backoff_base_ms=settings.openai_backoff_base_ms,
+        backoff_max_ms=settings.openai_backoff_max_ms,
+        deadline_s=settings.openai_call_timeout_s or None,
+        hedge=bool(settings.enable_hedged_requests) and name in _HEDGEABLE_POLICIES,
+        hedge_min_delay_ms=settings.hedge_min_delay_ms,
+    )
+    overrides: dict[str, Any] = {}
+    for key in filter(None, (_POLICY_PARENTS.get(name), name)):
+        overrides.update(settings.openai_call_policies.get(key) or {})
+    overrides.pop("name", None)
+    if overrides.get("hedge") and name not in _HEDGEABLE_POLICIES:
+        # Never duplicate non-idempotent calls, even if misconfigured.
+        overrides["hedge"] = False
+    if overrides:
+        policy = replace(policy, **overrides)
+    if remaining_s is not None and (policy.deadline_s is None or remaining_s < policy.deadline_s):
+        policy = replace(policy, deadline_s=max(remaining_s, 0.001))
+    return policy
+
+
+class _LatencyWindow:
+    """Bounded window of recent successful calls: latency (for hedge delays) and token usage."""
+
+    def __init__(self, size: int = _LATENCY_WINDOW_SIZE) -> None:
+        self._lock = Lock()
+        self._samples: deque[float] = deque(maxlen=size)
+        self._tokens: deque[int] = deque(maxlen=size)
+
+    def observe(self, elapsed_ms: float, tokens_total: int | None = None) -> None:
+        with self._lock:
+            self._samples.append(float(elapsed_ms))
+            if tokens_total is not None:
+                self._tokens.append(int(tokens_total))
+
+    def mean_tokens(self) -> float | None:
+        with self._lock:
+            if not self._tokens:
+                return None
+            return sum(self._tokens) / len(self._tokens)
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if len(self._samples) < _HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+_LATENCY_WINDOWS: dict[str, _LatencyWindow] = {}
+_LATENCY_WINDOWS_LOCK = Lock()
+_EXECUTOR: ThreadPoolExecutor | None = None
+_HEDGES_LOCK = Lock()
+_hedges_in_flight = 0
+
+
+def _latency_window(name: str) -> _LatencyWindow:
+    with _LATENCY_WINDOWS_LOCK:
+        window = _LATENCY_WINDOWS.get(name)
+        if window is None:
+            window = _LatencyWindow()
+            _LATENCY_WINDOWS[name] = window
+        return window
+
+
+def observed_p95_ms(name: str) -> float | None:
+    """p95 of recent successful calls under policy `name`, or None until enough samples exist."""
+
+    with _LATENCY_WINDOWS_LOCK:
+        window = _LATENCY_WINDOWS.get(name)
+    return window.p95() if window is not None else None
+
+
+def observed_mean_tokens(name: str) -> float | None:
+    """Average tokens per successful call under policy `name`, or None if none observed yet."""
+
+    with _LATENCY_WINDOWS_LOCK:
+        window = _LATENCY_WINDOWS.get(name)
+    return window.mean_tokens() if window is not None else None
+
+
+def reset_latency_windows() -> None:
+    """Forget observed call latencies (used by tests)."""
+
+    with _LATENCY_WINDOWS_LOCK:
+        _LATENCY_WINDOWS.clear()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=_EXECUTOR_WORKERS, thread_name_prefix="openai-call")
+    return _EXECUTOR
+
 
 def _extract_total_tokens(resp: Any) -> int | None:
     usage = getattr(resp, "usage", None)
@@ -29,13 +182,84 @@ def _extract_total_tokens(resp: Any) -> int | None:
     return None
 
 
-def instrument_openai_call(*, operation: str, model: str, fn: Callable[[], T]) -> T:
-    """Time a call, update metrics, and emit a structured log event."""
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUS or exc.status_code >= 500
+    # APITimeoutError is a subclass of APIConnectionError.
+    return isinstance(exc, (APIConnectionError, OpenAICallTimeout, ConnectionError))
+
+
+def _retry_after_s(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
 
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay_s(policy: CallPolicy, attempt: int, exc: BaseException) -> float:
+    retry_after = _retry_after_s(exc)
+    if retry_after is not None:
+        return retry_after
+    # "Full jitter" exponential backoff.
+    cap_ms = min(policy.backoff_max_ms, policy.backoff_base_ms * (2**attempt))
+    return random.uniform(0.0, cap_ms) / 1000.0
+
+
+def _remaining_s(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+    return max(0.0, deadline - perf_counter())
+
+
+def call_timeout() -> float | None:
+    """Seconds left for the OpenAI call being made, to pass to the SDK as `timeout=`.
+
+    Call sites read it inside the `fn` given to `instrument_openai_call`. Without it a call
+    abandoned at its deadline (or a losing hedge) keeps its executor thread until the
+    upstream answers, and a slow upstream can exhaust the pool. None: no deadline.
+    """
+
+    return _CALL_TIMEOUT.get()
+
+
+def _observed_call(
+    *,
+    operation: str,
+    model: str,
+    fn: Callable[[], T],
+    policy: CallPolicy,
+    attempt: int,
+    hedged: bool,
+    deadline: float | None,
+) -> T:
+    """Run a single attempt: time it, update metrics, and emit a structured log event."""
+
+    timeout_s = _remaining_s(deadline)
+    if timeout_s is not None and timeout_s <= 0:
+        # Waited in the executor queue past the deadline; the caller has already given up.
+        raise OpenAICallTimeout(f"{operation} ({policy.name}) deadline passed before the call started")
+    token = _CALL_TIMEOUT.set(timeout_s)
     start = perf_counter()
     try:
         resp = fn()
-        return resp
     except Exception:
         elapsed_ms = (perf_counter() - start) * 1000.0
         get_metrics().observe_openai_call(elapsed_ms=elapsed_ms, tokens_total=None)
@@ -43,21 +267,195 @@ def instrument_openai_call(*, operation: str, model: str, fn: Callable[[], T]) -
             "openai_call_failed",
             operation=operation,
             model=model,
+            policy=policy.name,
+            attempt=attempt,
+            hedged=hedged,
             elapsed_ms=round(elapsed_ms, 2),
         )
         raise
     finally:
-        # If fn() raised, we already observed + logged exception above; keep this branch for success only.
-        # (Avoid double-counting by checking for 'resp' in locals.)
-        if "resp" in locals():
-            elapsed_ms = (perf_counter() - start) * 1000.0
-            tokens_total = _extract_total_tokens(locals()["resp"])
-            get_metrics().observe_openai_call(elapsed_ms=elapsed_ms, tokens_total=tokens_total)
-            structlog.get_logger("openai").info(
-                "openai_call",
+        _CALL_TIMEOUT.reset(token)
+
+    elapsed_ms = (perf_counter() - start) * 1000.0
+    tokens_total = _extract_total_tokens(resp)
+    get_metrics().observe_openai_call(elapsed_ms=elapsed_ms, tokens_total=tokens_total)
+    _latency_window(policy.name).observe(elapsed_ms, tokens_total)
+    scope = current_cancel_scope()
+    if scope is not None:
+        scope.record_completed_call(policy.name)
+    structlog.get_logger("openai").info(
+        "openai_call",
+        operation=operation,
+        model=model,
+        policy=policy.name,
+        attempt=attempt,
+        hedged=hedged,
+        elapsed_ms=round(elapsed_ms, 2),
+        tokens_total=tokens_total,
+    )
+    return resp
+
+
+def _abandon(future: Future) -> None:
+    """Stop waiting for a request; any tokens it still ends up consuming are counted as wasted."""
+
+    def _on_done(f: Future) -> None:
+        if f.cancelled() or f.exception() is not None:
+            return
+        tokens = _extract_total_tokens(f.result())
+        get_metrics().observe_openai_wasted_tokens(tokens)
+
+    if not future.cancel():
+        future.add_done_callback(_on_done)
+
+
+def _submit_hedge(executor: ThreadPoolExecutor, call: Callable[[], T]) -> Future | None:
+    """Start a hedge unless `_MAX_HEDGES_IN_FLIGHT` are already running (losers included)."""
+
+    global _hedges_in_flight
+    with _HEDGES_LOCK:
+        if _hedges_in_flight >= _MAX_HEDGES_IN_FLIGHT:
+            return None
+        _hedges_in_flight += 1
+
+    def _finished(_: Future) -> None:
+        global _hedges_in_flight
+        with _HEDGES_LOCK:
+            _hedges_in_flight -= 1
+
+    future = executor.submit(contextvars.copy_context().run, call)
+    future.add_done_callback(_finished)
+    return future
+
+
+def _wait_first(
+    pending: set[Future],
+    timeout_s: float | None,
+    scope: CancelScope | None,
+) -> tuple[set[Future], set[Future]]:
+    """`wait(FIRST_COMPLETED)` that also wakes up when the request is cancelled."""
+
+    if scope is None:
+        return wait(pending, timeout=timeout_s, return_when=FIRST_COMPLETED)
+
+    give_up_at = None if timeout_s is None else perf_counter() + timeout_s
+    while True:
+        slice_s = _CANCEL_POLL_S if give_up_at is None else min(_CANCEL_POLL_S, max(0.0, give_up_at - perf_counter()))
+        done, not_done = wait(pending, timeout=slice_s, return_when=FIRST_COMPLETED)
+        if done or scope.cancelled or (give_up_at is not None and perf_counter() >= give_up_at):
+            return done, not_done
+
+
+def _run_attempt(
+    *,
+    operation: str,
+    model: str,
+    fn: Callable[[], T],
+    policy: CallPolicy,
+    attempt: int,
+    deadline: float | None,
+) -> T:
+    kwargs = dict(operation=operation, model=model, fn=fn, policy=policy, attempt=attempt, deadline=deadline)
+    scope = current_cancel_scope()
+    if deadline is None and not policy.hedge and scope is None:
+        return _observed_call(hedged=False, **kwargs)
+
+    # Run in a worker thread so we can stop waiting at the deadline, on cancellation, or race
+    # a hedge. Each submit gets its own context copy so structlog contextvars (request_id, ...)
+    # and the cancel scope follow.
+    executor = _get_executor()
+    primary = executor.submit(contextvars.copy_context().run, lambda: _observed_call(hedged=False, **kwargs))
+    pending: set[Future] = {primary}
+    hedge: Future | None = None
+
+    p95_ms = _latency_window(policy.name).p95() if policy.hedge else None
+    if p95_ms is not None:
+        hedge_delay_s = max(p95_ms, policy.hedge_min_delay_ms) / 1000.0
+        remaining = _remaining_s(deadline)
+        done, _ = _wait_first(pending, hedge_delay_s if remaining is None else min(hedge_delay_s, remaining), scope)
+        if not done and not (scope and scope.cancelled) and (remaining is None or remaining > hedge_delay_s):
+            hedge = _submit_hedge(executor, lambda: _observed_call(hedged=True, **kwargs))
+            if hedge is not None:
+                pending.add(hedge)
+                get_metrics().observe_openai_hedge()
+
+    last_exc: BaseException | None = None
+    while pending:
+        done, pending = _wait_first(pending, _remaining_s(deadline), scope)
+        if not done:
+            break
+        for future in done:
+            exc = future.exception()
+            if exc is None:
+                for loser in pending:
+                    _abandon(loser)
+                if future is hedge:
+                    get_metrics().observe_openai_hedge_win()
+                return future.result()
+            last_exc = exc
+
+    if pending:
+        for future in pending:
+            _abandon(future)
+        if scope is not None and scope.cancelled:
+            raise RequestCancelled(scope.reason or "cancelled")
+        get_metrics().observe_openai_timeout()
+        raise OpenAICallTimeout(f"{operation} ({policy.name}) exceeded {policy.deadline_s}s deadline")
+    assert last_exc is not None
+    raise last_exc
+
+
+def instrument_openai_call(
+    *,
+    operation: str,
+    model: str,
+    fn: Callable[[], T],
+    policy: CallPolicy | None = None,
+) -> T:
+    """Call `fn` under `policy` (retries, deadline, hedging), updating metrics and logs.
+
+    Without a policy this is a single timed attempt, as before. If the current request's
+    cancel scope fires, the call stops waiting and raises `RequestCancelled`.
+    """
+
+    policy = policy or CallPolicy()
+    deadline = perf_counter() + policy.deadline_s if policy.deadline_s else None
+    scope = current_cancel_scope()
+    attempt = 0
+    while True:
+        if scope is not None:
+            scope.raise_if_cancelled()
+        try:
+            return _run_attempt(
                 operation=operation,
                 model=model,
-                elapsed_ms=round(elapsed_ms, 2),
-                tokens_total=tokens_total,
+                fn=fn,
+                policy=policy,
+                attempt=attempt,
+                deadline=deadline,
             )
+        except RequestCancelled:
+            raise
+        except Exception as exc:
+            if attempt >= policy.max_retries or not _is_retryable(exc):
+                raise
+            delay_s = _backoff_delay_s(policy, attempt, exc)
+            remaining = _remaining_s(deadline)
+            if remaining is not None and delay_s >= remaining:
+                raise
 
+            get_metrics().observe_openai_retry()
+            structlog.get_logger("openai").warning(
+                "openai_call_retry",
+                operation=operation,
+                model=model,
+                policy=policy.name,
+                attempt=attempt,
+                delay_ms=round(delay_s * 1000.0, 2),
+                error=type(exc).__name__,
+            )
+            if scope is not None:
+                scope.wait(delay_s)
+            else:
+                time.sleep(delay_s)
+            attempt += 1
@@ -0,0 +1,111 @@
+"""Answer many questions in one request (FAQ generation, audits, evaluation runs).
+
+Work that does not depend on the question is shared across the batch: all retrieval
+queries are embedded in one embeddings request and searched in one database round trip
+(`search_many`). The LLM stages that are per question by nature (rewrite, rerank and
+answer) run on a thread pool of BATCH_CHAT_CONCURRENCY workers, so a large batch neither
+serialises on them nor floods the API.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.models import User
+from app.models.schemas import BatchChatResult, ChatDebug, ChatResponse, GateDecision, RetrievedChunk
+from app.observability.openai import OpenAICallTimeout
+from app.rag.embedding import get_embedding_space, get_embeddings
+from app.rag.prompting import NO_CONTEXT_ANSWER, generate_answer
+from app.rag.retrieval import _dedupe, rerank_stage, rewrite_stage, search_many
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchQuery:
+    """Retrieval state of one question of a batch, ready for rerank and answer."""
+
+    index: int
+    query: str
+    rewritten_query: str = ""
+    initial_chunks: list[RetrievedChunk] = field(default_factory=list)
+    skipped_stages: list[str] = field(default_factory=list)
+    gate_decisions: list[GateDecision] = field(default_factory=list)
+
+
+def _pool(size: int, name: str) -> ThreadPoolExecutor:
+    workers = max(1, min(get_settings().batch_chat_concurrency, size))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+
+def retrieve_batch(db: Session, user: User, queries: Sequence[str]) -> list[BatchQuery]:
+    """Rewrite every query (bounded concurrency), embed them in one request, search in one."""
+
+    settings = get_settings()
+    batch = [BatchQuery(index=i, query=q) for i, q in enumerate(queries)]
+    with _pool(len(batch), "batch-rewrite") as pool:
+        rewritten = pool.map(
+            lambda item: contextvars.copy_context().run(
+                rewrite_stage, item.query, None, item.skipped_stages, item.gate_decisions
+            ),
+            batch,
+        )
+        for item, query in zip(batch, rewritten):
+            item.rewritten_query = query
+
+    space = get_embedding_space(user.embedding_space)
+    texts = [item.rewritten_query for item in batch]
+    vectors = get_embeddings(texts, batch_size=len(texts), space=space)
+    for item, hits in zip(batch, search_many(db, user, vectors, settings.top_k, space)):
+        item.initial_chunks = _dedupe(hits)
+    return batch
+
+
+def _answer(item: BatchQuery, debug: bool) -> BatchChatResult:
+    settings = get_settings()
+    try:
+        chunks = rerank_stage(item.query, item.initial_chunks, None, item.skipped_stages, item.gate_decisions)
+        if not chunks:
+            response = ChatResponse(answer=NO_CONTEXT_ANSWER, citations=[])
+        else:
+            response = generate_answer(query=item.query, chunks=chunks)
+    except OpenAICallTimeout:
+        return BatchChatResult(index=item.index, query=item.query, error="Answer generation timed out")
+    except Exception as exc:  # noqa: BLE001 - one failed question must not end the batch
+        logger.exception("chat.batch_item_failed", extra={"index": item.index})
+        return BatchChatResult(index=item.index, query=item.query, error=f"{type(exc).__name__}: {exc}")
+
+    if debug:
+        response.debug = ChatDebug(
+            user_query=item.query,
+            rewritten_query=item.rewritten_query,
+            initial_chunks=item.initial_chunks,
+            final_chunks=chunks,
+            rewrite_enabled=bool(settings.enable_query_rewrite),
+            rerank_enabled=bool(settings.enable_rerank),
+            skipped_stages=item.skipped_stages,
+            gate_decisions=item.gate_decisions,
+        )
+    return BatchChatResult(index=item.index, query=item.query, response=response)
+
+
+def answer_batch(batch: list[BatchQuery], ordered: bool = True, debug: bool = False) -> Iterator[BatchChatResult]:
+    """Rerank and answer each question, yielding in request order or as each completes.
+
+    Closing the iterator early (the client went away) cancels the questions not yet started.
+    """
+
+    pool = _pool(len(batch), "batch-answer")
+    try:
+        futures = [pool.submit(contextvars.copy_context().run, _answer, item, debug) for item in batch]
+        for future in futures if ordered else as_completed(futures):
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
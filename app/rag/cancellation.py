@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Event, Lock
+
+
+class RequestCancelled(Exception):
+    """Raised inside the pipeline once the request that started it has been cancelled."""
+
+
+class CancelScope:
+    """Cooperative cancellation for one request.
+
+    Pipeline code checks it between stages (and while waiting on OpenAI calls);
+    `on_cancel` callbacks let blocking work such as DB queries be interrupted.
+    """
+
+    def __init__(self) -> None:
+        self._event = Event()
+        self._lock = Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.reason: str | None = None
+        # Policy names (embedding, rewrite, ...) of OpenAI calls that completed in this scope.
+        self.completed_calls: list[str] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # Best effort: an interrupt that fails must not mask the cancellation.
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelled(self.reason or "cancelled")
+
+    def wait(self, timeout: float | None) -> bool:
+        """Sleep up to `timeout` seconds; returns True early if cancelled."""
+
+        return self._event.wait(timeout)
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """Run `callback` if the scope is cancelled while the block is executing."""
+
+        with self._lock:
+            self._callbacks.append(callback)
+        try:
+            self.raise_if_cancelled()
+            yield
+        except RequestCancelled:
+            raise
+        except Exception as exc:
+            # The interrupt usually surfaces as a driver error; report it as a cancellation.
+            if self.cancelled:
+                raise RequestCancelled(self.reason or "cancelled") from exc
+            raise
+        finally:
+            with self._lock:
+                self._callbacks.remove(callback)
+
+    def record_completed_call(self, policy_name: str) -> None:
+        with self._lock:
+            self.completed_calls.append(policy_name)
+
+
+_CURRENT_SCOPE: ContextVar[CancelScope | None] = ContextVar("cancel_scope", default=None)
+
+
+def current_cancel_scope() -> CancelScope | None:
+    return _CURRENT_SCOPE.get()
+
+
+@contextmanager
+def bind_cancel_scope(scope: CancelScope) -> Iterator[CancelScope]:
+    """Make `scope` the current one; worker threads started with a copied context inherit it."""
+
+    token = _CURRENT_SCOPE.set(scope)
+    try:
+        yield scope
+    finally:
+        _CURRENT_SCOPE.reset(token)
+
+
+def raise_if_cancelled() -> None:
+    scope = _CURRENT_SCOPE.get()
+    if scope is not None:
+        scope.raise_if_cancelled()
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import re
+from collections.abc import Iterable, Iterator
+
 from app.models.schemas import Chunk
 
+# How far past chunk_size a split point may land; also the chunker's lookahead.
+_SPLIT_SLACK = 100
+_NON_SPACE = re.compile(r"\S")  # same character class as str.isspace()
+
 
 def _find_split(text: str, start: int, target_end: int, max_end: int) -> int:
     """Find a friendly split point near target_end."""
-    window = text[start:max_end]
-    if not window.strip():
+    # Probe for any non-space character in place instead of slicing and stripping the window.
+    if _NON_SPACE.search(text, start, max_end) is None:
         return max_end
 
     preferred_markers = ["\n\n", ". ", "\n", " "]
@@ -20,16 +27,7 @@ def _find_split(text: str, start: int, target_end: int, max_end: int) -> int:
     return min(target_end, max_end)
 
 
-def chunk_text(text: str, chunk_size: int, overlap: int) -> list[Chunk]:
-    """
-    Split text into fixed-size chunks with overlap.
-
-    The splitter attempts to end chunks on paragraph/sentence boundaries while
-    keeping chunk size close to the configured maximum.
-    """
-    if not text or not text.strip():
-        return []
-
+def _validate(chunk_size: int, overlap: int) -> None:
     if chunk_size <= 0:
         raise ValueError("chunk_size must be greater than zero")
 
@@ -39,40 +37,99 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> list[Chunk]:
     if overlap >= chunk_size:
         raise ValueError("overlap must be smaller than chunk_size")
 
-    normalized = text.replace("\r\n", "\n").strip()
-    text_len = len(normalized)
-    chunks: list[Chunk] = []
+
+def _normalized(segments: Iterable[str]) -> Iterator[str]:
+    """Apply `replace("\\r\\n", "\\n")` and leading `strip()` across segment boundaries."""
+
+    carry = ""
+    leading = True
+    for segment in segments:
+        piece = carry + segment
+        carry = ""
+        if piece.endswith("\r"):
+            # Might be the first half of a "\r\n" split across segments.
+            piece, carry = piece[:-1], "\r"
+        piece = piece.replace("\r\n", "\n")
+        if leading:
+            piece = piece.lstrip()
+            leading = not piece
+        if piece:
+            yield piece
+    if carry and not leading:
+        yield carry
+
+
+def iter_chunks(segments: Iterable[str], chunk_size: int, overlap: int) -> Iterator[Chunk]:
+    """
+    Streaming form of `chunk_text` over the concatenation of `segments`.
+
+    Yields exactly the chunks (text and global offsets) that `chunk_text("".join(segments))`
+    returns, while holding only about `chunk_size + 100` characters beyond the current
+    chunk start (plus the segment being read). Trailing whitespace is only known to be
+    trailing at the end of input, so the window is kept until a later non-space arrives.
+    """
+    _validate(chunk_size, overlap)
+
+    pieces = _normalized(segments)
+    buf = ""  # normalized text from global offset `base`
+    base = 0
+    text_len = 0  # global length up to the last non-whitespace character seen
+    exhausted = False
 
     start = 0
     index = 0
-    while start < text_len:
+    while True:
+        # Read until the split window is fully known: text_len beyond max_end means neither
+        # the end-of-text shortcut nor trailing-whitespace stripping can affect this chunk.
+        while not exhausted and text_len <= start + chunk_size + _SPLIT_SLACK:
+            piece = next(pieces, None)
+            if piece is None:
+                exhausted = True
+                break
+            offset = base + len(buf)
+            buf += piece
+            kept = len(piece.rstrip())
+            if kept:
+                text_len = offset + kept
+
+        if start >= text_len:
+            return
+
         target_end = min(start + chunk_size, text_len)
-        max_end = min(start + chunk_size + 100, text_len)
+        max_end = min(start + chunk_size + _SPLIT_SLACK, text_len)
         if target_end == text_len:
             end = text_len
         else:
-            end = _find_split(normalized, start, target_end, max_end)
+            end = base + _find_split(buf, start - base, target_end - base, max_end - base)
         if end <= start:
             end = target_end
 
-        chunk_text_value = normalized[start:end].strip()
+        chunk_text_value = buf[start - base : end - base].strip()
         if chunk_text_value:
-            chunks.append(
-                Chunk(
-                    text=chunk_text_value,
-                    chunk_index=index,
-                    start_char=start,
-                    end_char=end,
-                )
-            )
+            yield Chunk(text=chunk_text_value, chunk_index=index, start_char=start, end_char=end)
             index += 1
 
         if end >= text_len:
-            break
+            return
 
         next_start = max(0, end - overlap)
         if next_start <= start:
             next_start = end
         start = next_start
+        # Drop consumed text once it is most of the buffer; amortized O(1) per character.
+        if start - base > len(buf) // 2:
+            buf = buf[start - base :]
+            base = start
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> list[Chunk]:
+    """
+    Split text into fixed-size chunks with overlap.
+
+    The splitter attempts to end chunks on paragraph/sentence boundaries while
+    keeping chunk size close to the configured maximum.
+    """
+    if not text or not text.strip():
+        return []
 
-    return chunks
+    return list(iter_chunks([text], chunk_size=chunk_size, overlap=overlap))
@@ -0,0 +1,114 @@
+"""Fit retrieved chunks into the answer prompt.
+
+Neighbouring chunks of a document repeat up to CHUNK_OVERLAP characters, so chunks that
+are adjacent in `chunk_index` are merged into one passage carrying that text once. Passages
+are packed greedily in rank order until CONTEXT_TOKEN_BUDGET is spent; each becomes one
+numbered source in the prompt, so citation numbers refer to passages.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+from app.models.schemas import RetrievedChunk
+from app.rag.embedding import estimate_tokens
+
+
+def chunk_tokens(chunk: RetrievedChunk) -> int:
+    """Stored token count of `chunk`, estimated for rows indexed before counts were stored."""
+
+    return chunk.token_count if chunk.token_count is not None else estimate_tokens([chunk.text])
+
+
+def _overlap(left: str, right: str, span: int) -> int:
+    """Length of the longest prefix of `right`, at most `span` characters, that `left` ends with.
+
+    Chunk text is stripped, so the offsets only bound the shared text; the match finds it.
+    """
+
+    for size in range(min(span, len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+@dataclass(frozen=True)
+class _Passage:
+    best: RetrievedChunk  # the best-ranked chunk in the passage; its rank places the passage
+    first_index: int
+    last_index: int
+    start_char: int
+    end_char: int
+    text: str
+    tokens: int
+
+    @classmethod
+    def of(cls, chunk: RetrievedChunk) -> _Passage:
+        return cls(chunk, chunk.chunk_index, chunk.chunk_index, chunk.start_char, chunk.end_char, chunk.text, chunk_tokens(chunk))
+
+    def adjacent(self, other: _Passage) -> bool:
+        return (
+            self.best.doc_id == other.best.doc_id
+            and other.first_index <= self.last_index + 1
+            and self.first_index <= other.last_index + 1
+        )
+
+    def merge(self, other: _Passage) -> _Passage:
+        """One passage covering both; the shared overlap is kept once and not counted twice."""
+
+        left, right = (self, other) if self.first_index <= other.first_index else (other, self)
+        shared = _overlap(left.text, right.text, left.end_char - right.start_char)
+        text = f"{left.text}{right.text[shared:]}" if shared else f"{left.text}\n{right.text}"
+        added = math.ceil(right.tokens * (len(right.text) - shared) / max(1, len(right.text)))
+        return _Passage(
+            best=self.best,
+            first_index=left.first_index,
+            last_index=max(left.last_index, right.last_index),
+            start_char=left.start_char,
+            end_char=max(left.end_char, right.end_char),
+            text=text,
+            tokens=left.tokens + added,
+        )
+
+    def to_chunk(self) -> RetrievedChunk:
+        return self.best.model_copy(
+            update={
+                "text": self.text,
+                "chunk_index": self.first_index,
+                "start_char": self.start_char,
+                "end_char": self.end_char,
+                "token_count": self.tokens,
+            }
+        )
+
+
+def pack_context(chunks: list[RetrievedChunk], token_budget: int) -> list[RetrievedChunk]:
+    """Merge adjacent chunks and keep, in rank order, what fits in `token_budget` (0: no limit).
+
+    A chunk that does not fit is skipped and later, smaller ones are still tried. The
+    best-ranked chunk is always kept, even when it alone exceeds the budget.
+    """
+
+    passages: list[_Passage] = []
+    for chunk in chunks:
+        candidate = _Passage.of(chunk)
+        if any(p.best.doc_id == chunk.doc_id and p.first_index <= chunk.chunk_index <= p.last_index for p in passages):
+            continue  # already in the context
+        # Join every passage the chunk touches: one neighbour, or two when it fills the gap
+        # between them. The result keeps the place of the best-ranked one.
+        touching = [p for p in passages if p.adjacent(candidate)]
+        merged = candidate
+        if touching:
+            merged = touching[0].merge(candidate)
+            for passage in touching[1:]:
+                merged = merged.merge(passage)
+        others = sum(p.tokens for p in passages if not any(p is t for t in touching))
+        if token_budget and passages and others + merged.tokens > token_budget:
+            continue
+        if touching:
+            passages = [merged if p is touching[0] else p for p in passages if not any(p is t for t in touching[1:])]
+        else:
+            passages.append(merged)
+
+    return [passage.to_chunk() for passage in passages]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from time import perf_counter
+
+from app.config import get_settings
+from app.observability.openai import observed_p95_ms
+
+
+class Deadline:
+    """Time budget for one chat request, shared by every pipeline stage."""
+
+    def __init__(self, budget_ms: float) -> None:
+        self.budget_ms = float(budget_ms)
+        self._expires_at = perf_counter() + self.budget_ms / 1000.0
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self._expires_at - perf_counter()) * 1000.0)
+
+    def remaining_s(self) -> float:
+        return self.remaining_ms() / 1000.0
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0.0
+
+    def can_afford(self, *stages: str) -> bool:
+        """True if the remaining budget covers the estimated cost of all `stages`."""
+
+        return self.remaining_ms() >= sum(stage_cost_ms(stage) for stage in stages)
+
+
+def stage_cost_ms(stage: str) -> float:
+    """Estimated cost of a stage: observed p95 once known, otherwise the configured budget."""
+
+    settings = get_settings()
+    if stage == "rerank" and settings.rerank_mode == "local":
+        return 0.0
+
+    observed = observed_p95_ms(stage)
+    if observed is not None:
+        return observed
+
+    configured = {
+        "query_embedding": settings.embedding_budget_ms,
+        "rewrite": settings.rewrite_budget_ms,
+        "rerank": settings.rerank_budget_ms,
+        "answer": settings.answer_budget_ms,
+    }
+    return float(configured.get(stage, 0.0))
+
+
+def resolve_deadline(payload_deadline_ms: int | None, header_value: str | None) -> Deadline | None:
+    """Pick the request budget: request body, then `X-Request-Deadline-Ms`, then `CHAT_DEADLINE_MS`."""
+
+    budget_ms: float | None = payload_deadline_ms
+    if budget_ms is None and header_value:
+        try:
+            budget_ms = float(header_value)
+        except ValueError as exc:
+            raise ValueError("X-Request-Deadline-Ms must be a number of milliseconds") from exc
+    if budget_ms is None:
+        budget_ms = get_settings().chat_deadline_ms or None
+    if budget_ms is None:
+        return None
+    if budget_ms <= 0:
+        raise ValueError("Deadline must be positive")
+    return Deadline(budget_ms)
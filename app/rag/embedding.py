@@ -1,43 +1,131 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
 
 from openai import OpenAI
 
 from app.config import get_settings
-from app.observability.openai import instrument_openai_call
+from app.observability.openai import call_timeout, get_call_policy, instrument_openai_call
+from app.rag.deadline import Deadline
 
 _client: Any | None = None
 
+DEFAULT_SPACE = "default"
+
+
+@dataclass(frozen=True)
+class EmbeddingSpace:
+    """A named model/dimension combination; chunks can hold a vector in several spaces."""
+
+    name: str
+    model: str
+    dims: int | None = None  # None: the model's native size (no `dimensions` parameter sent)
+    price_per_mtok: float = 0.0  # USD per million input tokens, for backfill cost estimates
+
+    def estimate_cost_usd(self, tokens: int) -> float:
+        return tokens * self.price_per_mtok / 1_000_000
+
+
+def get_embedding_spaces() -> dict[str, EmbeddingSpace]:
+    """Spaces from EMBEDDING_SPACES plus "default", which follows EMBEDDING_MODEL.
+
+    Startup refuses a changed model for a space that already holds vectors (see
+    app.services.embedding_backfill.pin_embedding_spaces).
+    """
+
+    settings = get_settings()
+    spaces = {
+        DEFAULT_SPACE: EmbeddingSpace(
+            name=DEFAULT_SPACE, model=settings.embedding_model, price_per_mtok=settings.embedding_price_per_mtok
+        )
+    }
+    for name, spec in settings.embedding_spaces.items():
+        if name == DEFAULT_SPACE:
+            continue
+        spaces[name] = EmbeddingSpace(
+            name=name,
+            model=str(spec.get("model") or settings.embedding_model),
+            dims=int(spec["dims"]) if spec.get("dims") else None,
+            price_per_mtok=float(spec.get("price_per_mtok", 0.0)),
+        )
+    return spaces
+
+
+def get_embedding_space(name: str | None = None) -> EmbeddingSpace:
+    """Look up a configured space (EMBEDDING_SPACE when `name` is None)."""
+
+    key = name or get_settings().embedding_space
+    space = get_embedding_spaces().get(key)
+    if space is None:
+        raise ValueError(f"Unknown embedding space: {key}")
+    return space
+
+
+def estimate_tokens(texts: list[str]) -> int:
+    """Rough token count (~4 characters per token) used for progress and cost reporting."""
+
+    return sum(max(1, len(t) // 4) for t in texts)
+
 
 def set_embedding_client(client: Any | None) -> None:
     global _client
     _client = client
+    _native_dims.cache_clear()
 
 
 def get_embedding_client() -> Any:
     global _client
     if _client is None:
         settings = get_settings()
-        _client = OpenAI(api_key=settings.openai_api_key)
+        # Retries are handled by instrument_openai_call's CallPolicy.
+        _client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
     return _client
 
 
-def get_embeddings(texts: list[str], batch_size: int = 100) -> list[list[float]]:
+def get_embeddings(
+    texts: list[str],
+    batch_size: int = 100,
+    deadline: Deadline | None = None,
+    space: EmbeddingSpace | None = None,
+    policy: str = "embedding",
+) -> list[list[float]]:
+    """Embed `texts` in `space`, `batch_size` per call.
+
+    Chat's query embedding runs under its own `query_embedding` policy, so its latency
+    window (which deadline stage costs are estimated from) is not dominated by indexing
+    and backfill batches.
+    """
     if not texts:
         return []
 
-    settings = get_settings()
+    space = space or get_embedding_space(DEFAULT_SPACE)
     client = get_embedding_client()
     vectors: list[list[float]] = []
+    params: dict[str, Any] = {"model": space.model}
+    if space.dims:
+        params["dimensions"] = space.dims
 
     for i in range(0, len(texts), batch_size):
         batch = texts[i : i + batch_size]
         response = instrument_openai_call(
             operation="embeddings.create",
-            model=settings.embedding_model,
-            fn=lambda: client.embeddings.create(model=settings.embedding_model, input=batch),
+            model=space.model,
+            policy=get_call_policy(policy, remaining_s=deadline.remaining_s() if deadline else None),
+            fn=lambda: client.embeddings.create(input=batch, timeout=call_timeout(), **params),
         )
         vectors.extend([item.embedding for item in response.data])
 
     return vectors
+
+
+@lru_cache(maxsize=16)
+def _native_dims(model: str) -> int:
+    return len(get_embeddings(["dimension probe"], space=EmbeddingSpace(name="probe", model=model))[0])
+
+
+def embedding_dims(space: EmbeddingSpace) -> int:
+    """Size of the vectors `space` produces: its `dims`, else the model's, probed once with a one-text call."""
+
+    return space.dims or _native_dims(space.model)
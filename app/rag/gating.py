@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from app.config import get_settings
+from app.models.schemas import GateDecision, RetrievedChunk
+
+_QUESTION_WORDS = frozenset(
+    "what why how when where which who whom whose can could should would does do did is are explain describe compare".split()
+)
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class GateThresholds:
+    rewrite_max_terms: int
+    # None: never skip rerank on this signal (calibration found no safe value).
+    rerank_margin: float | None
+    rerank_zscore: float | None
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "GateThresholds":
+        def optional(key: str) -> float | None:
+            return None if payload.get(key) is None else float(payload[key])
+
+        return cls(
+            rewrite_max_terms=int(payload.get("rewrite_max_terms", 0)),
+            rerank_margin=optional("rerank_margin"),
+            rerank_zscore=optional("rerank_zscore"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "rewrite_max_terms": self.rewrite_max_terms,
+            "rerank_margin": self.rerank_margin,
+            "rerank_zscore": self.rerank_zscore,
+        }
+
+
+@lru_cache(maxsize=8)
+def _load_thresholds_file(path: str) -> GateThresholds:
+    return GateThresholds.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def get_gate_thresholds() -> GateThresholds:
+    """Thresholds from GATE_THRESHOLDS_PATH (`python -m app.eval.calibrate_gates`), else the settings."""
+
+    settings = get_settings()
+    path = settings.gate_thresholds_path
+    if path and Path(path).exists():
+        return _load_thresholds_file(path)
+    return GateThresholds(
+        rewrite_max_terms=settings.rewrite_gate_max_terms,
+        rerank_margin=settings.rerank_gate_margin,
+        rerank_zscore=settings.rerank_gate_zscore,
+    )
+
+
+def is_keyword_query(user_query: str, max_terms: int) -> bool:
+    words = _WORD_RE.findall(user_query.lower())
+    return len(words) <= max_terms and "?" not in user_query and not (words and words[0] in _QUESTION_WORDS)
+
+
+def rerank_signals(scores: list[float]) -> tuple[float, float | None]:
+    """(top-1/top-2 margin, z-score of the top score over the rest) for scores sorted descending."""
+
+    margin = scores[0] - scores[1]
+    rest = scores[1:]
+    if len(rest) < 2:
+        return margin, None
+    mean = sum(rest) / len(rest)
+    std = math.sqrt(sum((s - mean) ** 2 for s in rest) / len(rest))
+    return margin, (scores[0] - mean) / std if std > 0 else None
+
+
+def rewrite_gate(user_query: str) -> GateDecision:
+    """Skip rewrite for short keyword-style queries: they are already good search queries."""
+
+    words = _WORD_RE.findall(user_query.lower())
+    if is_keyword_query(user_query, get_gate_thresholds().rewrite_max_terms):
+        return GateDecision(stage="rewrite", run=False, reason="keyword_query", value=float(len(words)))
+    return GateDecision(stage="rewrite", run=True, reason="natural_language_query", value=float(len(words)))
+
+
+def rerank_gate(chunks: list[RetrievedChunk]) -> GateDecision:
+    """Skip rerank when first-stage scores already single out a clear winner.
+
+    Two signals, each with its own threshold: the top-1/top-2 score margin, and how far the
+    top score sits above the rest of the candidates in standard deviations.
+    """
+
+    thresholds = get_gate_thresholds()
+    if len(chunks) < 2:
+        return GateDecision(stage="rerank", run=False, reason="single_candidate")
+
+    margin, z = rerank_signals(sorted((c.score for c in chunks), reverse=True))
+    if thresholds.rerank_margin is not None and margin >= thresholds.rerank_margin:
+        return GateDecision(stage="rerank", run=False, reason="score_margin", value=round(margin, 4))
+    if thresholds.rerank_zscore is not None and z is not None and z >= thresholds.rerank_zscore:
+        return GateDecision(stage="rerank", run=False, reason="score_outlier", value=round(z, 4))
+
+    return GateDecision(stage="rerank", run=True, reason="ambiguous_scores", value=round(margin, 4))
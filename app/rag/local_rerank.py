@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from app.config import get_settings
+from app.models.schemas import RetrievedChunk
+
+FEATURE_NAMES = ("overlap", "bm25", "proximity", "vector")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Small stopword list: enough to keep question words from dominating lexical features.
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it its of on or that the this to "
+    "was what when where which who why will with".split()
+)
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+@dataclass(frozen=True)
+class LocalRerankWeights:
+    bias: float
+    weights: tuple[float, ...]
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "LocalRerankWeights":
+        raw = payload.get("weights", {})
+        return cls(bias=float(payload.get("bias", 0.0)), weights=tuple(float(raw.get(name, 0.0)) for name in FEATURE_NAMES))
+
+    def to_dict(self) -> dict:
+        return {"bias": self.bias, "weights": dict(zip(FEATURE_NAMES, self.weights))}
+
+
+# Hand-tuned starting point; `python -m app.eval.train_reranker` fits replacements from the eval set.
+DEFAULT_WEIGHTS = LocalRerankWeights(bias=0.0, weights=(1.0, 1.5, 0.5, 1.0))
+
+
+@lru_cache(maxsize=8)
+def _load_weights_file(path: str) -> LocalRerankWeights:
+    return LocalRerankWeights.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def get_local_rerank_weights() -> LocalRerankWeights:
+    path = get_settings().local_rerank_weights_path
+    if path and Path(path).exists():
+        return _load_weights_file(path)
+    return DEFAULT_WEIGHTS
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _proximity(query_terms: set[str], tokens: list[str]) -> float:
+    """Density of the tightest window covering every matched query term (1.0 = adjacent)."""
+
+    positions = [(i, t) for i, t in enumerate(tokens) if t in query_terms]
+    needed = {t for _, t in positions}
+    if len(needed) < 2:
+        return 1.0 if needed else 0.0
+
+    best = len(tokens)
+    counts: Counter[str] = Counter()
+    covered = 0
+    left = 0
+    for right in range(len(positions)):
+        term = positions[right][1]
+        counts[term] += 1
+        if counts[term] == 1:
+            covered += 1
+        while covered == len(needed):
+            best = min(best, positions[right][0] - positions[left][0] + 1)
+            left_term = positions[left][1]
+            counts[left_term] -= 1
+            if counts[left_term] == 0:
+                covered -= 1
+            left += 1
+    return len(needed) / best
+
+
+def feature_matrix(query: str, chunks: list[RetrievedChunk]) -> list[list[float]]:
+    """One row of FEATURE_NAMES values per chunk.
+
+    BM25 statistics (IDF, average length) are computed over the candidate set itself,
+    so no corpus-wide index is needed. Lexical features are scaled to [0, 1].
+    """
+
+    query_terms = set(tokenize(query))
+    docs = [tokenize(c.text) for c in chunks]
+    n_docs = len(docs)
+    avg_len = (sum(len(d) for d in docs) / n_docs) if n_docs else 0.0
+    doc_freq: Counter[str] = Counter()
+    for tokens in docs:
+        doc_freq.update(set(tokens) & query_terms)
+    idf = {t: math.log(1.0 + (n_docs - doc_freq[t] + 0.5) / (doc_freq[t] + 0.5)) for t in query_terms}
+
+    rows: list[list[float]] = []
+    for chunk, tokens in zip(chunks, docs):
+        tf = Counter(t for t in tokens if t in query_terms)
+        overlap = (len(tf) / len(query_terms)) if query_terms else 0.0
+        norm = _BM25_K1 * (1.0 - _BM25_B + _BM25_B * (len(tokens) / avg_len if avg_len else 0.0))
+        bm25 = sum(idf[t] * (f * (_BM25_K1 + 1.0)) / (f + norm) for t, f in tf.items())
+        rows.append([overlap, bm25, _proximity(query_terms, tokens), float(chunk.score)])
+
+    max_bm25 = max((r[1] for r in rows), default=0.0)
+    if max_bm25 > 0:
+        for r in rows:
+            r[1] /= max_bm25
+    return rows
+
+
+def score_chunks(query: str, chunks: list[RetrievedChunk], weights: LocalRerankWeights | None = None) -> list[float]:
+    w = weights or get_local_rerank_weights()
+    return [w.bias + sum(x * c for x, c in zip(row, w.weights)) for row in feature_matrix(query, chunks)]
+
+
+def local_rerank(query: str, chunks: list[RetrievedChunk], top_n: int) -> list[str]:
+    """Rank chunk ids best-first by the weighted feature score (ties keep vector order)."""
+
+    scores = score_chunks(query, chunks)
+    order = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+    return [chunks[i].id for i in order[:top_n]]
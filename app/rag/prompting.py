@@ -7,10 +7,15 @@ from openai import OpenAI
 
 from app.config import get_settings
 from app.models.schemas import ChatResponse, Citation, RetrievedChunk
-from app.observability.openai import instrument_openai_call
+from app.observability.openai import call_timeout, get_call_policy, instrument_openai_call
+from app.rag.context_packing import pack_context
+from app.rag.deadline import Deadline
 
 _chat_client: Any | None = None
 
+# Returned instead of calling the model when retrieval found nothing to answer from.
+NO_CONTEXT_ANSWER = "I could not find relevant context in uploaded documents. Could you clarify your question?"
+
 
 def set_chat_client(client: Any | None) -> None:
     global _chat_client
@@ -21,7 +26,7 @@ def get_chat_client() -> Any:
     global _chat_client
     if _chat_client is None:
         settings = get_settings()
-        _chat_client = OpenAI(api_key=settings.openai_api_key)
+        _chat_client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
     return _chat_client
 
 
@@ -60,18 +65,22 @@ def _extract_citation_numbers(answer: str) -> list[int]:
     return ordered
 
 
-def generate_answer(query: str, chunks: list[RetrievedChunk]) -> ChatResponse:
-    messages = build_prompt(query=query, chunks=chunks)
+def generate_answer(query: str, chunks: list[RetrievedChunk], deadline: Deadline | None = None) -> ChatResponse:
     settings = get_settings()
+    # Citation numbers index the packed passages, which are also what citations return.
+    chunks = pack_context(chunks, settings.context_token_budget)
+    messages = build_prompt(query=query, chunks=chunks)
     client = get_chat_client()
 
     response = instrument_openai_call(
         operation="chat.completions.create",
         model=settings.openai_model,
+        policy=get_call_policy("answer", remaining_s=deadline.remaining_s() if deadline else None),
         fn=lambda: client.chat.completions.create(
             model=settings.openai_model,
             messages=messages,
             temperature=0.1,
+            timeout=call_timeout(),
         ),
     )
     answer = response.choices[0].message.content or "I am unsure based on the available context."
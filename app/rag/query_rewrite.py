@@ -6,7 +6,8 @@ from typing import Any
 from openai import OpenAI
 
 from app.config import get_settings
-from app.observability.openai import instrument_openai_call
+from app.observability.openai import call_timeout, get_call_policy, instrument_openai_call
+from app.rag.deadline import Deadline
 
 _rewrite_client: Any | None = None
 
@@ -26,11 +27,11 @@ def get_rewrite_client() -> Any:
     global _rewrite_client
     if _rewrite_client is None:
         settings = get_settings()
-        _rewrite_client = OpenAI(api_key=settings.openai_api_key)
+        _rewrite_client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
     return _rewrite_client
 
 
-def rewrite_query(user_query: str, model: str | None = None) -> RewriteResult:
+def rewrite_query(user_query: str, model: str | None = None, deadline: Deadline | None = None) -> RewriteResult:
     """
     Rewrite the user's query to improve retrieval.
 
@@ -54,6 +55,7 @@ def rewrite_query(user_query: str, model: str | None = None) -> RewriteResult:
     response = instrument_openai_call(
         operation="chat.completions.create",
         model=actual_model,
+        policy=get_call_policy("rewrite", remaining_s=deadline.remaining_s() if deadline else None),
         fn=lambda: client.chat.completions.create(
             model=actual_model,
             messages=[
@@ -61,6 +63,7 @@ def rewrite_query(user_query: str, model: str | None = None) -> RewriteResult:
                 {"role": "user", "content": user_prompt},
             ],
             temperature=0.0,
+            timeout=call_timeout(),
         ),
     )
     rewritten = (response.choices[0].message.content or "").strip()
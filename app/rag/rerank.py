@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Protocol
 
 from openai import OpenAI
 
 from app.config import get_settings
 from app.models.schemas import RetrievedChunk
-from app.observability.openai import instrument_openai_call
+from app.observability.openai import OpenAICallTimeout, call_timeout, get_call_policy, instrument_openai_call
+from app.rag.cancellation import RequestCancelled
+from app.rag.deadline import Deadline
+from app.rag.local_rerank import local_rerank
 
 _rerank_client: Any | None = None
 
@@ -28,17 +33,46 @@ def get_rerank_client() -> Any:
     global _rerank_client
     if _rerank_client is None:
         settings = get_settings()
-        _rerank_client = OpenAI(api_key=settings.openai_api_key)
+        _rerank_client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
     return _rerank_client
 
 
-def rerank(query: str, chunks: list[RetrievedChunk], top_n: int, model: str | None = None) -> RerankResult:
-    if top_n <= 0:
-        return RerankResult(ranked_ids=[], used_fallback=True)
-
-    if not chunks:
-        return RerankResult(ranked_ids=[], used_fallback=True)
-
+class Reranker(Protocol):
+    """A rerank implementation; called with a non-empty candidate list and top_n > 0."""
+
+    def __call__(
+        self,
+        query: str,
+        chunks: list[RetrievedChunk],
+        top_n: int,
+        model: str | None,
+        deadline: Deadline | None,
+    ) -> RerankResult: ...
+
+
+def _local_rerank(
+    query: str,
+    chunks: list[RetrievedChunk],
+    top_n: int,
+    model: str | None,
+    deadline: Deadline | None,
+) -> RerankResult:
+    _ = model, deadline  # CPU-only and sub-millisecond: neither applies.
+    return RerankResult(ranked_ids=local_rerank(query, chunks, top_n), used_fallback=False)
+
+
+def _llm_rerank(
+    query: str,
+    chunks: list[RetrievedChunk],
+    top_n: int,
+    model: str | None,
+    deadline: Deadline | None,
+) -> RerankResult:
+    """Listwise rerank: ask a chat model for the best chunk ids as JSON.
+
+    Bad or empty model output falls back to vector order; a timeout is raised so the
+    caller can record rerank as skipped.
+    """
     settings = get_settings()
     client = get_rerank_client()
 
@@ -72,6 +106,7 @@ def rerank(query: str, chunks: list[RetrievedChunk], top_n: int, model: str | No
         response = instrument_openai_call(
             operation="chat.completions.create",
             model=actual_model,
+            policy=get_call_policy("rerank", remaining_s=deadline.remaining_s() if deadline else None),
             fn=lambda: client.chat.completions.create(
                 model=actual_model,
                 messages=[
@@ -79,6 +114,7 @@ def rerank(query: str, chunks: list[RetrievedChunk], top_n: int, model: str | No
                     {"role": "user", "content": user_prompt},
                 ],
                 temperature=0.0,
+                timeout=call_timeout(),
             ),
         )
         content = (response.choices[0].message.content or "").strip()
@@ -94,7 +130,99 @@ def rerank(query: str, chunks: list[RetrievedChunk], top_n: int, model: str | No
             raise ValueError("Empty rerank result")
 
         return RerankResult(ranked_ids=ranked_filtered[:top_n], used_fallback=False)
+    except (RequestCancelled, OpenAICallTimeout):
+        raise
     except Exception:
         # Fallback: preserve original similarity order.
         return RerankResult(ranked_ids=[c.id for c in chunks[:top_n]], used_fallback=True)
 
+
+
+def _shards(chunks: list[RetrievedChunk], shard_size: int) -> list[list[RetrievedChunk]]:
+    """Deal candidates round-robin by vector rank so every shard mixes strong and weak ones."""
+    n_shards = -(-len(chunks) // shard_size)
+    return [chunks[i::n_shards] for i in range(n_shards)]
+
+
+def _interleave(rankings: list[list[str]]) -> list[str]:
+    """Merge partial rankings rank-by-rank (every shard's #1, then every #2, ...)."""
+    merged: list[str] = []
+    for position in range(max((len(r) for r in rankings), default=0)):
+        for ranking in rankings:
+            if position < len(ranking) and ranking[position] not in merged:
+                merged.append(ranking[position])
+    return merged
+
+
+def _sharded_llm_rerank(
+    query: str,
+    chunks: list[RetrievedChunk],
+    top_n: int,
+    model: str | None,
+    deadline: Deadline | None,
+) -> RerankResult:
+    """Listwise rerank that splits large candidate pools into concurrently reranked shards.
+
+    Pools no larger than `RERANK_SHARD_SIZE` go through a single prompt. Otherwise each shard
+    nominates its best `top_n`, and the winners are merged either by a final LLM round over
+    the (small) winner set (`tournament`) or by rank-interleaving with no extra call
+    (`interleave`). Wall-clock time is one or two prompt round trips regardless of pool size.
+    """
+    settings = get_settings()
+    shard_size = settings.rerank_shard_size
+    if shard_size <= 0 or len(chunks) <= shard_size:
+        return _llm_rerank(query, chunks, top_n, model, deadline)
+
+    shards = _shards(chunks, shard_size)
+    workers = max(1, min(settings.rerank_max_concurrency, len(shards)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank-shard") as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, _llm_rerank, query, shard, min(top_n, len(shard)), model, deadline)
+            for shard in shards
+        ]
+        partials = [f.result() for f in futures]
+
+    shard_fallback = any(p.used_fallback for p in partials)
+    winner_ids = _interleave([p.ranked_ids for p in partials])
+    if settings.rerank_shard_merge == "tournament" and len(winner_ids) > top_n:
+        by_id = {c.id: c for c in chunks}
+        final = _llm_rerank(query, [by_id[cid] for cid in winner_ids], top_n, model, deadline)
+        return RerankResult(ranked_ids=final.ranked_ids, used_fallback=shard_fallback or final.used_fallback)
+    return RerankResult(ranked_ids=winner_ids[:top_n], used_fallback=shard_fallback)
+
+
+_RERANKERS: dict[str, Reranker] = {
+    "llm": _sharded_llm_rerank,
+    "local": _local_rerank,
+}
+
+
+def register_reranker(mode: str, reranker: Reranker) -> None:
+    """Add a rerank implementation for `rerank(mode=...)`; RERANK_MODE only accepts the built-in modes."""
+    _RERANKERS[mode] = reranker
+
+
+def get_reranker(mode: str) -> Reranker:
+    try:
+        return _RERANKERS[mode]
+    except KeyError as exc:
+        raise ValueError(f"Unknown rerank mode: {mode!r} (expected one of {sorted(_RERANKERS)})") from exc
+
+
+def rerank(
+    query: str,
+    chunks: list[RetrievedChunk],
+    top_n: int,
+    model: str | None = None,
+    deadline: Deadline | None = None,
+    mode: str | None = None,
+) -> RerankResult:
+    """Rerank `chunks` with the configured implementation (`RERANK_MODE`: llm or local)."""
+    if top_n <= 0:
+        return RerankResult(ranked_ids=[], used_fallback=True)
+
+    if not chunks:
+        return RerankResult(ranked_ids=[], used_fallback=True)
+
+    reranker = get_reranker(mode or get_settings().rerank_mode)
+    return reranker(query, chunks, top_n, model, deadline)
@@ -2,15 +2,23 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
+from typing import Any
 
-from sqlalchemy import Float, cast, select
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Float, Integer, cast, column, literal, select, true, values
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.models.schemas import ChatDebug
+from app.models.schemas import ChatDebug, GateDecision
 from app.models.schemas import RetrievedChunk
 from app.db.models import Chunk, ChunkEmbedding, Document, User
-from app.rag.embedding import get_embeddings
+from app.db.session import cancellable
+from app.observability.metrics import get_metrics
+from app.observability.openai import OpenAICallTimeout
+from app.rag.cancellation import raise_if_cancelled
+from app.rag.deadline import Deadline
+from app.rag.embedding import EmbeddingSpace, get_embedding_space, get_embeddings
+from app.rag.gating import rerank_gate, rewrite_gate
 from app.rag.query_rewrite import rewrite_query
 from app.rag.rerank import rerank
 
@@ -22,48 +30,97 @@ def _cosine_similarity(a: list[float], b: list[float]) -> float:
     return dot / (norm_a * norm_b)
 
 
-def retrieve(db: Session, user: User, query: str, top_k: int | None = None) -> list[RetrievedChunk]:
-    settings = get_settings()
-    k = top_k or settings.top_k
-    query_embedding = get_embeddings([query])[0]
+def _to_retrieved(chunk: Chunk, doc: Document, score: float) -> RetrievedChunk:
+    return RetrievedChunk(
+        id=str(chunk.id),
+        text=chunk.text,
+        doc_id=str(doc.id),
+        document_name=doc.filename,
+        chunk_index=chunk.chunk_index,
+        start_char=chunk.start_char,
+        end_char=chunk.end_char,
+        score=score,
+        token_count=chunk.token_count,
+    )
+
+
+def _cosine_distance_to(query_vector: Any) -> Any:
+    # Try pgvector SQLAlchemy comparator first; fall back to cosine-distance operator.
+    try:
+        distance_expr = ChunkEmbedding.embedding.cosine_distance(query_vector)
+    except Exception:
+        distance_expr = ChunkEmbedding.embedding.op("<=>")(query_vector)
+    # `<=>` returns a float distance, but SQLAlchemy may infer the type as VECTOR
+    # (because it's an op on a VECTOR-typed column). Force-cast to Float so the
+    # pgvector result processor doesn't try to parse a float as a vector.
+    return cast(distance_expr, Float)
+
+
+def _served_chunks(user: User, space: EmbeddingSpace) -> tuple[Any, ...]:
+    return (
+        Document.user_id == user.id,
+        Chunk.index_version == Document.active_version,
+        ChunkEmbedding.space == space.name,
+    )
+
+
+def search_many(
+    db: Session,
+    user: User,
+    query_embeddings: list[list[float]],
+    top_k: int,
+    space: EmbeddingSpace,
+) -> list[list[RetrievedChunk]]:
+    """Nearest `top_k` served chunks for each query vector, in one database round trip.
+
+    On Postgres several vectors are searched with a VALUES list joined LATERAL to a
+    per-query nearest-neighbour scan. There is no ANN index on `chunk_embeddings.embedding`
+    (the column is dimensionless so spaces of different sizes can share it), so each scan is
+    exact over the tenant's served chunks, narrowed by the user/version/space filters.
+    """
+    if not query_embeddings:
+        return []
 
     # Postgres+pgvector path.
     if db.bind and db.bind.dialect.name == "postgresql":
-        # Try pgvector SQLAlchemy comparator first; fall back to cosine-distance operator.
-        try:
-            distance_expr = ChunkEmbedding.embedding.cosine_distance(query_embedding)
-        except Exception:
-            # `<=>` returns a float distance, but SQLAlchemy may infer the type as VECTOR
-            # (because it's an op on a VECTOR-typed column). Force-cast to Float so the
-            # pgvector result processor doesn't try to parse a float as a vector.
-            distance_expr = ChunkEmbedding.embedding.op("<=>")(query_embedding)
-
-        distance_expr = cast(distance_expr, Float)
-
-        stmt = (
-            select(Chunk, Document, distance_expr.label("distance"))
-            .join(Document, Chunk.document_id == Document.id)
-            .join(ChunkEmbedding, ChunkEmbedding.chunk_id == Chunk.id)
-            .where(Document.user_id == user.id)
-            .order_by(distance_expr.asc())
-            .limit(k)
-        )
-        rows = db.execute(stmt).all()
-        results: list[RetrievedChunk] = []
-        for chunk, doc, distance in rows:
-            score = 1.0 - float(distance) if distance is not None else 0.0
-            results.append(
-                RetrievedChunk(
-                    id=str(chunk.id),
-                    text=chunk.text,
-                    doc_id=str(doc.id),
-                    document_name=doc.filename,
-                    chunk_index=chunk.chunk_index,
-                    start_char=chunk.start_char,
-                    end_char=chunk.end_char,
-                    score=score,
-                )
+        results: list[list[RetrievedChunk]] = [[] for _ in query_embeddings]
+        if len(query_embeddings) == 1:
+            distance_expr = _cosine_distance_to(query_embeddings[0])
+            stmt = (
+                select(literal(0).label("query_index"), Chunk, Document, distance_expr.label("distance"))
+                .join(Document, Chunk.document_id == Document.id)
+                .join(ChunkEmbedding, ChunkEmbedding.chunk_id == Chunk.id)
+                .where(*_served_chunks(user, space))
+                .order_by(distance_expr.asc())
+                .limit(top_k)
+            )
+        else:
+            queries = values(
+                column("query_index", Integer), column("query_vector", Vector()), name="queries"
+            ).data(list(enumerate(query_embeddings)))
+            distance_expr = _cosine_distance_to(cast(queries.c.query_vector, Vector()))
+            nearest = (
+                select(Chunk.id.label("chunk_id"), distance_expr.label("distance"))
+                .join(Document, Chunk.document_id == Document.id)
+                .join(ChunkEmbedding, ChunkEmbedding.chunk_id == Chunk.id)
+                .where(*_served_chunks(user, space))
+                .order_by(distance_expr.asc())
+                .limit(top_k)
+                .lateral("nearest")
+            )
+            stmt = (
+                select(queries.c.query_index, Chunk, Document, nearest.c.distance)
+                .select_from(queries)
+                .join(nearest, true())
+                .join(Chunk, Chunk.id == nearest.c.chunk_id)
+                .join(Document, Chunk.document_id == Document.id)
+                .order_by(queries.c.query_index, nearest.c.distance)
             )
+        with cancellable(db):
+            rows = db.execute(stmt).all()
+        for query_index, chunk, doc, distance in rows:
+            score = 1.0 - float(distance) if distance is not None else 0.0
+            results[query_index].append(_to_retrieved(chunk, doc, score))
         return results
 
     # SQLite/dev fallback: compute cosine similarity in Python (used for tests).
@@ -71,78 +128,145 @@ def retrieve(db: Session, user: User, query: str, top_k: int | None = None) -> l
         select(Chunk, Document, ChunkEmbedding.embedding)
         .join(Document, Chunk.document_id == Document.id)
         .join(ChunkEmbedding, ChunkEmbedding.chunk_id == Chunk.id)
-        .where(Document.user_id == user.id)
+        .where(*_served_chunks(user, space))
     )
-    candidates = db.execute(stmt).all()
-    scored: list[tuple[float, Chunk, Document]] = []
-    for chunk, doc, emb in candidates:
-        if not isinstance(emb, list):
-            continue
-        score = _cosine_similarity(query_embedding, emb)
-        scored.append((score, chunk, doc))
-    scored.sort(key=lambda t: t[0], reverse=True)
+    with cancellable(db):
+        candidates = [(chunk, doc, emb) for chunk, doc, emb in db.execute(stmt).all() if isinstance(emb, list)]
 
     results = []
-    for score, chunk, doc in scored[:k]:
-        results.append(
-            RetrievedChunk(
-                id=str(chunk.id),
-                text=chunk.text,
-                doc_id=str(doc.id),
-                document_name=doc.filename,
-                chunk_index=chunk.chunk_index,
-                start_char=chunk.start_char,
-                end_char=chunk.end_char,
-                score=float(score),
-            )
-        )
+    for query_embedding in query_embeddings:
+        scored = [(_cosine_similarity(query_embedding, emb), chunk, doc) for chunk, doc, emb in candidates]
+        scored.sort(key=lambda t: t[0], reverse=True)
+        results.append([_to_retrieved(chunk, doc, float(score)) for score, chunk, doc in scored[:top_k]])
     return results
 
 
+def retrieve(
+    db: Session,
+    user: User,
+    query: str,
+    top_k: int | None = None,
+    deadline: Deadline | None = None,
+) -> list[RetrievedChunk]:
+    settings = get_settings()
+    k = top_k or settings.top_k
+    # The tenant's active space; a backfill only switches it once every chunk has a vector there.
+    space = get_embedding_space(user.embedding_space)
+    query_embedding = get_embeddings([query], deadline=deadline, space=space, policy="query_embedding")[0]
+    return search_many(db, user, [query_embedding], k, space)[0]
+
+
+def _record_gate(decisions: list[GateDecision], decision: GateDecision) -> bool:
+    """Keep the decision for ChatDebug/metrics and return whether the stage should run."""
+    decisions.append(decision)
+    get_metrics().observe_gate_decision(decision.stage, decision.run)
+    return decision.run
+
+
 @dataclass(frozen=True)
 class RetrievalWithDebugResult:
     final_chunks: list[RetrievedChunk]
     debug: ChatDebug
 
 
-def retrieve_with_debug(db: Session, user: User, user_query: str) -> RetrievalWithDebugResult:
+def rewrite_stage(
+    user_query: str,
+    deadline: Deadline | None,
+    skipped_stages: list[str],
+    gate_decisions: list[GateDecision],
+) -> str:
+    """The retrieval query for `user_query`: rewritten when enabled, affordable and not gated off."""
     settings = get_settings()
-    rewrite_enabled = bool(settings.enable_query_rewrite)
-    rerank_enabled = bool(settings.enable_rerank)
+    if not settings.enable_query_rewrite:
+        return user_query
+    if deadline is not None and not deadline.can_afford("rewrite", "query_embedding", "answer"):
+        skipped_stages.append("rewrite")
+    elif not settings.enable_adaptive_gating or _record_gate(gate_decisions, rewrite_gate(user_query)):
+        try:
+            return rewrite_query(user_query, deadline=deadline).rewritten_query or user_query
+        except OpenAICallTimeout:
+            skipped_stages.append("rewrite")
+    return user_query
 
-    rewritten_query = user_query
-    if rewrite_enabled:
-        rewritten_query = rewrite_query(user_query).rewritten_query or user_query
 
-    initial_chunks_raw = retrieve(db=db, user=user, query=rewritten_query, top_k=settings.top_k)
+def _dedupe(chunks: list[RetrievedChunk]) -> list[RetrievedChunk]:
     # Defensive dedupe in case the vector store returns duplicates.
-    initial_chunks: list[RetrievedChunk] = []
+    unique: list[RetrievedChunk] = []
     seen: set[str] = set()
-    for ch in initial_chunks_raw:
+    for ch in chunks:
         if ch.id in seen:
             continue
         seen.add(ch.id)
-        initial_chunks.append(ch)
-
-    final_chunks = initial_chunks
-    if rerank_enabled and initial_chunks:
-        rr = rerank(query=user_query, chunks=initial_chunks, top_n=settings.rerank_top_n)
-        id_to_chunk = {c.id: c for c in initial_chunks}
-        final_chunks = []
-        seen_final: set[str] = set()
-        for cid in rr.ranked_ids:
-            if cid in id_to_chunk and cid not in seen_final:
-                final_chunks.append(id_to_chunk[cid])
-                seen_final.add(cid)
-        if not final_chunks:
-            final_chunks = initial_chunks[: settings.rerank_top_n]
+        unique.append(ch)
+    return unique
+
+
+def rerank_stage(
+    user_query: str,
+    initial_chunks: list[RetrievedChunk],
+    deadline: Deadline | None,
+    skipped_stages: list[str],
+    gate_decisions: list[GateDecision],
+) -> list[RetrievedChunk]:
+    """Reorder vector hits with the configured reranker, or keep vector order when skipped."""
+    settings = get_settings()
+    rerank_enabled = bool(settings.enable_rerank)
+    gating = bool(settings.enable_adaptive_gating)
+    if rerank_enabled and initial_chunks and deadline is not None and not deadline.can_afford("rerank", "answer"):
+        skipped_stages.append("rerank")
+        return initial_chunks[: settings.rerank_top_n]
+    if rerank_enabled and initial_chunks and gating and not _record_gate(gate_decisions, rerank_gate(initial_chunks)):
+        return initial_chunks[: settings.rerank_top_n]
+    if not (rerank_enabled and initial_chunks):
+        return initial_chunks
+
+    try:
+        rr = rerank(query=user_query, chunks=initial_chunks, top_n=settings.rerank_top_n, deadline=deadline)
+    except OpenAICallTimeout:
+        skipped_stages.append("rerank")
+        return initial_chunks[: settings.rerank_top_n]
+    id_to_chunk = {c.id: c for c in initial_chunks}
+    final_chunks = []
+    seen_final: set[str] = set()
+    for cid in rr.ranked_ids:
+        if cid in id_to_chunk and cid not in seen_final:
+            final_chunks.append(id_to_chunk[cid])
+            seen_final.add(cid)
+    return final_chunks or initial_chunks[: settings.rerank_top_n]
+
+
+def retrieve_with_debug(
+    db: Session,
+    user: User,
+    user_query: str,
+    deadline: Deadline | None = None,
+) -> RetrievalWithDebugResult:
+    """Rewrite -> vector search -> rerank.
+
+    With a `deadline`, optional LLM stages (rewrite, rerank) only run when the remaining
+    budget covers their estimated cost plus what later stages still need; skipped stages
+    fall back to the raw query / vector order and are listed in `debug.skipped_stages`.
+    """
+    settings = get_settings()
+    skipped_stages: list[str] = []
+    gate_decisions: list[GateDecision] = []
+
+    rewritten_query = rewrite_stage(user_query, deadline, skipped_stages, gate_decisions)
+    initial_chunks_raw = retrieve(db=db, user=user, query=rewritten_query, top_k=settings.top_k, deadline=deadline)
+    initial_chunks = _dedupe(initial_chunks_raw)
+
+    raise_if_cancelled()
+    final_chunks = rerank_stage(user_query, initial_chunks, deadline, skipped_stages, gate_decisions)
 
     debug = ChatDebug(
         user_query=user_query,
         rewritten_query=rewritten_query,
         initial_chunks=initial_chunks,
         final_chunks=final_chunks,
-        rewrite_enabled=rewrite_enabled,
-        rerank_enabled=rerank_enabled,
+        rewrite_enabled=bool(settings.enable_query_rewrite),
+        rerank_enabled=bool(settings.enable_rerank),
+        skipped_stages=skipped_stages,
+        gate_decisions=gate_decisions,
+        deadline_remaining_ms=round(deadline.remaining_ms(), 2) if deadline is not None else None,
     )
     return RetrievalWithDebugResult(final_chunks=final_chunks, debug=debug)
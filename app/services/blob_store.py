@@ -0,0 +1,135 @@
+"""Content-addressed storage for uploaded files.
+
+Bytes live once under `<upload_dir>/blobs/<aa>/<bb>/<sha256>` no matter how many documents
+(or tenants) uploaded them; the `blobs` row counts the documents referencing each file.
+Uploads are staged in `<upload_dir>/blobs/tmp` (same filesystem, so placing is a rename).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.models import Blob
+from app.services import text_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _root() -> Path:
+    return get_settings().upload_path / "blobs"
+
+
+def blob_key(sha256: str) -> str:
+    """Path of a blob relative to the upload directory."""
+
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def blob_path(sha256: str) -> Path:
+    return get_settings().upload_path / blob_key(sha256)
+
+
+def staging_dir() -> Path:
+    path = _root() / "tmp"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _locked(db: Session, sha256: str) -> Blob | None:
+    return db.execute(select(Blob).where(Blob.sha256 == sha256).with_for_update()).scalar_one_or_none()
+
+
+def _claim_new(db: Session, blob: Blob) -> bool:
+    """Insert `blob` in a savepoint; False if a concurrent transaction inserted that sha256 first."""
+
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        return False
+    return True
+
+
+def acquire(db: Session, sha256: str, size_bytes: int, staged: Path) -> bool:
+    """Add a document reference to the blob, moving `staged` into place. Does not commit.
+
+    Returns True when the content was already stored. The row lock serializes this with a
+    concurrent `release` of the same blob, and the staged copy always replaces the file, so
+    a blob whose last reference was just dropped is restored rather than left missing. Two
+    uploads of the same new content both find no row to lock; the unique key lets one
+    insert it and the other retries the locked select.
+    """
+
+    existed = True
+    while True:
+        blob = _locked(db, sha256)
+        if blob is not None:
+            blob.refcount += 1
+            db.flush()
+            break
+        blob = Blob(sha256=sha256, size_bytes=size_bytes, refcount=1, created_at=datetime.now(timezone.utc))
+        if _claim_new(db, blob):
+            existed = False
+            break
+
+    destination = blob_path(sha256)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(staged, destination)
+    return existed
+
+
+def abandon(sha256: str) -> None:
+    """Undo the file placement of an `acquire` that stored a new blob, whose transaction failed.
+
+    Call before rolling back: the uncommitted row still holds off a concurrent upload of the
+    same bytes, which would otherwise place its own copy that this unlink then removes.
+    """
+
+    blob_path(sha256).unlink(missing_ok=True)
+
+
+def release(db: Session, sha256: str) -> Path | None:
+    """Drop one document reference; deletes the row at zero. Does not commit.
+
+    Returns the blob's path when that was its last reference: pass it to `discard` after
+    the transaction commits, so a failed commit never leaves a counted blob without bytes.
+    """
+
+    blob = _locked(db, sha256)
+    if blob is None:
+        return None
+    blob.refcount -= 1
+    if blob.refcount > 0:
+        db.add(blob)
+        return None
+    db.delete(blob)
+    db.flush()
+    return blob_path(sha256)
+
+
+def discard(db: Session, path: Path) -> None:
+    """Delete an unreferenced blob's file (and cached text) after `release` has committed.
+
+    Holds a placeholder row for the sha256 while unlinking, so an upload of the same bytes
+    that raced in after the commit waits for it and then stores its own copy; if that
+    upload got there first, the file is left to it.
+    """
+
+    sha256 = path.name
+    placeholder = Blob(sha256=sha256, size_bytes=0, refcount=0, created_at=datetime.now(timezone.utc))
+    if not _claim_new(db, placeholder):
+        db.rollback()
+        return
+    path.unlink(missing_ok=True)
+    text_cache.remove(sha256)
+    db.delete(placeholder)
+    db.commit()
+    logger.info("blob.deleted", extra={"sha256": sha256})
@@ -1,23 +1,45 @@
 from __future__ import annotations
 
+import base64
+import codecs
+import hashlib
 import logging
+import os
 import re
+import tempfile
 import uuid
+from bisect import bisect_right
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
 from datetime import datetime, timezone
+from dataclasses import dataclass
+from itertools import groupby, islice
 from pathlib import Path
+from time import perf_counter
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, select, tuple_, update
 from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
+from app.db.bulk import bulk_insert_chunks, chunk_rows
 from app.db.models import Chunk, ChunkEmbedding, Document, User
 from app.db.session import get_engine
+from app.models.schemas import Chunk as ChunkSchema
 from app.models.schemas import DocumentMetadata
-from app.rag.chunking import chunk_text
-from app.rag.embedding import get_embeddings
-from app.services import pdf_service
+from app.rag.chunking import iter_chunks
+from app.rag.embedding import EmbeddingSpace, get_embeddings
+from app.services import blob_store, pdf_service, status_feed, text_cache
+from app.services.embedding_backfill import cover_index_spaces, embed_missing_chunks, index_spaces
+from app.services.index_pipeline import StagePipeline
 
 _ALLOWED_EXTENSIONS = {".txt", ".md", ".pdf"}
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+_TEXT_BLOCK_CHARS = 64 * 1024
+_DOCUMENT_FIELDS = tuple(DocumentMetadata.model_fields)
+# Always read for a projected listing: needed to build the metadata and the next cursor.
+_REQUIRED_FIELDS = {name for name, field in DocumentMetadata.model_fields.items() if field.is_required()}
+# Error text carried in status-feed events (Postgres caps NOTIFY payloads at 8000 bytes).
+_FEED_ERROR_CHARS = 1000
 
 logger = logging.getLogger(__name__)
 
@@ -28,25 +50,18 @@ def _sanitize_filename(filename: str) -> str:
     return sanitized or "document.txt"
 
 
-def _user_upload_dir(user_id: str) -> Path:
-    settings = get_settings()
-    path = settings.upload_path / user_id
-    path.mkdir(parents=True, exist_ok=True)
-    return path
+def _in_blob_store(doc: Document) -> bool:
+    return bool(doc.content_sha256) and doc.stored_filename == blob_store.blob_key(doc.content_sha256)
 
 
-def _find_stored_path(user_id: str, doc_id: str, stored_filename: str | None) -> Path | None:
-    settings = get_settings()
-    if stored_filename:
-        candidate = settings.upload_path / user_id / stored_filename
-        if candidate.exists():
-            return candidate
-
-    pattern = f"{doc_id}_"
-    for path in (settings.upload_path / user_id).glob(f"{doc_id}_*"):
-        if path.is_file() and path.name.startswith(pattern):
-            return path
-    return None
+def _stored_path(doc: Document) -> Path | None:
+    """Where the document's bytes are: its content-addressed blob, or a legacy per-user file."""
+
+    if _in_blob_store(doc):
+        path = blob_store.blob_path(doc.content_sha256)
+    else:
+        path = get_settings().upload_path / str(doc.user_id) / doc.stored_filename
+    return path if path.is_file() else None
 
 
 def _to_metadata(doc: Document) -> DocumentMetadata:
@@ -59,125 +74,716 @@ def _to_metadata(doc: Document) -> DocumentMetadata:
         indexed_at=doc.indexed_at,
         error_message=doc.error_message,
         status=doc.status,  # type: ignore[arg-type]
+        size_bytes=doc.size_bytes,
+        content_sha256=doc.content_sha256,
+        active_version=doc.active_version,
     )
 
 
-def create_document_record(db: Session, user: User, filename: str, content: bytes) -> DocumentMetadata:
-    settings = get_settings()
+def _expected_chunks(doc: Document) -> int | None:
+    """Rough final chunk count: the served version's, else estimated from a text file's size."""
+
+    if doc.chunk_count:
+        return doc.chunk_count
+    if doc.size_bytes and Path(doc.filename).suffix.lower() in {".txt", ".md"}:
+        settings = get_settings()
+        return max(1, -(-doc.size_bytes // max(1, settings.chunk_size - settings.chunk_overlap)))
+    return None
+
+
+def _progress_pct(doc: Document) -> float | None:
+    if doc.status == "indexed":
+        return 100.0
+    if doc.status == "queued":
+        return 0.0
+    if doc.status != "indexing":
+        return None
+    expected = _expected_chunks(doc)
+    # An estimate, so it stays below 100 until the flip.
+    return min(99.0, round(100.0 * doc.index_checkpoint / expected, 1)) if expected else None
+
+
+def _touch_documents(db: Session, user_id: uuid.UUID) -> None:
+    db.execute(update(User).where(User.id == user_id).values(documents_version=User.documents_version + 1))
+
+
+def publish_document_status(db: Session, doc: Document, progress_only: bool = False) -> None:
+    """Send `doc`'s state and progress to the tenant's status feed when this transaction commits.
+
+    Unless only indexing progress moved, this also bumps the tenant's `documents_version`,
+    which invalidates the document list's ETag.
+    """
+
+    if not progress_only:
+        _touch_documents(db, doc.user_id)
+    metadata = _to_metadata(doc)
+    if metadata.error_message:
+        metadata.error_message = metadata.error_message[:_FEED_ERROR_CHARS]
+    status_feed.publish(
+        db,
+        doc.user_id,
+        {"type": "document", "document": metadata.model_dump(mode="json"), "progress_pct": _progress_pct(doc)},
+    )
+
+
+def _validate_upload_name(filename: str) -> tuple[str, str]:
     safe_name = _sanitize_filename(filename)
     extension = Path(safe_name).suffix.lower()
     if extension not in _ALLOWED_EXTENSIONS:
         raise ValueError("Only .txt, .md, and .pdf files are supported")
+    return safe_name, extension
+
+
+class _UploadSink:
+    """Streams an upload into a staging file in the blob store, validating as bytes arrive.
 
-    max_bytes = settings.max_upload_size_mb * 1024 * 1024
-    if len(content) > max_bytes:
-        raise ValueError(f"File exceeds {settings.max_upload_size_mb} MB limit")
+    Size, sha256 and UTF-8 validity (text formats only) are checked per chunk, so memory
+    stays at one chunk and a bad upload is rejected without reading the rest of it.
+    """
 
-    # Early decode check so we fail fast for non-UTF8 input (text formats only).
-    if extension in {".txt", ".md"}:
+    def __init__(self, directory: Path, extension: str) -> None:
+        settings = get_settings()
+        self._max_mb = settings.max_upload_size_mb
+        self._max_bytes = settings.max_upload_size_mb * 1024 * 1024
+        self._sha256 = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder("utf-8")() if extension in {".txt", ".md"} else None
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self.tmp_path = Path(tmp_name)
+        self.size = 0
+
+    def _check_utf8(self, data: bytes, final: bool) -> None:
+        if self._decoder is None:
+            return
         try:
-            content.decode("utf-8")
+            self._decoder.decode(data, final=final)
         except UnicodeDecodeError as exc:
             raise ValueError("File must be UTF-8 encoded text") from exc
 
-    doc_id = str(uuid.uuid4())
-    destination = _user_upload_dir(str(user.id)) / f"{doc_id}_{safe_name}"
-    destination.write_bytes(content)
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self._max_bytes:
+            raise ValueError(f"File exceeds {self._max_mb} MB limit")
+        self._check_utf8(data, final=False)
+        self._sha256.update(data)
+        self._file.write(data)
 
-    now = datetime.now(timezone.utc)
-    doc = Document(
-        id=uuid.UUID(doc_id),
-        user_id=user.id,
-        filename=safe_name,
-        stored_filename=destination.name,
-        status="queued",
-        chunk_count=0,
-        uploaded_at=now,
-        indexed_at=None,
-        error_message=None,
+    def finish(self) -> str:
+        """Flush the staged file to disk; returns the hex sha256 (the blob key)."""
+
+        self._check_utf8(b"", final=True)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return self._sha256.hexdigest()
+
+    def discard(self) -> None:
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def _record_document(
+    db: Session, user: User, safe_name: str, sink: _UploadSink, sha256: str, batch_id: uuid.UUID | None = None
+) -> DocumentMetadata:
+    """Reference the blob (storing it if new) and insert the document in one transaction."""
+
+    doc_id = uuid.uuid4()
+    deduplicated = True
+    try:
+        deduplicated = blob_store.acquire(db, sha256, sink.size, sink.tmp_path)
+        doc = Document(
+            id=doc_id,
+            user_id=user.id,
+            filename=safe_name,
+            stored_filename=blob_store.blob_key(sha256),
+            status="queued",
+            chunk_count=0,
+            uploaded_at=datetime.now(timezone.utc),
+            indexed_at=None,
+            error_message=None,
+            content_sha256=sha256,
+            size_bytes=sink.size,
+            batch_id=batch_id,
+        )
+        db.add(doc)
+        publish_document_status(db, doc)
+        db.commit()
+    except BaseException:
+        if not deduplicated:
+            blob_store.abandon(sha256)
+        db.rollback()
+        sink.discard()
+        raise
+
+    logger.info(
+        "upload.accepted",
+        extra={
+            "doc_id": str(doc_id),
+            "document_name": safe_name,
+            "user_id": str(user.id),
+            "size_bytes": sink.size,
+            "sha256": sha256,
+            "deduplicated": deduplicated,
+        },
     )
+    return _to_metadata(doc)
+
+
+def create_document_record(db: Session, user: User, filename: str, content: bytes) -> DocumentMetadata:
+    safe_name, extension = _validate_upload_name(filename)
+    sink = _UploadSink(blob_store.staging_dir(), extension)
+    try:
+        view = memoryview(content)
+        for offset in range(0, len(view), _UPLOAD_CHUNK_BYTES):
+            sink.write(view[offset : offset + _UPLOAD_CHUNK_BYTES])
+        sha256 = sink.finish()
+    except BaseException:
+        sink.discard()
+        raise
+    return _record_document(db, user, safe_name, sink, sha256)
+
+
+async def create_document_from_stream(
+    db: Session, user: User, filename: str, chunks: AsyncIterator[bytes], batch_id: uuid.UUID | None = None
+) -> DocumentMetadata:
+    """Like `create_document_record`, but consumes the upload chunk by chunk.
+
+    Disk writes run in the threadpool so a large upload never blocks the event loop.
+    """
+
+    safe_name, extension = _validate_upload_name(filename)
+    sink = await run_in_threadpool(_UploadSink, blob_store.staging_dir(), extension)
+    try:
+        async for data in chunks:
+            await run_in_threadpool(sink.write, data)
+        sha256 = await run_in_threadpool(sink.finish)
+    except BaseException:
+        sink.discard()
+        raise
+    return await run_in_threadpool(_record_document, db, user, safe_name, sink, sha256, batch_id)
+
+
+def _iter_text_file(path: Path) -> Iterator[str]:
+    # newline="" keeps "\r\n" as-is; the chunker normalizes it like the in-memory path did.
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        while block := fh.read(_TEXT_BLOCK_CHARS):
+            yield block
+
+
+class _PageMap:
+    """Page start offsets in the chunker's normalized text, recorded as pages stream past."""
+
+    def __init__(self) -> None:
+        self._starts: list[int] = []
+        self._numbers: list[int] = []
+        self._offset = 0
+
+    def segments(self, pages: Iterable[pdf_service.PdfPage]) -> Iterator[str]:
+        """Page texts joined by blank lines, as `extract_text_from_pdf` joins them."""
+
+        for page in pages:
+            if self._starts:
+                yield "\n\n"
+                self._offset += 2
+            self._starts.append(self._offset)
+            self._numbers.append(page.number)
+            # Offsets are in normalized text, where "\r\n" counts as one character.
+            self._offset += len(page.text.replace("\r\n", "\n"))
+            yield page.text
+
+    def _page_at(self, offset: int) -> int:
+        return self._numbers[bisect_right(self._starts, offset) - 1]
+
+    def attach(self, chunk: ChunkSchema) -> ChunkSchema:
+        chunk.page_start = self._page_at(chunk.start_char)
+        chunk.page_end = self._page_at(max(chunk.start_char, chunk.end_char - 1))
+        return chunk
+
+
+def _extract(path: Path, ext: str, sha256: str | None = None) -> Iterator[str] | Iterator[pdf_service.PdfPage]:
+    """Extraction stage input: text blocks for text files, pages for PDFs.
+
+    `ext` comes from the document's filename; blobs are stored without one. PDF pages are
+    served from the extracted-text cache when `sha256` is known (text files already are
+    plaintext and are read directly).
+    """
+
+    if ext in {".txt", ".md"}:
+        return _iter_text_file(path)
+    if ext == ".pdf":
+        pages = pdf_service.iter_pdf_pages(path)
+        return text_cache.cached_pdf_pages(sha256, pages) if sha256 else pages
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+@dataclass(eq=False)
+class _Build:
+    """One document's in-progress build of `version` within a (possibly shared) indexing run."""
+
+    doc: Document
+    path: Path
+    ext: str
+    version: int
+    resume_from: int
+    chunk_count: int = 0
+    write_s: float = 0.0
+    done: bool = False
+
+
+@dataclass
+class _DocFailed:
+    exc: BaseException
+
+
+# Marks the end of a document's items/chunks in the shared stream.
+_DOC_END = object()
+
+
+def _extract_documents(builds: list[_Build]) -> Iterator[tuple[_Build, object]]:
+    """Extraction stage: each document's items in turn, then its end (or failure) marker.
+
+    A document whose file cannot be read fails alone; the others keep going.
+    """
+
+    for build in builds:
+        try:
+            for item in _extract(build.path, build.ext, build.doc.content_sha256):
+                yield build, item
+        except Exception as exc:  # noqa: BLE001 - reported against this document only
+            yield build, _DocFailed(exc)
+            continue
+        yield build, _DOC_END
+
+
+def _chunks_for(build: _Build, items: Iterator) -> Iterator[ChunkSchema]:
+    """Only the chunker's window and one extracted item are in memory.
+
+    The first `resume_from` chunks (already committed by an earlier run) are produced but dropped.
+    """
+
+    settings = get_settings()
+    if build.ext == ".pdf":
+        page_map = _PageMap()
+        segments = page_map.segments(items)
+        chunks = map(page_map.attach, iter_chunks(segments, chunk_size=settings.chunk_size, overlap=settings.chunk_overlap))
+    else:
+        chunks = iter_chunks(items, chunk_size=settings.chunk_size, overlap=settings.chunk_overlap)
+    return islice(chunks, build.resume_from, None)
+
+
+def _chunk_documents(stream: Iterator[tuple[_Build, object]]) -> Iterator[tuple[_Build, object]]:
+    """Chunking stage: (build, chunk) pairs per document, followed by its end/failure marker."""
+
+    for build, group in groupby(stream, key=lambda pair: pair[0]):
+        end: list[object] = []
+
+        def _items() -> Iterator:
+            for _, item in group:
+                if item is _DOC_END or isinstance(item, _DocFailed):
+                    end.append(item)
+                    return
+                yield item
+
+        try:
+            for chunk in _chunks_for(build, _items()):
+                yield build, chunk
+        except Exception as exc:  # noqa: BLE001 - reported against this document only
+            end.append(_DocFailed(exc))
+        for _ in group:  # drain what a failed chunker left behind
+            pass
+        yield build, end[0] if end else _DOC_END
+
+
+def _pack(stream: Iterator[tuple[_Build, object]], size: int) -> Iterator[list[tuple[_Build, object]]]:
+    """Packing stage: batches of `size` chunks regardless of which document they belong to.
+
+    Markers ride along in order without counting toward the batch size.
+    """
+
+    batch: list[tuple[_Build, object]] = []
+    chunks = 0
+    for entry in stream:
+        batch.append(entry)
+        if isinstance(entry[1], ChunkSchema):
+            chunks += 1
+            if chunks >= size:
+                yield batch
+                batch, chunks = [], 0
+    if batch:
+        yield batch
+
+
+def _embed_packed(
+    batches: Iterator[list[tuple[_Build, object]]], spaces: list[EmbeddingSpace]
+) -> Iterator[tuple[list[tuple[_Build, object]], dict[str, list[list[float]]]]]:
+    """Embedding stage: one request per space per packed batch."""
+
+    for batch in batches:
+        texts = [entry.text for _, entry in batch if isinstance(entry, ChunkSchema)]
+        yield batch, ({space.name: get_embeddings(texts, space=space) for space in spaces} if texts else {})
+
+
+def _chunk_params() -> str:
+    s = get_settings()
+    return f"chunk_size={s.chunk_size};overlap={s.chunk_overlap}"
+
+
+def _index_params(space: EmbeddingSpace) -> str:
+    """Settings that change chunk boundaries or vectors; a checkpoint is only reused under the same values."""
+
+    return f"{_chunk_params()};embedding={space.name}:{space.model}:{space.dims}"
+
+
+def _find_donor(db: Session, doc: Document) -> Document | None:
+    """An indexed document with the same bytes and chunking settings whose chunks can be copied."""
+
+    if not doc.content_sha256:
+        return None
+    return db.execute(
+        select(Document)
+        .where(
+            Document.content_sha256 == doc.content_sha256,
+            Document.id != doc.id,
+            Document.status == "indexed",
+            Document.active_version.is_not(None),
+            Document.index_params.startswith(f"{_chunk_params()};"),
+        )
+        .order_by(Document.indexed_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def _copy_indexed_version(db: Session, donor: Document, doc: Document, version: int) -> int:
+    """Copy the donor's active chunks and all their vectors into `doc`'s `version`.
+
+    Identical bytes chunk identically, so this replaces extraction, chunking and embedding
+    with a read and a bulk insert per batch. Batches commit with the checkpoint like a
+    normal build.
+    """
+
+    batch_size = get_settings().index_batch_size
+    chunks = Chunk.__table__
+    copied = 0
+    last_index = -1
+    while True:
+        source = db.execute(
+            select(chunks)
+            .where(
+                chunks.c.document_id == donor.id,
+                chunks.c.index_version == donor.active_version,
+                chunks.c.chunk_index > last_index,
+            )
+            .order_by(chunks.c.chunk_index)
+            .limit(batch_size)
+        ).mappings().all()
+        if not source:
+            break
+        new_ids = {row["id"]: uuid.uuid4() for row in source}
+        vectors = db.execute(
+            select(ChunkEmbedding.chunk_id, ChunkEmbedding.space, ChunkEmbedding.embedding).where(
+                ChunkEmbedding.chunk_id.in_(list(new_ids))
+            )
+        ).all()
+        db.execute(
+            insert(Chunk),
+            [{**row, "id": new_ids[row["id"]], "document_id": doc.id, "index_version": version} for row in source],
+        )
+        if vectors:
+            db.execute(
+                insert(ChunkEmbedding),
+                [{"chunk_id": new_ids[v.chunk_id], "space": v.space, "embedding": list(v.embedding)} for v in vectors],
+            )
+        copied += len(source)
+        last_index = source[-1]["chunk_index"]
+        doc.index_checkpoint = copied
+        db.add(doc)
+        publish_document_status(db, doc, progress_only=True)
+        db.commit()
+    if copied != donor.chunk_count:
+        # The donor was reindexed or deleted mid-copy; a retry builds from the file.
+        raise ValueError("Duplicate document changed while its chunks were being copied")
+    return copied
+
+
+def _build_target(doc: Document, space: EmbeddingSpace) -> tuple[int, int]:
+    """Version to build and the chunk to start from: resume a checkpointed build, else open a new version."""
+
+    if doc.building_version is not None and doc.index_checkpoint and doc.index_params == _index_params(space):
+        return doc.building_version, doc.index_checkpoint
+    return max(doc.active_version or 0, doc.building_version or 0) + 1, 0
+
+
+def collect_old_versions(db: Session, document_id: uuid.UUID) -> int:
+    """Delete chunk versions older than the active one, one bounded batch per transaction.
+
+    Versions only grow, so anything below `active_version` is unreachable: neither served
+    nor being built. Small transactions keep locks short while retrieval keeps reading.
+    """
+
+    batch_size = get_settings().index_gc_batch_size
+    active = select(Document.active_version).where(Document.id == document_id).scalar_subquery()
+    removed = 0
+    while True:
+        ids = db.execute(
+            select(Chunk.id).where(Chunk.document_id == document_id, Chunk.index_version < active).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.execute(delete(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(ids)))
+        db.execute(delete(Chunk).where(Chunk.id.in_(ids)))
+        db.commit()
+        removed += len(ids)
+    if removed:
+        logger.info("index.gc", extra={"doc_id": str(document_id), "chunks_removed": removed})
+    return removed
+
+
+def collect_all_old_versions(db: Session) -> int:
+    """Maintenance sweep for versions left behind (e.g. a crash between flip and GC)."""
+
+    doc_ids = db.execute(
+        select(Chunk.document_id)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(Chunk.index_version < Document.active_version)
+        .distinct()
+    ).scalars().all()
+    return sum(collect_old_versions(db, doc_id) for doc_id in doc_ids)
+
+
+def _fail_build(db: Session, user: User, doc: Document, exc: BaseException | str) -> None:
+    """Record a failed build; committed batches and the checkpoint survive for a retry."""
+
+    doc.status = "failed"
+    doc.error_message = str(exc)
     db.add(doc)
+    publish_document_status(db, doc)
     db.commit()
-
-    logger.info("upload.accepted", extra={"doc_id": doc_id, "document_name": safe_name, "user_id": str(user.id)})
-    return _to_metadata(doc)
+    logger.error(
+        "index.failed",
+        exc_info=exc if isinstance(exc, BaseException) else None,
+        extra={
+            "doc_id": str(doc.id),
+            "document_name": doc.filename,
+            "user_id": str(user.id),
+            "checkpoint_chunk": doc.index_checkpoint,
+        },
+    )
 
 
-def index_document(db: Session, user: User, doc_id: str) -> DocumentMetadata:
-    doc_uuid = uuid.UUID(doc_id)
-    doc = db.execute(select(Document).where(Document.id == doc_uuid, Document.user_id == user.id)).scalar_one_or_none()
-    if not doc:
-        raise ValueError("Document not found")
+def _start_build(db: Session, user: User, doc: Document, space: EmbeddingSpace) -> _Build | None:
+    """Mark `doc` indexing and open (or resume) its next version; None if it failed already."""
 
     doc.status = "indexing"
     doc.error_message = None
     db.add(doc)
+    publish_document_status(db, doc)
     db.commit()
+    logger.info("index.start", extra={"doc_id": str(doc.id), "document_name": doc.filename, "user_id": str(user.id)})
 
-    logger.info("index.start", extra={"doc_id": doc_id, "document_name": doc.filename, "user_id": str(user.id)})
-
-    stored_path = _find_stored_path(str(user.id), doc_id, doc.stored_filename)
+    stored_path = _stored_path(doc)
     if stored_path is None:
-        doc.status = "failed"
-        doc.error_message = "Stored file not found on disk"
-        db.add(doc)
-        db.commit()
-        return _to_metadata(doc)
+        _fail_build(db, user, doc, "Stored file not found on disk")
+        return None
+
+    version, resume_from = _build_target(doc, space)
+    build = _Build(
+        doc=doc,
+        path=stored_path,
+        ext=Path(doc.filename).suffix.lower(),
+        version=version,
+        resume_from=resume_from,
+        chunk_count=resume_from,
+    )
+    write_start = perf_counter()
+    leftovers = (Chunk.document_id == doc.id, Chunk.index_version == version, Chunk.chunk_index >= resume_from)
+    db.execute(delete(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(select(Chunk.id).where(*leftovers))))
+    db.execute(delete(Chunk).where(*leftovers))
+    doc.building_version = version
+    doc.index_checkpoint = resume_from
+    doc.index_params = _index_params(space)
+    db.add(doc)
+    db.commit()
+    build.write_s += perf_counter() - write_start
+    if resume_from:
+        logger.info(
+            "index.resume", extra={"doc_id": str(doc.id), "index_version": version, "resume_from_chunk": resume_from}
+        )
+    return build
+
+
+def _finish_build(db: Session, user: User, build: _Build, spaces: list[EmbeddingSpace], stages: dict) -> None:
+    """Top up missing vectors, flip the new version live, then GC the old one."""
+
+    doc = build.doc
+    build.done = True
+    if not build.chunk_count:
+        raise ValueError("Document is empty after preprocessing")
+
+    # Spaces can change mid-build (a backfill started, or finished and switched the
+    # tenant); vectors for checkpointed batches may be missing there. Fill them in so
+    # the flip never serves chunks retrieval cannot find.
+    write_start = perf_counter()
+    this_version = (Chunk.document_id == doc.id, Chunk.index_version == build.version)
+    for space in index_spaces(db, user):
+        while embed_missing_chunks(db, space, *this_version, limit=get_settings().index_batch_size)[0]:
+            db.commit()
+    # Re-checked under the tenant lock, held until the flip commits, so a backfill cannot
+    # switch spaces between this check and the flip.
+    cover_index_spaces(db, user, *this_version)
+
+    # The flip: one row update makes the new version visible and the old one unreachable.
+    doc.active_version = build.version
+    doc.building_version = None
+    doc.chunk_count = build.chunk_count
+    doc.index_checkpoint = 0
+    doc.indexed_at = datetime.now(timezone.utc)
+    doc.status = "indexed"
+    doc.error_message = None
+    db.add(doc)
+    publish_document_status(db, doc)
+    db.commit()
+    build.write_s += perf_counter() - write_start
+    rows_written = (1 + len(spaces)) * (build.chunk_count - build.resume_from)
+    logger.info(
+        "index.complete",
+        extra={
+            "doc_id": str(doc.id),
+            "document_name": doc.filename,
+            "chunk_count": doc.chunk_count,
+            "index_version": build.version,
+            "resumed_from_chunk": build.resume_from,
+            "user_id": str(user.id),
+            "write_ms": round(build.write_s * 1000.0, 2),
+            "rows_per_s": round(rows_written / build.write_s, 1) if build.write_s > 0 else None,
+            "stages": stages,
+        },
+    )
+    try:
+        collect_old_versions(db, doc.id)
+    except Exception:  # noqa: BLE001 - the worker maintenance sweep retries GC
+        db.rollback()
+        logger.exception("index.gc_failed", extra={"doc_id": str(doc.id)})
+
 
+def _finish_or_fail(db: Session, user: User, build: _Build, spaces: list[EmbeddingSpace], stages: dict) -> None:
     try:
-        content = stored_path.read_bytes()
-        ext = stored_path.suffix.lower()
-        if ext in {".txt", ".md"}:
-            text = content.decode("utf-8")
-        elif ext == ".pdf":
-            text = pdf_service.extract_text_from_pdf(content)
+        _finish_build(db, user, build, spaces, stages)
+    except Exception as exc:  # noqa: BLE001 - persist failure for UI debugging
+        db.rollback()
+        _fail_build(db, user, build.doc, exc)
+
+
+def _write_packed(
+    db: Session, batch: list[tuple[_Build, object]], embeddings: dict[str, list[list[float]]]
+) -> list[tuple[_Build, object]]:
+    """Insert one packed batch (chunks of any number of documents) and advance checkpoints.
+
+    Returns the end/failure markers in the batch, in order, for the caller to act on.
+    """
+
+    write_start = perf_counter()
+    rows: list[dict] = []
+    per_build: dict[int, tuple[_Build, int]] = {}
+    markers: list[tuple[_Build, object]] = []
+    for build, entry in batch:
+        if isinstance(entry, ChunkSchema):
+            rows.extend(chunk_rows(build.doc.id, [entry], index_version=build.version))
+            seen = per_build.get(id(build), (build, 0))
+            per_build[id(build)] = (build, seen[1] + 1)
         else:
-            raise ValueError(f"Unsupported file type: {ext}")
+            markers.append((build, entry))
+    bulk_insert_chunks(db, rows, embeddings)
+    for build, count in per_build.values():
+        build.chunk_count += count
+        build.doc.index_checkpoint = build.chunk_count
+        db.add(build.doc)
+        publish_document_status(db, build.doc, progress_only=True)
+    db.commit()
+    elapsed = perf_counter() - write_start
+    for build, count in per_build.values():
+        build.write_s += elapsed * count / len(rows)
+    return markers
 
-        chunks = chunk_text(text=text, chunk_size=get_settings().chunk_size, overlap=get_settings().chunk_overlap)
-        if not chunks:
-            raise ValueError("Document is empty after preprocessing")
 
-        # Clear any existing chunks/embeddings for idempotency.
-        chunk_ids_subq = select(Chunk.id).where(Chunk.document_id == doc.id)
-        db.execute(delete(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(chunk_ids_subq)))
-        db.execute(delete(Chunk).where(Chunk.document_id == doc.id))
-        db.commit()
+def index_documents(db: Session, user: User, doc_ids: list[str]) -> dict[str, DocumentMetadata]:
+    """Index several documents of one tenant through a single shared pipeline.
+
+    Extraction, chunking and embedding run as pipeline stages in their own threads, so
+    embedding batch N overlaps the write of batch N-1; writes stay on this thread, which
+    owns `db`. Chunks are packed into embedding batches across document boundaries, so
+    many small files cost as few embedding requests as one large one. Each batch commits
+    with per-document checkpoints, so a retry after a failure resumes after the last
+    committed batch instead of re-paying for its embeddings. Each document's new chunks
+    form a new version; retrieval keeps serving the active version until that document's
+    flip, so a reindex never leaves a document empty or half-built.
 
-        chunk_texts = [chunk.text for chunk in chunks]
-        embeddings = get_embeddings(chunk_texts)
-        for chunk_model, embedding in zip(chunks, embeddings):
-            chunk_row = Chunk(
-                id=uuid.uuid4(),
-                document_id=doc.id,
-                chunk_index=chunk_model.chunk_index,
-                start_char=chunk_model.start_char,
-                end_char=chunk_model.end_char,
-                text=chunk_model.text,
+    Returns metadata per found document id; ids that do not belong to `user` are omitted.
+    """
+
+    uuids = [uuid.UUID(d) for d in doc_ids]
+    found = {
+        d.id: d
+        for d in db.execute(select(Document).where(Document.id.in_(uuids), Document.user_id == user.id)).scalars()
+    }
+    docs = [found[u] for u in uuids if u in found]
+    spaces = index_spaces(db, user)
+
+    builds: list[_Build] = []
+    for doc in docs:
+        build = _start_build(db, user, doc, spaces[0])
+        if build is None:
+            continue
+        # A re-upload of bytes that are already indexed copies those chunks instead.
+        donor = _find_donor(db, doc) if not build.resume_from else None
+        if donor is None:
+            builds.append(build)
+            continue
+        try:
+            write_start = perf_counter()
+            build.chunk_count = _copy_indexed_version(db, donor, doc, build.version)
+            build.write_s += perf_counter() - write_start
+            logger.info(
+                "index.reused",
+                extra={"doc_id": str(doc.id), "donor_doc_id": str(donor.id), "chunk_count": build.chunk_count},
             )
-            db.add(chunk_row)
-            db.flush()
-            db.add(ChunkEmbedding(chunk_id=chunk_row.id, embedding=embedding))
-        db.commit()
+        except Exception as exc:  # noqa: BLE001 - persist failure for UI debugging
+            db.rollback()
+            _fail_build(db, user, doc, exc)
+            continue
+        _finish_or_fail(db, user, build, spaces, {})
+
+    if builds:
+        settings = get_settings()
+        pipeline = StagePipeline(queue_size=settings.index_pipeline_queue_size)
+        try:
+            extracted = pipeline.source("extract", _extract_documents(builds))
+            chunked = pipeline.stage("chunk", extracted, _chunk_documents)
+            packed = pipeline.stage("pack", chunked, lambda stream: _pack(stream, settings.index_batch_size))
+            embedded = pipeline.stage("embed", packed, lambda batches: _embed_packed(batches, spaces))
+            for batch, embeddings in pipeline.consume("write", embedded):
+                for build, marker in _write_packed(db, batch, embeddings):
+                    if isinstance(marker, _DocFailed):
+                        build.done = True
+                        _fail_build(db, user, build.doc, marker.exc)
+                    else:
+                        _finish_or_fail(db, user, build, spaces, pipeline.stats())
+            pipeline.close()
+        except Exception as exc:  # noqa: BLE001 - persist failure for UI debugging
+            pipeline.close()
+            # Only the in-flight batch is lost; committed batches and checkpoints survive.
+            db.rollback()
+            for build in builds:
+                if not build.done:
+                    _fail_build(db, user, build.doc, exc)
+
+    return {str(doc.id): _to_metadata(doc) for doc in docs}
 
-        doc.chunk_count = len(chunks)
-        doc.indexed_at = datetime.now(timezone.utc)
-        doc.status = "indexed"
-        doc.error_message = None
-        db.add(doc)
-        db.commit()
-        logger.info(
-            "index.complete",
-            extra={"doc_id": doc_id, "document_name": doc.filename, "chunk_count": doc.chunk_count, "user_id": str(user.id)},
-        )
-        return _to_metadata(doc)
-    except Exception as exc:  # noqa: BLE001 - persist failure for UI debugging
-        doc.status = "failed"
-        doc.error_message = str(exc)
-        db.add(doc)
-        db.commit()
-        logger.exception("index.failed", extra={"doc_id": doc_id, "document_name": doc.filename, "user_id": str(user.id)})
-        return _to_metadata(doc)
+
+def index_document(db: Session, user: User, doc_id: str) -> DocumentMetadata:
+    result = index_documents(db, user, [doc_id]).get(str(uuid.UUID(doc_id)))
+    if result is None:
+        raise ValueError("Document not found")
+    return result
 
 
 def index_document_task(user_id: str, doc_id: str) -> None:
@@ -192,11 +798,171 @@ def index_document_task(user_id: str, doc_id: str) -> None:
         index_document(db=db, user=user, doc_id=doc_id)
 
 
+def _write_gap(sink: _UploadSink, length: int) -> None:
+    while length > 0:
+        step = min(length, _UPLOAD_CHUNK_BYTES)
+        sink.write(b" " * step)
+        length -= step
+
+
+def import_indexed_document(
+    db: Session,
+    user: User,
+    filename: str,
+    chunks: Iterable[tuple[ChunkSchema, Sequence[float]]],
+    space: EmbeddingSpace,
+    source: Path | None = None,
+    uploaded_at: datetime | None = None,
+) -> DocumentMetadata:
+    """Store a document from precomputed chunks and vectors, without calling the embeddings API.
+
+    `source` is the original file. Without it, the text is reassembled from the chunk
+    offsets (chunks must arrive ordered by `start_char`; gaps become spaces) and stored as
+    a text blob, so the document can still be reindexed like an upload. Chunks go through
+    the bulk insert path in INDEX_BATCH_SIZE batches and the document appears in one
+    commit at the end; a failure leaves nothing behind.
+    """
+
+    if source is not None:
+        safe_name, extension = _validate_upload_name(filename)
+    else:
+        safe_name, extension = _sanitize_filename(filename), ".txt"
+        if Path(safe_name).suffix.lower() not in {".txt", ".md"}:
+            safe_name = f"{safe_name}.txt"
+    now = datetime.now(timezone.utc)
+    doc = Document(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        filename=safe_name,
+        stored_filename="",
+        status="indexing",
+        chunk_count=0,
+        uploaded_at=uploaded_at or now,
+        building_version=1,
+        # Never matches _index_params, so imported chunks are not reused as a dedupe donor.
+        index_params=f"import;embedding={space.name}:{space.model}:{space.dims}",
+    )
+    sink = _UploadSink(blob_store.staging_dir(), extension)
+    write_start = perf_counter()
+    new_blob: str | None = None
+    try:
+        db.add(doc)
+        db.flush()
+        if source is not None:
+            with source.open("rb") as f:
+                while data := f.read(_UPLOAD_CHUNK_BYTES):
+                    sink.write(data)
+        pending = iter(chunks)
+        text_end = 0
+        while batch := list(islice(pending, get_settings().index_batch_size)):
+            for chunk, _ in batch if source is None else ():
+                # Chunk text may be stripped, so it can be shorter than its offset span.
+                _write_gap(sink, chunk.start_char - text_end)
+                chunk_end = chunk.start_char + len(chunk.text)
+                if chunk_end > text_end:
+                    # Overlapping chunks repeat text that is already written.
+                    sink.write(chunk.text[max(0, text_end - chunk.start_char) :].encode("utf-8"))
+                    text_end = chunk_end
+            bulk_insert_chunks(
+                db,
+                chunk_rows(doc.id, [chunk for chunk, _ in batch], index_version=1),
+                {space.name: [vector for _, vector in batch]},
+            )
+            doc.chunk_count += len(batch)
+        if not doc.chunk_count:
+            raise ValueError("Document has no chunks")
+
+        sha256 = sink.finish()
+        if not blob_store.acquire(db, sha256, sink.size, sink.tmp_path):
+            new_blob = sha256
+        doc.stored_filename = blob_store.blob_key(sha256)
+        doc.content_sha256 = sha256
+        doc.size_bytes = sink.size
+        # Chunks arrive with vectors for `space` only; any other space the tenant now
+        # indexes into (a backfill target, or a space switched to meanwhile) is embedded.
+        cover_index_spaces(db, user, Chunk.document_id == doc.id)
+        doc.active_version = 1
+        doc.building_version = None
+        doc.indexed_at = now
+        doc.status = "indexed"
+        db.add(doc)
+        publish_document_status(db, doc)
+        db.commit()
+    except BaseException:
+        if new_blob is not None:
+            blob_store.abandon(new_blob)
+        db.rollback()
+        sink.discard()
+        raise
+
+    logger.info(
+        "import.document",
+        extra={
+            "doc_id": str(doc.id),
+            "document_name": safe_name,
+            "user_id": str(user.id),
+            "chunk_count": doc.chunk_count,
+            "space": space.name,
+            "write_ms": round((perf_counter() - write_start) * 1000.0, 2),
+        },
+    )
+    return _to_metadata(doc)
+
+
 def list_documents(db: Session, user: User) -> list[DocumentMetadata]:
     docs = db.execute(select(Document).where(Document.user_id == user.id).order_by(Document.uploaded_at.desc())).scalars().all()
     return [_to_metadata(d) for d in docs]
 
 
+def _encode_cursor(uploaded_at: datetime, doc_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{uploaded_at.isoformat()}|{doc_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, doc_id = raw.split("|", 1)
+        return datetime.fromisoformat(uploaded_at), uuid.UUID(doc_id)
+    except ValueError as exc:  # covers binascii.Error and UnicodeDecodeError
+        raise ValueError("Invalid cursor") from exc
+
+
+def documents_etag(user: User, *variant: object) -> str:
+    """Weak ETag of a document listing: the tenant's documents_version plus the page/projection asked for."""
+
+    digest = hashlib.sha1(repr(variant).encode()).hexdigest()[:12]
+    return f'W/"{user.documents_version or 0}-{digest}"'
+
+
+def list_documents_page(
+    db: Session, user: User, limit: int, cursor: str | None = None, fields: Sequence[str] | None = None
+) -> tuple[list[dict], str | None]:
+    """One page of `user`'s documents, newest first, by keyset on (uploaded_at, id).
+
+    Returns JSON-ready dicts holding only `fields` (all when None) and the cursor of the
+    next page (None on the last one). Only the columns needed are read.
+    """
+
+    selected = set(fields or _DOCUMENT_FIELDS)
+    unknown = selected.difference(_DOCUMENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown document fields: {', '.join(sorted(unknown))}")
+    columns = [getattr(Document, name) for name in _DOCUMENT_FIELDS if name in selected or name in _REQUIRED_FIELDS]
+
+    stmt = select(*columns).where(Document.user_id == user.id)
+    if cursor:
+        stmt = stmt.where(tuple_(Document.uploaded_at, Document.id) < _decode_cursor(cursor))
+    rows = db.execute(stmt.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit + 1)).mappings().all()
+
+    page = rows[:limit]
+    documents = [
+        DocumentMetadata.model_validate({**row, "id": str(row["id"])}).model_dump(mode="json", include=selected)
+        for row in page
+    ]
+    next_cursor = _encode_cursor(page[-1]["uploaded_at"], page[-1]["id"]) if len(rows) > limit else None
+    return documents, next_cursor
+
+
 def get_document(db: Session, user: User, doc_id: str) -> DocumentMetadata | None:
     doc_uuid = uuid.UUID(doc_id)
     d = db.execute(select(Document).where(Document.id == doc_uuid, Document.user_id == user.id)).scalar_one_or_none()
@@ -209,28 +975,31 @@ def delete_document_everywhere(db: Session, user: User, doc_id: str) -> None:
     if not d:
         raise ValueError("Document not found")
 
-    stored_path = _find_stored_path(str(user.id), doc_id, d.stored_filename)
-    if stored_path and stored_path.exists():
-        stored_path.unlink()
-
+    legacy_path = None if _in_blob_store(d) else _stored_path(d)
+    orphan = blob_store.release(db, d.content_sha256) if _in_blob_store(d) else None
     db.execute(delete(Document).where(Document.id == d.id))
+    _touch_documents(db, d.user_id)
+    status_feed.publish(db, d.user_id, {"type": "deleted", "id": str(d.id)})
     db.commit()
+    if orphan is not None:
+        blob_store.discard(db, orphan)
+    if legacy_path is not None:
+        legacy_path.unlink()
 
 
 def mark_queued(db: Session, user: User, doc_id: str) -> DocumentMetadata:
+    """Queue a reindex. The active chunk set keeps serving until the new version replaces it."""
+
     doc_uuid = uuid.UUID(doc_id)
     d = db.execute(select(Document).where(Document.id == doc_uuid, Document.user_id == user.id)).scalar_one_or_none()
     if not d:
         raise ValueError("Document not found")
 
-    chunk_ids_subq = select(Chunk.id).where(Chunk.document_id == d.id)
-    db.execute(delete(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(chunk_ids_subq)))
-    db.execute(delete(Chunk).where(Chunk.document_id == d.id))
-
     d.status = "queued"
     d.error_message = None
-    d.indexed_at = None
-    d.chunk_count = 0
+    # Build a fresh version rather than resuming a checkpointed one.
+    d.index_checkpoint = 0
     db.add(d)
+    publish_document_status(db, d)
     db.commit()
     return _to_metadata(d)
@@ -0,0 +1,409 @@
+"""Re-embed a tenant's corpus into another embedding space without a retrieval outage.
+
+Retrieval keeps using the tenant's current space while a backfill fills in vectors for the
+target space in small, throttled batches. Indexing writes vectors for every space with a
+live backfill, so new documents never fall behind. Once no served chunk is missing a
+target vector, the tenant's `embedding_space` flips; that check and the flip hold the
+tenant row lock, which chunk writers share while they cover their spaces (see
+`cover_index_spaces`).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Select, exists, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import get_settings
+from app.db.models import Chunk, ChunkEmbedding, Document, EmbeddingBackfill, EmbeddingSpacePin, User
+from app.db.session import get_engine
+from app.models.schemas import EmbeddingBackfillStatus, EmbeddingSpaceInfo, EmbeddingSpacesResponse
+from app.rag.embedding import EmbeddingSpace, estimate_tokens, get_embedding_space, get_embedding_spaces, get_embeddings
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE_STATUSES = ("pending", "running")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _session_factory() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def _served_by(user_id: uuid.UUID) -> tuple:
+    """Chunks a tenant serves now or is about to serve (active and in-progress versions)."""
+
+    return (
+        Document.user_id == user_id,
+        or_(Chunk.index_version == Document.active_version, Chunk.index_version == Document.building_version),
+    )
+
+
+def _missing_in(space_name: str):
+    return ~exists().where(ChunkEmbedding.chunk_id == Chunk.id, ChunkEmbedding.space == space_name)
+
+
+def embed_missing_chunks(db: Session, space: EmbeddingSpace, *criteria, limit: int | None = None) -> tuple[int, int]:
+    """Embed chunks matching `criteria` that have no vector in `space`; returns (chunks, tokens).
+
+    Does not commit. A concurrent writer (indexing or GC) can make the insert fail with an
+    IntegrityError; callers roll back and retry, which re-selects what is still missing.
+    """
+
+    stmt = (
+        select(Chunk.id, Chunk.text)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(*criteria, _missing_in(space.name))
+        .order_by(Chunk.id)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = db.execute(stmt).all()
+    if not rows:
+        return 0, 0
+
+    texts = [r.text for r in rows]
+    vectors = get_embeddings(texts, space=space)
+    db.execute(
+        insert(ChunkEmbedding),
+        [{"chunk_id": r.id, "space": space.name, "embedding": list(v)} for r, v in zip(rows, vectors)],
+    )
+    return len(rows), estimate_tokens(texts)
+
+
+def active_space(user: User) -> EmbeddingSpace:
+    """The space retrieval queries for `user`."""
+
+    return get_embedding_space(user.embedding_space)
+
+
+def index_spaces(db: Session, user: User) -> list[EmbeddingSpace]:
+    """Spaces new chunks are embedded into: the active one plus any live backfill targets."""
+
+    spaces = [active_space(user)]
+    configured = get_embedding_spaces()
+    targets = db.execute(
+        select(EmbeddingBackfill.space).where(
+            EmbeddingBackfill.user_id == user.id, EmbeddingBackfill.status.in_(_ACTIVE_STATUSES)
+        )
+    ).scalars().all()
+    for name in targets:
+        if name in configured and all(s.name != name for s in spaces):
+            spaces.append(configured[name])
+    return spaces
+
+
+def _lock_tenant(db: Session, user_id: uuid.UUID, shared: bool) -> User:
+    """Lock the tenant row (and reload it): shared by chunk writers, exclusive for a space switch.
+
+    Writers take FOR KEY SHARE, which conflicts with the switch's FOR UPDATE but not with
+    the non-key `UPDATE users` that `publish_document_status` makes later in the same
+    transaction; FOR SHARE would deadlock two writers of one tenant against each other.
+    """
+
+    return db.execute(_tenant_lock(user_id, shared)).scalar_one()
+
+
+def _tenant_lock(user_id: uuid.UUID, shared: bool) -> Select:
+    stmt = select(User).where(User.id == user_id).execution_options(populate_existing=True)
+    return stmt.with_for_update(read=True, key_share=True) if shared else stmt.with_for_update()
+
+
+def cover_index_spaces(db: Session, user: User, *criteria) -> None:
+    """Give chunks matching `criteria` a vector in every space the tenant indexes into. Does not commit.
+
+    Call right before the commit that makes the chunks servable. The embedding calls run
+    first, unlocked; then the tenant row is locked (held until the caller's commit) and the
+    spaces re-read. `_finish` locks the row exclusively before switching spaces, so a switch
+    cannot land between that re-check and the commit. Only a backfill started in between
+    leaves work for the locked re-check.
+    """
+
+    for space in index_spaces(db, user):
+        embed_missing_chunks(db, space, *criteria)
+    locked = _lock_tenant(db, user.id, shared=True)
+    for space in index_spaces(db, locked):
+        embed_missing_chunks(db, space, *criteria)
+
+
+def start_backfill(db: Session, user: User, space_name: str) -> EmbeddingBackfill:
+    """Queue a backfill of `user`'s chunks into `space_name`; a live one for it is reused."""
+
+    space = get_embedding_space(space_name)
+    if space.name == active_space(user).name:
+        raise ValueError(f"Embedding space already active: {space.name}")
+
+    live = db.execute(
+        select(EmbeddingBackfill).where(
+            EmbeddingBackfill.user_id == user.id, EmbeddingBackfill.status.in_(_ACTIVE_STATUSES)
+        )
+    ).scalar_one_or_none()
+    if live is not None:
+        if live.space == space.name:
+            return live
+        raise ValueError(f"A backfill into {live.space} is already in progress")
+
+    backfill = EmbeddingBackfill(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        space=space.name,
+        status="pending",
+        embedded_chunks=0,
+        tokens_estimate=0,
+        created_at=_now(),
+    )
+    db.add(backfill)
+    db.commit()
+    logger.info("backfill.enqueued", extra={"backfill_id": str(backfill.id), "user_id": str(user.id), "space": space.name})
+    return backfill
+
+
+def claim_backfill(db: Session, worker_id: str, backfill_id: uuid.UUID | None = None) -> EmbeddingBackfill | None:
+    """Take the oldest pending backfill (or `backfill_id`) and mark it running."""
+
+    stmt = select(EmbeddingBackfill).where(EmbeddingBackfill.status == "pending")
+    if backfill_id is not None:
+        stmt = stmt.where(EmbeddingBackfill.id == backfill_id)
+    else:
+        stmt = stmt.order_by(EmbeddingBackfill.created_at)
+    backfill = db.execute(stmt.limit(1).with_for_update(skip_locked=True)).scalar_one_or_none()
+    if backfill is None:
+        db.rollback()
+        return None
+
+    backfill.status = "running"
+    backfill.locked_by = worker_id
+    backfill.heartbeat_at = _now()
+    db.add(backfill)
+    db.commit()
+    return backfill
+
+
+def _finish(db: Session, backfill: EmbeddingBackfill, space: EmbeddingSpace) -> bool:
+    """Switch the tenant to `space` if coverage is still complete under the tenant lock.
+
+    A build that read its spaces before this backfill existed can commit chunks after the
+    last batch looked; then nothing is switched and False sends the backfill round again.
+    """
+
+    user = _lock_tenant(db, backfill.user_id, shared=False)
+    uncovered = db.execute(
+        select(Chunk.id)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(*_served_by(backfill.user_id), _missing_in(space.name))
+        .limit(1)
+    ).first()
+    if uncovered is not None:
+        db.rollback()
+        return False
+
+    user.embedding_space = space.name
+    backfill.status = "done"
+    backfill.locked_by = None
+    backfill.heartbeat_at = None
+    backfill.finished_at = _now()
+    db.add_all([user, backfill])
+    db.commit()
+    logger.info(
+        "backfill.complete",
+        extra={
+            "backfill_id": str(backfill.id),
+            "user_id": str(backfill.user_id),
+            "space": space.name,
+            "embedded_chunks": backfill.embedded_chunks,
+            "tokens_estimate": backfill.tokens_estimate,
+            "cost_estimate_usd": round(space.estimate_cost_usd(backfill.tokens_estimate), 6),
+        },
+    )
+    return True
+
+
+def run_backfill(db: Session, backfill: EmbeddingBackfill, stop: threading.Event | None = None) -> None:
+    """Embed missing chunks batch by batch, pausing between batches, until coverage is 100%.
+
+    Each batch commits with the progress counters (which double as the heartbeat), so an
+    interrupted backfill resumes where it stopped. The tenant switches to the new space
+    once a final check, made under the tenant row lock, finds nothing left to embed.
+    """
+
+    settings = get_settings()
+    stop = stop or threading.Event()
+    try:
+        space = get_embedding_space(backfill.space)
+    except ValueError as exc:
+        backfill.status = "failed"
+        backfill.last_error = str(exc)
+        backfill.finished_at = _now()
+        db.add(backfill)
+        db.commit()
+        return
+
+    logger.info("backfill.start", extra={"backfill_id": str(backfill.id), "space": space.name})
+    while True:
+        if stop.is_set():
+            # Hand it back to the queue; the next worker picks up from the committed progress.
+            backfill.status = "pending"
+            backfill.locked_by = None
+            db.add(backfill)
+            db.commit()
+            return
+        try:
+            embedded, tokens = embed_missing_chunks(
+                db, space, *_served_by(backfill.user_id), limit=settings.embedding_backfill_batch_size
+            )
+            if not embedded and _finish(db, backfill, space):
+                return
+            backfill.embedded_chunks += embedded
+            backfill.tokens_estimate += tokens
+            backfill.heartbeat_at = _now()
+            db.add(backfill)
+            db.commit()
+        except IntegrityError:
+            # Raced with indexing or GC on the same chunks; the next batch re-selects.
+            db.rollback()
+        except Exception as exc:  # noqa: BLE001 - recorded on the backfill; restarting resumes it
+            db.rollback()
+            backfill.status = "failed"
+            backfill.last_error = str(exc) or type(exc).__name__
+            backfill.locked_by = None
+            backfill.finished_at = _now()
+            db.add(backfill)
+            db.commit()
+            logger.exception("backfill.failed", extra={"backfill_id": str(backfill.id), "space": space.name})
+            return
+        stop.wait(settings.embedding_backfill_interval_s)
+
+
+def process_next_backfill(
+    worker_id: str, backfill_id: uuid.UUID | None = None, stop: threading.Event | None = None
+) -> bool:
+    """Claim and run one backfill in a fresh session; False if nothing was available."""
+
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        backfill = claim_backfill(db, worker_id, backfill_id=backfill_id)
+        if backfill is None:
+            return False
+        run_backfill(db, backfill, stop=stop)
+        return True
+
+
+def run_backfill_task(backfill_id: str) -> None:
+    """BackgroundTasks entrypoint: run a specific backfill in-process unless a worker took it."""
+
+    process_next_backfill(worker_id=f"web-{uuid.uuid4().hex[:8]}", backfill_id=uuid.UUID(backfill_id))
+
+
+def recover_stale_backfills(db: Session) -> int:
+    """Return running backfills whose worker stopped making progress to the queue."""
+
+    cutoff = _now() - timedelta(seconds=get_settings().index_job_stale_after_s)
+    stale = db.execute(
+        select(EmbeddingBackfill)
+        .where(EmbeddingBackfill.status == "running", EmbeddingBackfill.heartbeat_at < cutoff)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    for backfill in stale:
+        backfill.status = "pending"
+        backfill.locked_by = None
+        backfill.heartbeat_at = None
+        db.add(backfill)
+    db.commit()
+    if stale:
+        logger.warning("backfill.recovered_stale", extra={"count": len(stale)})
+    return len(stale)
+
+
+def _backfill_status(db: Session, backfill: EmbeddingBackfill, spaces: dict[str, EmbeddingSpace]) -> EmbeddingBackfillStatus:
+    served = (
+        select(func.count(), func.coalesce(func.sum(func.length(Chunk.text)), 0))
+        .select_from(Chunk)
+        .join(Document, Chunk.document_id == Document.id)
+        .where(*_served_by(backfill.user_id))
+    )
+    total, _ = db.execute(served).one()
+    missing, missing_chars = db.execute(served.where(_missing_in(backfill.space))).one()
+    if backfill.status == "done":
+        missing, missing_chars = 0, 0
+    space = spaces.get(backfill.space)
+    covered = total - missing
+    return EmbeddingBackfillStatus(
+        id=str(backfill.id),
+        space=backfill.space,
+        status=backfill.status,  # type: ignore[arg-type]
+        total_chunks=total,
+        covered_chunks=covered,
+        coverage_pct=round(100.0 * covered / total, 2) if total else 100.0,
+        embedded_chunks=backfill.embedded_chunks,
+        tokens_estimate=backfill.tokens_estimate,
+        cost_estimate_usd=round(space.estimate_cost_usd(backfill.tokens_estimate), 6) if space else 0.0,
+        remaining_cost_estimate_usd=round(space.estimate_cost_usd(int(missing_chars) // 4), 6) if space else 0.0,
+        created_at=backfill.created_at,
+        finished_at=backfill.finished_at,
+        last_error=backfill.last_error,
+    )
+
+
+def describe_spaces(db: Session, user: User, limit: int = 10) -> EmbeddingSpacesResponse:
+    """Configured spaces, the tenant's active one, and recent backfills with coverage and cost."""
+
+    spaces = get_embedding_spaces()
+    current = active_space(user).name
+    backfills = db.execute(
+        select(EmbeddingBackfill)
+        .where(EmbeddingBackfill.user_id == user.id)
+        .order_by(EmbeddingBackfill.created_at.desc())
+        .limit(limit)
+    ).scalars().all()
+    return EmbeddingSpacesResponse(
+        active_space=current,
+        spaces=[
+            EmbeddingSpaceInfo(name=s.name, model=s.model, dims=s.dims, active=s.name == current) for s in spaces.values()
+        ],
+        backfills=[_backfill_status(db, b, spaces) for b in backfills],
+    )
+
+
+def pin_embedding_spaces(db: Session) -> None:
+    """Record which model each configured space's vectors come from; fail if one changed.
+
+    Run at app and worker start. Changing a space's model or dims (EMBEDDING_MODEL, for
+    "default") while it holds vectors would mix two models in one space and silently
+    degrade retrieval; the way to switch models is a new named space plus a backfill.
+    A space with no vectors yet is simply re-pinned.
+    """
+
+    for space in get_embedding_spaces().values():
+        pin = db.get(EmbeddingSpacePin, space.name)
+        if pin is None:
+            try:
+                with db.begin_nested():
+                    db.add(EmbeddingSpacePin(space=space.name, model=space.model, dims=space.dims, pinned_at=_now()))
+            except IntegrityError:
+                pin = db.get(EmbeddingSpacePin, space.name)  # another process pinned it first
+        if pin is None or (pin.model, pin.dims) == (space.model, space.dims):
+            continue
+
+        stored = db.execute(select(ChunkEmbedding.chunk_id).where(ChunkEmbedding.space == space.name).limit(1)).first()
+        if stored is not None:
+            db.rollback()
+            raise RuntimeError(
+                f"Embedding space {space.name!r} holds vectors from {pin.model} (dims={pin.dims}) but is configured "
+                f"for {space.model} (dims={space.dims}). Restore its configuration, and add the new model as another "
+                f"space in EMBEDDING_SPACES and backfill tenants into it."
+            )
+        logger.info(
+            "space.repinned", extra={"space": space.name, "from_model": pin.model, "to_model": space.model}
+        )
+        pin.model = space.model
+        pin.dims = space.dims
+        pin.pinned_at = _now()
+    db.commit()
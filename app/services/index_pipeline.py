@@ -0,0 +1,152 @@
+"""Threaded stage pipeline used by indexing.
+
+Each stage runs in its own thread and hands items to the next through a bounded queue, so
+a slow stage applies backpressure instead of letting work pile up in memory. The final
+stage is consumed on the caller's thread (the one that owns the DB session).
+
+    pipeline = StagePipeline(queue_size=2)
+    try:
+        pages = pipeline.source("extract", iter_pages(path))
+        batches = pipeline.stage("chunk", pages, lambda items: batched(iter_chunks(items), 100))
+        embedded = pipeline.stage("embed", batches, lambda items: map(embed, items))
+        for item in pipeline.consume("write", embedded):
+            write(item)
+    finally:
+        pipeline.close()
+    pipeline.stats()  # per-stage timings and queue depths
+"""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
+
+_DONE = object()
+_POLL_S = 0.1
+
+
+@dataclass
+class _Failure:
+    exc: BaseException
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    work_s: float = 0.0  # producing items, excluding time blocked on either queue
+    wait_in_s: float = 0.0  # starved: waiting for the upstream stage
+    wait_out_s: float = 0.0  # backpressure: waiting for room downstream
+    depth_samples: list[int] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        depths = self.depth_samples
+        return {
+            "items": self.items,
+            "work_ms": round(self.work_s * 1000.0, 2),
+            "wait_in_ms": round(self.wait_in_s * 1000.0, 2),
+            "wait_out_ms": round(self.wait_out_s * 1000.0, 2),
+            "max_queue_depth": max(depths, default=0),
+            "mean_queue_depth": round(sum(depths) / len(depths), 2) if depths else 0.0,
+        }
+
+
+class StagePipeline:
+    def __init__(self, queue_size: int) -> None:
+        self._queue_size = max(1, queue_size)
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._stats: list[StageStats] = []
+
+    def _drain(self, q: queue.Queue, stats: StageStats) -> Iterator[Any]:
+        """Yield items from an upstream queue, re-raising an upstream failure here."""
+
+        while True:
+            waited = perf_counter()
+            while True:
+                try:
+                    item = q.get(timeout=_POLL_S)
+                    break
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return
+            stats.wait_in_s += perf_counter() - waited
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+
+    def _put(self, q: queue.Queue, item: Any, stats: StageStats) -> bool:
+        waited = perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_S)
+                stats.wait_out_s += perf_counter() - waited
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _start(self, name: str, produce: Callable[[StageStats], Iterable[Any]]) -> queue.Queue:
+        stats = StageStats(name=name)
+        self._stats.append(stats)
+        out: queue.Queue = queue.Queue(maxsize=self._queue_size)
+
+        def _run() -> None:
+            started = perf_counter()
+            try:
+                for item in produce(stats):
+                    stats.items += 1
+                    stats.depth_samples.append(out.qsize())
+                    if not self._put(out, item, stats):
+                        return
+                self._put(out, _DONE, stats)
+            except BaseException as exc:  # noqa: BLE001 - surfaced on the consuming thread
+                self._put(out, _Failure(exc), stats)
+            finally:
+                stats.work_s = perf_counter() - started - stats.wait_in_s - stats.wait_out_s
+
+        ctx = contextvars.copy_context()
+        thread = threading.Thread(target=ctx.run, args=(_run,), name=f"index-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return out
+
+    def source(self, name: str, items: Iterable[Any]) -> queue.Queue:
+        """First stage: iterate `items` (e.g. extraction) in a thread."""
+
+        return self._start(name, lambda _stats: items)
+
+    def stage(self, name: str, upstream: queue.Queue, fn: Callable[[Iterator[Any]], Iterable[Any]]) -> queue.Queue:
+        """Run `fn` over the upstream stage's output in a thread; `fn` may be lazy."""
+
+        return self._start(name, lambda stats: fn(self._drain(upstream, stats)))
+
+    def consume(self, name: str, upstream: queue.Queue) -> Iterator[Any]:
+        """Final stage, on the caller's thread; the caller's time between items counts as work."""
+
+        stats = StageStats(name=name)
+        self._stats.append(stats)
+        started = perf_counter()
+        try:
+            for item in self._drain(upstream, stats):
+                stats.items += 1
+                yield item
+        finally:
+            stats.work_s = perf_counter() - started - stats.wait_in_s
+
+    def close(self) -> None:
+        """Stop all stage threads (after completion or when the consumer gives up)."""
+
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {s.name: s.to_dict() for s in self._stats}
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, sessionmaker
+
+from app.config import get_settings
+from app.db.models import Document, IndexJob, User
+from app.db.session import get_engine
+from app.services.document_service import index_documents, publish_document_status
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE_STATUSES = ("pending", "running")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _session_factory() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+def _pending_job(db: Session, document_id: uuid.UUID) -> IndexJob | None:
+    return db.execute(
+        select(IndexJob).where(IndexJob.document_id == document_id, IndexJob.status == "pending")
+    ).scalar_one_or_none()
+
+
+def enqueue_index_job(db: Session, user_id: uuid.UUID, document_id: uuid.UUID) -> IndexJob:
+    """Queue (re)indexing of a document. A job that is already pending is reused.
+
+    While a job for the document is running, the new one waits behind it: `claim_job`
+    skips documents with a running job, and the worker finishing that run claims it next.
+    The unique index on pending jobs makes this safe against concurrent enqueues: the
+    loser's insert conflicts and it reuses the winner's job.
+    """
+
+    while True:
+        existing = _pending_job(db, document_id)
+        if existing is not None:
+            return existing
+
+        now = _now()
+        job = IndexJob(
+            id=uuid.uuid4(),
+            document_id=document_id,
+            user_id=user_id,
+            status="pending",
+            attempts=0,
+            max_attempts=get_settings().index_job_max_attempts,
+            run_after=now,
+            created_at=now,
+        )
+        try:
+            with db.begin_nested():
+                db.add(job)
+        except IntegrityError:
+            # Another enqueue won; reuse its job (or, if it was claimed meanwhile, queue behind it).
+            continue
+        db.commit()
+        logger.info("job.enqueued", extra={"job_id": str(job.id), "doc_id": str(document_id)})
+        return job
+
+
+def _no_running_build() -> Any:
+    """Filter on IndexJob: no other job for the same document is running (builds must not overlap)."""
+
+    running = aliased(IndexJob)
+    return ~exists().where(running.document_id == IndexJob.document_id, running.status == "running")
+
+
+def claim_job(
+    db: Session,
+    worker_id: str,
+    job_id: uuid.UUID | None = None,
+    document_ids: list[uuid.UUID] | None = None,
+) -> IndexJob | None:
+    """Atomically take the oldest due pending job (or `job_id`) and mark it running.
+
+    `FOR UPDATE SKIP LOCKED` lets many workers poll the same table without blocking each
+    other or double-claiming; SQLite (tests) has no row locks and ignores the clause.
+    Jobs of a document whose build is still running are left for later, and
+    `document_ids` restricts the claim to those documents.
+    """
+
+    now = _now()
+    stmt = select(IndexJob).where(IndexJob.status == "pending", _no_running_build())
+    if job_id is not None:
+        stmt = stmt.where(IndexJob.id == job_id)
+    else:
+        stmt = stmt.where(IndexJob.run_after <= now).order_by(IndexJob.run_after, IndexJob.created_at)
+    if document_ids is not None:
+        stmt = stmt.where(IndexJob.document_id.in_(document_ids))
+    job = db.execute(stmt.limit(1).with_for_update(skip_locked=True)).scalar_one_or_none()
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.heartbeat_at = now
+    db.add(job)
+    db.commit()
+    return job
+
+
+def heartbeat_job(db: Session, job_id: uuid.UUID, worker_id: str) -> bool:
+    """Refresh the lease; False if the job is no longer ours (e.g. recovered as stale)."""
+
+    result = db.execute(
+        update(IndexJob)
+        .where(IndexJob.id == job_id, IndexJob.locked_by == worker_id, IndexJob.status == "running")
+        .values(heartbeat_at=_now())
+    )
+    db.commit()
+    return bool(result.rowcount)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    settings = get_settings()
+    base = settings.index_job_retry_base_s * (2 ** max(0, attempts - 1))
+    return timedelta(seconds=random.uniform(base / 2, base))
+
+
+def _requeue(db: Session, job: IndexJob, run_after: datetime) -> bool:
+    """Make `job` pending again; False if the document already has a pending job (this one is superseded)."""
+
+    try:
+        with db.begin_nested():
+            job.status = "pending"
+            job.run_after = run_after
+    except IntegrityError:
+        job.status = "superseded"
+        job.finished_at = _now()
+        logger.info("job.superseded", extra={"job_id": str(job.id), "doc_id": str(job.document_id)})
+        return False
+    return True
+
+
+def _dead_letter(db: Session, job: IndexJob, error: str) -> None:
+    """Retries are exhausted: the job is dead and its document failed (until a new upload or reindex)."""
+
+    job.status = "dead"
+    job.last_error = error
+    job.finished_at = _now()
+    doc = db.get(Document, job.document_id)
+    if doc is not None and doc.status != "failed":
+        doc.status = "failed"
+        doc.error_message = error
+        db.add(doc)
+        publish_document_status(db, doc)
+    logger.error("job.dead", extra={"job_id": str(job.id), "doc_id": str(job.document_id), "error": error})
+
+
+def finish_job(db: Session, job: IndexJob, error: str | None) -> None:
+    """Record the outcome: succeeded, rescheduled with backoff, or dead-lettered."""
+
+    job.locked_by = None
+    job.heartbeat_at = None
+    if error is None:
+        job.status = "succeeded"
+        job.last_error = None
+        job.finished_at = _now()
+    elif job.attempts >= job.max_attempts:
+        _dead_letter(db, job, error)
+    else:
+        job.last_error = error
+        _requeue(db, job, _now() + _retry_delay(job.attempts))
+        doc = db.get(Document, job.document_id)
+        if doc is not None:
+            doc.status = "queued"
+            doc.error_message = f"Retrying after error: {error}"
+            db.add(doc)
+            publish_document_status(db, doc)
+        logger.warning("job.retry_scheduled", extra={"job_id": str(job.id), "attempts": job.attempts, "error": error})
+    db.add(job)
+    db.commit()
+
+
+def claim_batch_siblings(db: Session, job: IndexJob, worker_id: str) -> list[IndexJob]:
+    """Also take due pending jobs for other documents of `job`'s upload batch.
+
+    They are indexed together with `job` through one pipeline, so their chunks share
+    embedding batches. Each job keeps its own attempts, outcome and retry schedule.
+    """
+
+    limit = get_settings().index_batch_max_documents - 1
+    batch_id = db.execute(select(Document.batch_id).where(Document.id == job.document_id)).scalar_one_or_none()
+    if batch_id is None or limit <= 0:
+        return []
+
+    now = _now()
+    siblings = db.execute(
+        select(IndexJob)
+        .join(Document, Document.id == IndexJob.document_id)
+        .where(
+            Document.batch_id == batch_id,
+            IndexJob.id != job.id,
+            IndexJob.user_id == job.user_id,
+            IndexJob.status == "pending",
+            IndexJob.run_after <= now,
+            _no_running_build(),
+        )
+        .order_by(IndexJob.created_at)
+        .limit(limit)
+        .with_for_update(of=IndexJob, skip_locked=True)
+    ).scalars().all()
+    for sibling in siblings:
+        sibling.status = "running"
+        sibling.attempts += 1
+        sibling.locked_by = worker_id
+        sibling.heartbeat_at = now
+        db.add(sibling)
+    db.commit()
+    return list(siblings)
+
+
+def run_jobs(db: Session, jobs: list[IndexJob], worker_id: str) -> None:
+    """Index the jobs' documents (one tenant) together while a side thread keeps every job's heartbeat fresh."""
+
+    settings = get_settings()
+    stop = threading.Event()
+    SessionLocal = _session_factory()
+    job_ids = [job.id for job in jobs]
+
+    def _beat() -> None:
+        with SessionLocal() as hb_db:
+            while not stop.wait(settings.index_job_heartbeat_s):
+                for job_id in job_ids:
+                    try:
+                        heartbeat_job(hb_db, job_id, worker_id)
+                    except Exception:  # noqa: BLE001 - a missed beat is retried next interval
+                        hb_db.rollback()
+                        logger.exception("job.heartbeat_failed", extra={"job_id": str(job_id)})
+
+    beat = threading.Thread(target=_beat, name=f"heartbeat-{jobs[0].id}", daemon=True)
+    beat.start()
+    errors: dict[uuid.UUID, str | None] = {}
+    try:
+        user = db.execute(select(User).where(User.id == jobs[0].user_id)).scalar_one()
+        results = index_documents(db=db, user=user, doc_ids=[str(job.document_id) for job in jobs])
+        for job in jobs:
+            result = results.get(str(job.document_id))
+            if result is None:
+                errors[job.id] = "Document not found"
+            elif result.status != "indexed":
+                errors[job.id] = result.error_message or "Indexing failed"
+    except Exception as exc:  # noqa: BLE001 - recorded on the jobs for retry / dead-letter
+        db.rollback()
+        for job in jobs:
+            errors[job.id] = str(exc) or type(exc).__name__
+        logger.exception("job.failed", extra={"job_ids": [str(j) for j in job_ids]})
+    finally:
+        stop.set()
+        beat.join()
+    for job in jobs:
+        finish_job(db, job, errors.get(job.id))
+
+
+def process_next_job(worker_id: str, job_id: uuid.UUID | None = None) -> bool:
+    """Claim and run one job (plus due jobs from its upload batch) in a fresh session; False if nothing was available."""
+
+    SessionLocal = _session_factory()
+    with SessionLocal() as db:
+        job = claim_job(db, worker_id, job_id=job_id)
+        if job is None:
+            return False
+        while job is not None:
+            jobs = [job, *claim_batch_siblings(db, job, worker_id)]
+            logger.info(
+                "job.claimed",
+                extra={"job_id": str(job.id), "doc_id": str(job.document_id), "worker_id": worker_id, "batch_jobs": len(jobs)},
+            )
+            run_jobs(db, jobs, worker_id)
+            # A reindex requested during the run waited behind it; start it now, so it also
+            # runs when the only executor is the in-process task that was turned away.
+            job = claim_job(db, worker_id, document_ids=[j.document_id for j in jobs])
+        return True
+
+
+def run_index_job_task(job_id: str) -> None:
+    """BackgroundTasks entrypoint: run a specific job in-process unless a worker already took it."""
+
+    process_next_job(worker_id=f"web-{uuid.uuid4().hex[:8]}", job_id=uuid.UUID(job_id))
+
+
+def recover_stale_jobs(db: Session) -> int:
+    """Return running jobs whose worker stopped heartbeating to the queue (or dead-letter them)."""
+
+    settings = get_settings()
+    cutoff = _now() - timedelta(seconds=settings.index_job_stale_after_s)
+    stale = db.execute(
+        select(IndexJob).where(IndexJob.status == "running", IndexJob.heartbeat_at < cutoff).with_for_update(skip_locked=True)
+    ).scalars().all()
+    for job in stale:
+        job.locked_by = None
+        job.heartbeat_at = None
+        if job.attempts >= job.max_attempts:
+            _dead_letter(db, job, "Worker heartbeat lost")
+        else:
+            job.last_error = "Worker heartbeat lost"
+            _requeue(db, job, _now())
+        db.add(job)
+    db.commit()
+    if stale:
+        logger.warning("job.recovered_stale", extra={"count": len(stale)})
+    return len(stale)
+
+
+def requeue_stuck_documents(db: Session) -> int:
+    """Enqueue jobs for documents left `queued`/`indexing` with no live job (e.g. after a crash).
+
+    A document whose latest job was dead-lettered stays dead: requeueing it would reset its
+    attempts and retry a document that keeps crashing workers forever.
+    """
+
+    active = select(IndexJob.document_id).where(IndexJob.status.in_(_ACTIVE_STATUSES))
+    later = aliased(IndexJob)
+    dead = select(IndexJob.document_id).where(
+        IndexJob.status == "dead",
+        ~exists().where(later.document_id == IndexJob.document_id, later.created_at > IndexJob.created_at),
+    )
+    stuck = db.execute(
+        select(Document).where(
+            Document.status.in_(("queued", "indexing")), Document.id.not_in(active), Document.id.not_in(dead)
+        )
+    ).scalars().all()
+    for doc in stuck:
+        doc.status = "queued"
+        db.add(doc)
+        publish_document_status(db, doc)
+        enqueue_index_job(db, user_id=doc.user_id, document_id=doc.id)
+    if stuck:
+        logger.warning("job.requeued_stuck_documents", extra={"count": len(stuck)})
+    return len(stuck)
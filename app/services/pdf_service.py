@@ -1,9 +1,112 @@
 from __future__ import annotations
 
 import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 
+import pypdf
 from pypdf import PdfReader
 
+from app.config import get_settings
+
+# Identifies the text `iter_pdf_pages` produces; cached extractions (app.services.text_cache)
+# from another version are ignored. Bump the suffix when `_page_text` changes.
+EXTRACTOR_VERSION = f"pypdf-{pypdf.__version__}.1"
+
+
+@dataclass(frozen=True)
+class PdfPage:
+    number: int  # 1-based page number in the source PDF
+    text: str
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count() -> int:
+    return get_settings().pdf_extract_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = _worker_count()
+            # spawn, not fork: the web process and workers are multi-threaded.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _page_text(reader: PdfReader, index: int) -> str:
+    return (reader.pages[index].extract_text() or "").strip()
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    """Process-pool task: text of pages [start, stop) of the PDF at `path`."""
+
+    reader = PdfReader(path)
+    return [_page_text(reader, i) for i in range(start, stop)]
+
+
+def iter_pdf_pages(source: Path | bytes) -> Iterator[PdfPage]:
+    """Yield non-empty pages in order as they are extracted.
+
+    PDFs with at least PDF_PARALLEL_MIN_PAGES pages (and a path on disk) are split into
+    page ranges and extracted in a process pool. Only a bounded window of ranges is in
+    flight at once, so memory stays proportional to the window, not the document.
+    """
+
+    reader = PdfReader(source if isinstance(source, Path) else io.BytesIO(source))
+    page_count = len(reader.pages)
+    settings = get_settings()
+
+    if not isinstance(source, Path) or page_count < settings.pdf_parallel_min_pages:
+        for i in range(page_count):
+            text = _page_text(reader, i)
+            if text:
+                yield PdfPage(number=i + 1, text=text)
+        return
+
+    pool = _get_pool()
+    step = max(1, settings.pdf_pages_per_task)
+    window = 2 * _worker_count()
+    starts = iter(range(0, page_count, step))
+    in_flight: deque[tuple[int, Future[list[str]]]] = deque()
+
+    def _submit_next() -> None:
+        start = next(starts, None)
+        if start is not None:
+            in_flight.append((start, pool.submit(_extract_page_range, str(source), start, min(start + step, page_count))))
+
+    try:
+        for _ in range(window):
+            _submit_next()
+        while in_flight:
+            start, future = in_flight.popleft()
+            texts = future.result()
+            _submit_next()
+            for offset, text in enumerate(texts):
+                if text:
+                    yield PdfPage(number=start + offset + 1, text=text)
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
 
 def extract_text_from_pdf(pdf_bytes: bytes) -> str:
     """
@@ -11,14 +114,6 @@ def extract_text_from_pdf(pdf_bytes: bytes) -> str:
 
     Notes:
     - Extraction quality varies a lot by PDF type (scanned vs digital).
-    - We do not preserve page boundaries yet.
+    - Indexing uses `iter_pdf_pages` to keep page boundaries; this joins them.
     """
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    parts: list[str] = []
-    for page in reader.pages:
-        text = page.extract_text() or ""
-        text = text.strip()
-        if text:
-            parts.append(text)
-    return "\n\n".join(parts).strip()
-
+    return "\n\n".join(page.text for page in iter_pdf_pages(pdf_bytes)).strip()
@@ -0,0 +1,121 @@
+"""Push feed of document status changes, so browsers need not poll `/api/documents`.
+
+Producers call `publish` inside the transaction that makes a change; nothing is sent if it
+rolls back. On Postgres the event goes out through `pg_notify` and reaches every web
+process LISTENing on the channel, including changes made by `app.worker`. On other
+databases (SQLite in dev and tests) the session hands it to this process's broadcaster
+after commit, which covers INDEX_IN_PROCESS indexing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.db.session import get_engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "document_status"
+# Events buffered per subscriber; a slow client drops the oldest (it resyncs on reconnect).
+_QUEUE_SIZE = 256
+_PENDING_KEY = "status_feed_pending"
+
+
+class StatusBroadcaster:
+    """Fans events out to the asyncio queues of one process's feed subscribers, per tenant."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, user_id: uuid.UUID) -> asyncio.Queue:
+        """Register a queue for `user_id`'s events; call from the event loop that reads it."""
+
+        self._ensure_listener()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(str(user_id), set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id: uuid.UUID, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(str(user_id), set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(str(user_id), None)
+
+    def deliver(self, user_id: str, payload: dict[str, Any]) -> None:
+        """Thread-safe: hand `payload` to every subscriber of `user_id` in this process."""
+
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_put_latest, queue, payload)
+            except RuntimeError:  # the subscriber's loop has closed
+                self.unsubscribe(uuid.UUID(user_id), queue)
+
+    def _ensure_listener(self) -> None:
+        engine = get_engine()
+        if engine.dialect.name != "postgresql":
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            url = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+            self._listener = threading.Thread(target=self._listen, args=(url,), name="status-feed-listener", daemon=True)
+            self._listener.start()
+
+    def _listen(self, url: str) -> None:
+        import psycopg
+
+        while True:
+            try:
+                with psycopg.connect(url, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    for note in conn.notifies():
+                        message = json.loads(note.payload)
+                        self.deliver(message["user_id"], message["event"])
+            except Exception:  # noqa: BLE001 - reconnect; clients resync from their next snapshot
+                logger.exception("status_feed.listener_error")
+                time.sleep(1.0)
+
+
+def _put_latest(queue: asyncio.Queue, payload: dict[str, Any]) -> None:
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(payload)
+
+
+broadcaster = StatusBroadcaster()
+
+
+def publish(db: Session, user_id: uuid.UUID, payload: dict[str, Any]) -> None:
+    """Send `payload` to `user_id`'s feed subscribers when `db`'s transaction commits."""
+
+    message = {"user_id": str(user_id), "event": payload}
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_notify(CHANNEL, json.dumps(message))))
+    else:
+        db.info.setdefault(_PENDING_KEY, []).append(message)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    for message in session.info.pop(_PENDING_KEY, ()):
+        broadcaster.deliver(message["user_id"], message["event"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,223 @@
+"""Portable per-tenant index snapshots, for moving a tenant between environments or restoring one.
+
+A snapshot is a directory:
+
+    manifest.json        format version, embedding space, counts, sha256 of every file
+    documents.jsonl.gz   one line per document: filename, upload time, content hash, chunk count
+    chunks.jsonl.gz      one line per chunk of each document's active version, grouped by document
+    vectors.f32          little-endian float32, `dims` values per chunks.jsonl.gz line
+    blobs/<sha256>       the original uploads (left out with include_files=False)
+
+Only active versions and the tenant's active embedding space are exported. A restore checks
+every checksum before writing anything, then reads chunks and vectors side by side into the
+bulk write path (app.services.vector_import), so it is bound by I/O, not embedding calls.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import shutil
+import sys
+from array import array
+from datetime import datetime, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Chunk, ChunkEmbedding, Document, User
+from app.models.schemas import DocumentMetadata, VectorImportResponse
+from app.services.document_service import _stored_path, import_indexed_document
+from app.services.embedding_backfill import active_space
+from app.services.vector_import import expected_dims, iter_binary_records, validated_chunks
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "rag-notebook-snapshot"
+SNAPSHOT_VERSION = 1
+
+_MANIFEST = "manifest.json"
+_DOCUMENTS = "documents.jsonl.gz"
+_CHUNKS = "chunks.jsonl.gz"
+_VECTORS = "vectors.f32"
+_BLOBS = "blobs"
+_READ_BYTES = 1024 * 1024
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while data := f.read(_READ_BYTES):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _file_entry(path: Path) -> dict[str, Any]:
+    return {"sha256": _sha256_file(path), "size_bytes": path.stat().st_size}
+
+
+def export_snapshot(db: Session, user: User, out_dir: Path, include_files: bool = True) -> dict[str, Any]:
+    """Write `user`'s served chunks and vectors to `out_dir`; returns the manifest.
+
+    Chunks stream from the database per document; the manifest is written last, so a
+    directory without one is an incomplete export.
+    """
+
+    space = active_space(user)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / _MANIFEST).unlink(missing_ok=True)
+    docs = db.execute(
+        select(Document)
+        .where(Document.user_id == user.id, Document.active_version.is_not(None))
+        .order_by(Document.uploaded_at, Document.id)
+    ).scalars().all()
+
+    dims: int | None = None
+    chunk_total = 0
+    document_total = 0
+    blobs: set[str] = set()
+    with (
+        gzip.open(out_dir / _DOCUMENTS, "wt", encoding="utf-8") as documents_out,
+        gzip.open(out_dir / _CHUNKS, "wt", encoding="utf-8") as chunks_out,
+        (out_dir / _VECTORS).open("wb") as vectors_out,
+    ):
+        for doc in docs:
+            rows = db.execute(
+                select(
+                    Chunk.text, Chunk.start_char, Chunk.end_char, Chunk.page_start, Chunk.page_end, ChunkEmbedding.embedding
+                )
+                .join(ChunkEmbedding, and_(ChunkEmbedding.chunk_id == Chunk.id, ChunkEmbedding.space == space.name))
+                .where(Chunk.document_id == doc.id, Chunk.index_version == doc.active_version)
+                .order_by(Chunk.chunk_index)
+                .execution_options(yield_per=1000)
+            )
+            count = 0
+            for row in rows:
+                vector = array("f", row.embedding)
+                dims = dims or len(vector)
+                if sys.byteorder == "big":
+                    vector.byteswap()
+                vectors_out.write(vector.tobytes())
+                record = {
+                    "document": str(doc.id),
+                    "text": row.text,
+                    "start_char": row.start_char,
+                    "end_char": row.end_char,
+                    "page_start": row.page_start,
+                    "page_end": row.page_end,
+                }
+                chunks_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+            if not count:
+                continue
+
+            blob = None
+            source = _stored_path(doc) if include_files else None
+            if source is not None:
+                blob = doc.content_sha256 or _sha256_file(source)
+                if blob not in blobs:
+                    (out_dir / _BLOBS).mkdir(exist_ok=True)
+                    shutil.copyfile(source, out_dir / _BLOBS / blob)
+                    blobs.add(blob)
+            line = {
+                "id": str(doc.id),
+                "filename": doc.filename,
+                "uploaded_at": doc.uploaded_at.isoformat(),
+                "chunk_count": count,
+                "blob": blob,
+            }
+            documents_out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            document_total += 1
+            chunk_total += count
+
+    files = [_DOCUMENTS, _CHUNKS, _VECTORS, *(f"{_BLOBS}/{sha}" for sha in sorted(blobs))]
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "space": {"name": space.name, "model": space.model, "dims": dims},
+        "documents": document_total,
+        "chunks": chunk_total,
+        "files": {name: _file_entry(out_dir / name) for name in files},
+    }
+    (out_dir / _MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    logger.info(
+        "snapshot.exported",
+        extra={"user_id": str(user.id), "documents": document_total, "chunk_count": chunk_total, "space": space.name},
+    )
+    return manifest
+
+
+def verify_snapshot(snapshot_dir: Path) -> dict[str, Any]:
+    """Load the manifest and check every listed file against its sha256; raises ValueError."""
+
+    try:
+        manifest = json.loads((snapshot_dir / _MANIFEST).read_text(encoding="utf-8"))
+    except FileNotFoundError as exc:
+        raise ValueError(f"Not a snapshot (no {_MANIFEST}): {snapshot_dir}") from exc
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')} v{manifest.get('version')}")
+
+    root = snapshot_dir.resolve()
+    for name, entry in manifest["files"].items():
+        path = (snapshot_dir / name).resolve()
+        if not path.is_relative_to(root):
+            raise ValueError(f"Snapshot file outside the snapshot directory: {name}")
+        if not path.is_file():
+            raise ValueError(f"Snapshot file missing: {name}")
+        if path.stat().st_size != entry["size_bytes"] or _sha256_file(path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch: {name}")
+    return manifest
+
+
+def import_snapshot(db: Session, user: User, snapshot_dir: Path) -> VectorImportResponse:
+    """Restore a snapshot into `user`'s active embedding space as new documents.
+
+    The space must use the snapshot's model and dimensions. Documents are committed one at
+    a time, like app.services.vector_import.import_vectors.
+    """
+
+    manifest = verify_snapshot(snapshot_dir)
+    space = active_space(user)
+    source_space = manifest["space"]
+    dims = source_space["dims"]
+    if manifest["chunks"] and source_space["model"] != space.model:
+        raise ValueError(f"Snapshot vectors come from {source_space['model']}; space {space.name} uses {space.model}")
+    if manifest["chunks"] and (target_dims := expected_dims(db, space)) != dims:
+        raise ValueError(f"Snapshot vectors have {dims} dimensions; space {space.name} expects {target_dims}")
+
+    with gzip.open(snapshot_dir / _DOCUMENTS, "rt", encoding="utf-8") as f:
+        documents = {line["id"]: line for line in map(json.loads, f)}
+
+    imported: list[DocumentMetadata] = []
+    with gzip.open(snapshot_dir / _CHUNKS, "rb") as chunks_in, (snapshot_dir / _VECTORS).open("rb") as vectors_in:
+        records = iter_binary_records(chunks_in, vectors_in, dims or 0)
+        for doc_id, group in groupby(records, key=lambda line: line[1].document):
+            meta = documents.get(doc_id)
+            if meta is None:
+                raise ValueError(f"Snapshot chunks reference an unknown document: {doc_id}")
+            if meta.get("blob") and f"{_BLOBS}/{meta['blob']}" not in manifest["files"]:
+                raise ValueError(f"Snapshot document {doc_id} references an unlisted file")
+            imported.append(
+                import_indexed_document(
+                    db,
+                    user,
+                    meta["filename"],
+                    validated_chunks(group, dims),
+                    space,
+                    source=snapshot_dir / _BLOBS / meta["blob"] if meta.get("blob") else None,
+                    uploaded_at=datetime.fromisoformat(meta["uploaded_at"]),
+                )
+            )
+
+    chunk_count = sum(doc.chunk_count for doc in imported)
+    logger.info(
+        "snapshot.imported",
+        extra={"user_id": str(user.id), "documents": len(imported), "chunk_count": chunk_count, "space": space.name},
+    )
+    return VectorImportResponse(space=space.name, dims=dims or 0, chunk_count=chunk_count, documents=imported)
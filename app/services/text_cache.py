@@ -0,0 +1,76 @@
+"""Cache of extracted PDF text, so reindexing never parses the same PDF twice.
+
+Pages are stored gzip-compressed as JSON lines (`{"page": n, "text": ...}`) under
+`<upload_dir>/extracted/<aa>/<bb>/<sha256>.<extractor version>.jsonl.gz`. Entries are keyed
+by content hash and extractor version, so a changed source or extractor simply misses;
+the page map is rebuilt from the cached pages exactly as from fresh ones.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+from app.config import get_settings
+from app.services.pdf_service import EXTRACTOR_VERSION, PdfPage
+
+logger = logging.getLogger(__name__)
+
+
+def _dir(sha256: str) -> Path:
+    return get_settings().upload_path / "extracted" / sha256[:2] / sha256[2:4]
+
+
+def cache_path(sha256: str) -> Path:
+    return _dir(sha256) / f"{sha256}.{EXTRACTOR_VERSION}.jsonl.gz"
+
+
+def _read(path: Path) -> Iterator[PdfPage]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            yield PdfPage(number=row["page"], text=row["text"])
+
+
+def _write_through(sha256: str, pages: Iterator[PdfPage]) -> Iterator[PdfPage]:
+    """Yield `pages` while writing them to a temp file; publish it only if extraction completes."""
+
+    directory = _dir(sha256)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".extract-", suffix=".part")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for page in pages:
+                gz.write((json.dumps({"page": page.number, "text": page.text}) + "\n").encode("utf-8"))
+                yield page
+        os.replace(tmp_path, cache_path(sha256))
+        logger.info("extract.cached", extra={"sha256": sha256, "extractor_version": EXTRACTOR_VERSION})
+    finally:
+        # Abandoned (consumer stopped) or failed extraction: never publish a partial entry.
+        tmp_path.unlink(missing_ok=True)
+
+
+def cached_pdf_pages(sha256: str, extract: Iterator[PdfPage]) -> Iterator[PdfPage]:
+    """Pages for the PDF with this content hash: from the cache, else from `extract` (cached as read).
+
+    `extract` is a lazy iterator and is not started on a cache hit.
+    """
+
+    path = cache_path(sha256)
+    if path.is_file():
+        logger.info("extract.cache_hit", extra={"sha256": sha256, "extractor_version": EXTRACTOR_VERSION})
+        return _read(path)
+    return _write_through(sha256, extract)
+
+
+def remove(sha256: str) -> None:
+    """Drop every cached extraction (any extractor version) of this content."""
+
+    for path in _dir(sha256).glob(f"{sha256}.*"):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,82 @@
+"""Multi-file and zip uploads that are stored, enqueued and tracked as one batch.
+
+Every member becomes an ordinary document tagged with the batch id; a member that fails
+validation is recorded on the batch instead of failing the whole upload. Workers claim a
+batch's jobs together (job_queue.claim_batch_siblings), so small documents share
+embedding requests through document_service.index_documents.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Document, UploadBatch, User
+from app.models.schemas import DocumentMetadata, RejectedFile, UploadBatchStatus
+from app.services.document_service import _to_metadata
+from app.services.job_queue import enqueue_index_job
+
+logger = logging.getLogger(__name__)
+
+_FINISHED_STATUSES = ("indexed", "failed")
+
+
+def create_upload_batch(db: Session, user: User) -> UploadBatch:
+    batch = UploadBatch(id=uuid.uuid4(), user_id=user.id, created_at=datetime.now(timezone.utc), rejected=[])
+    db.add(batch)
+    db.commit()
+    return batch
+
+
+def record_rejected(db: Session, batch: UploadBatch, rejected: list[RejectedFile]) -> None:
+    if not rejected:
+        return
+    # Reassign (not append) so the JSON column is flagged dirty.
+    batch.rejected = [*batch.rejected, *(r.model_dump() for r in rejected)]
+    db.add(batch)
+    db.commit()
+
+
+def enqueue_batch(db: Session, user: User, documents: list[DocumentMetadata]) -> list[uuid.UUID]:
+    """One index job per document; returns job ids in upload order."""
+
+    return [enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(doc.id)).id for doc in documents]
+
+
+def describe_batch(db: Session, batch: UploadBatch) -> UploadBatchStatus:
+    """Aggregate progress of a batch: per-status counts, chunks committed so far, and % done."""
+
+    docs = db.execute(
+        select(Document).where(Document.batch_id == batch.id).order_by(Document.uploaded_at, Document.id)
+    ).scalars().all()
+    counts = Counter(doc.status for doc in docs)
+    finished = sum(counts[s] for s in _FINISHED_STATUSES)
+    # Indexed documents report their final count; in-flight ones their committed checkpoint.
+    chunks = sum(doc.chunk_count if doc.status == "indexed" else doc.index_checkpoint for doc in docs)
+    return UploadBatchStatus(
+        id=str(batch.id),
+        created_at=batch.created_at,
+        total_documents=len(docs),
+        status_counts=dict(counts),
+        chunks_indexed=chunks,
+        progress_pct=round(100.0 * finished / len(docs), 2) if docs else 100.0,
+        done=finished == len(docs),
+        documents=[_to_metadata(doc) for doc in docs],
+        rejected=[RejectedFile(**r) for r in batch.rejected or []],
+    )
+
+
+def get_upload_batch(db: Session, user: User, batch_id: str) -> UploadBatchStatus | None:
+    try:
+        batch_uuid = uuid.UUID(batch_id)
+    except ValueError:
+        return None
+    batch = db.execute(
+        select(UploadBatch).where(UploadBatch.id == batch_uuid, UploadBatch.user_id == user.id)
+    ).scalar_one_or_none()
+    return describe_batch(db, batch) if batch is not None else None
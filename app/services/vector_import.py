@@ -0,0 +1,143 @@
+"""Import chunks whose embeddings were computed elsewhere ("bring your own vectors").
+
+Two input formats, both one chunk per JSONL line (app.models.schemas.VectorImportRecord):
+
+- JSONL only: each line carries its `embedding`.
+- JSONL plus a binary payload: lines omit `embedding`; the payload holds one vector of
+  `dims` little-endian float32 values per line, in line order.
+
+Lines of one document must be contiguous and ordered by `start_char`. Vectors go into the
+tenant's active embedding space and must match its dimensions: the size of vectors already
+stored in it, else what its model returns (query embeddings must be comparable with them). Nothing calls the embeddings API; chunks are
+written through the bulk insert path, so a migration runs at database speed.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import chain, groupby
+from typing import BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import ChunkEmbedding, User
+from app.models.schemas import Chunk as ChunkSchema
+from app.models.schemas import DocumentMetadata, VectorImportRecord, VectorImportResponse
+from app.rag.embedding import EmbeddingSpace, embedding_dims
+from app.services.document_service import import_indexed_document
+
+logger = logging.getLogger(__name__)
+
+# (line number, record, vector)
+ImportLine = tuple[int, VectorImportRecord, Sequence[float]]
+
+
+def expected_dims(db: Session, space: EmbeddingSpace) -> int:
+    """Vector size for `space`: its configured `dims`, else that of a vector stored in it, else the model's."""
+
+    if space.dims:
+        return space.dims
+    stored = db.execute(
+        select(ChunkEmbedding.embedding).where(ChunkEmbedding.space == space.name).limit(1)
+    ).scalar_one_or_none()
+    return len(stored) if stored is not None else embedding_dims(space)
+
+
+def _parse(line_no: int, raw: bytes | str) -> VectorImportRecord:
+    try:
+        return VectorImportRecord.model_validate_json(raw)
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        where = ".".join(str(part) for part in error["loc"])
+        raise ValueError(f"line {line_no}: {where + ': ' if where else ''}{error['msg']}") from exc
+
+
+def iter_jsonl_records(lines: Iterable[bytes | str]) -> Iterator[ImportLine]:
+    for line_no, raw in enumerate(lines, start=1):
+        if not raw.strip():
+            continue
+        record = _parse(line_no, raw)
+        if record.embedding is None:
+            raise ValueError(f"line {line_no}: embedding is required")
+        yield line_no, record, record.embedding
+
+
+def iter_binary_records(lines: Iterable[bytes | str], vectors: BinaryIO, dims: int) -> Iterator[ImportLine]:
+    width = dims * 4
+    for line_no, raw in enumerate(lines, start=1):
+        if not raw.strip():
+            continue
+        record = _parse(line_no, raw)
+        data = vectors.read(width)
+        if len(data) != width:
+            raise ValueError(f"line {line_no}: vectors payload ended early")
+        vector = array("f")
+        vector.frombytes(data)
+        if sys.byteorder == "big":
+            vector.byteswap()
+        yield line_no, record, vector
+    if vectors.read(1):
+        raise ValueError("vectors payload has more vectors than chunk lines")
+
+
+def validated_chunks(group: Iterable[ImportLine], dims: int) -> Iterator[tuple[ChunkSchema, Sequence[float]]]:
+    last_start = 0
+    for chunk_index, (line_no, record, vector) in enumerate(group):
+        if record.end_char - record.start_char < len(record.text):
+            raise ValueError(f"line {line_no}: text is longer than its start_char..end_char span")
+        if record.start_char < last_start:
+            raise ValueError(f"line {line_no}: chunks of a document must be ordered by start_char")
+        if len(vector) != dims:
+            raise ValueError(f"line {line_no}: embedding has {len(vector)} dimensions, expected {dims}")
+        if not all(map(math.isfinite, vector)):
+            raise ValueError(f"line {line_no}: embedding contains non-finite values")
+        last_start = record.start_char
+        chunk = ChunkSchema(
+            text=record.text,
+            chunk_index=chunk_index,
+            start_char=record.start_char,
+            end_char=record.end_char,
+            page_start=record.page_start,
+            page_end=record.page_end,
+        )
+        yield chunk, vector
+
+
+def import_vectors(db: Session, user: User, records: Iterable[ImportLine], space: EmbeddingSpace) -> VectorImportResponse:
+    """Create one indexed document per run of lines sharing a `document` name.
+
+    Documents are committed one at a time. An invalid line stops the import with a
+    ValueError; the document it belongs to is rolled back, earlier ones stay imported.
+    """
+
+    source = iter(records)
+    first = next(source, None)
+    if first is None:
+        raise ValueError("No chunk records to import")
+    dims = expected_dims(db, space)
+
+    documents: list[DocumentMetadata] = []
+    seen: set[str] = set()
+    try:
+        for name, group in groupby(chain([first], source), key=lambda line: line[1].document):
+            if name in seen:
+                raise ValueError(f"chunks of document {name!r} must be contiguous")
+            seen.add(name)
+            documents.append(import_indexed_document(db, user, name, validated_chunks(group, dims), space))
+    except ValueError as exc:
+        if documents:
+            raise ValueError(f"{exc} ({len(documents)} documents were imported before it)") from exc
+        raise
+
+    chunk_count = sum(doc.chunk_count for doc in documents)
+    logger.info(
+        "import.complete",
+        extra={"user_id": str(user.id), "space": space.name, "documents": len(documents), "chunk_count": chunk_count},
+    )
+    return VectorImportResponse(space=space.name, dims=dims, chunk_count=chunk_count, documents=documents)
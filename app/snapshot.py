@@ -0,0 +1,52 @@
+"""Tenant index snapshots: `python -m app.snapshot export|import --email EMAIL PATH`.
+
+See app.services.tenant_snapshot for the format. Restoring into another environment needs
+the tenant to exist there and use an embedding space with the snapshot's model and size.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import User
+from app.db.session import get_engine
+from app.observability.logging import configure_logging
+from app.services.embedding_backfill import pin_embedding_spaces
+from app.services.tenant_snapshot import export_snapshot, import_snapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or restore a tenant's index snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write the tenant's documents, chunks and vectors to PATH")
+    export.add_argument("--files", action=argparse.BooleanOptionalAction, default=True, help="Include original uploads")
+    restore = commands.add_parser("import", help="Restore the snapshot at PATH as new documents")
+    for command in (export, restore):
+        command.add_argument("--email", required=True, help="Tenant (user) email")
+        command.add_argument("path", type=Path, help="Snapshot directory")
+    args = parser.parse_args()
+
+    configure_logging()
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    with SessionLocal() as db:
+        pin_embedding_spaces(db)
+        user = db.execute(select(User).where(User.email == args.email)).scalar_one_or_none()
+        if user is None:
+            raise SystemExit(f"No user with email {args.email}")
+        try:
+            if args.command == "export":
+                manifest = export_snapshot(db, user, args.path, include_files=args.files)
+                print(f"Exported {manifest['documents']} documents, {manifest['chunks']} chunks to {args.path}")
+            else:
+                result = import_snapshot(db, user, args.path)
+                print(f"Imported {len(result.documents)} documents, {result.chunk_count} chunks into {result.space}")
+        except ValueError as exc:
+            raise SystemExit(str(exc)) from exc
+
+
+if __name__ == "__main__":
+    main()
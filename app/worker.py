@@ -0,0 +1,109 @@
+"""Indexing worker: `python -m app.worker [--concurrency N]`.
+
+Runs N threads that claim `index_jobs` rows (`FOR UPDATE SKIP LOCKED`), index the document
+while heartbeating, and record success / retry / dead-letter. Any number of worker processes
+can share the same database. A maintenance loop returns jobs whose worker died to the queue,
+re-enqueues documents stuck in `queued`/`indexing` without a live job, and deletes replaced
+chunk versions that were not garbage-collected after their reindex. One more thread runs
+embedding-space backfills (app.services.embedding_backfill), throttled so they leave
+embedding capacity for indexing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.db.session import get_engine
+from app.observability.logging import configure_logging
+from app.services import pdf_service
+from app.services.document_service import collect_all_old_versions
+from app.services.embedding_backfill import pin_embedding_spaces, process_next_backfill, recover_stale_backfills
+from app.services.job_queue import process_next_job, recover_stale_jobs, requeue_stuck_documents
+
+logger = logging.getLogger(__name__)
+
+
+def run_maintenance() -> None:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    with SessionLocal() as db:
+        recover_stale_jobs(db)
+        requeue_stuck_documents(db)
+        collect_all_old_versions(db)
+        recover_stale_backfills(db)
+
+
+def _worker_loop(worker_id: str, stop: threading.Event, poll_interval_s: float) -> None:
+    while not stop.is_set():
+        try:
+            if process_next_job(worker_id):
+                continue
+        except Exception:  # noqa: BLE001 - keep the worker alive; the job's lease will expire
+            logger.exception("worker.loop_error", extra={"worker_id": worker_id})
+        stop.wait(poll_interval_s)
+
+
+def _backfill_loop(worker_id: str, stop: threading.Event, poll_interval_s: float) -> None:
+    while not stop.is_set():
+        try:
+            if process_next_backfill(worker_id, stop=stop):
+                continue
+        except Exception:  # noqa: BLE001 - a stalled backfill is returned to the queue by maintenance
+            logger.exception("worker.backfill_error", extra={"worker_id": worker_id})
+        stop.wait(poll_interval_s)
+
+
+def run_workers(concurrency: int, poll_interval_s: float, stop: threading.Event) -> None:
+    settings = get_settings()
+    with sessionmaker(bind=get_engine())() as db:
+        pin_embedding_spaces(db)
+    run_maintenance()
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    threads = [
+        threading.Thread(target=_worker_loop, args=(f"{prefix}-{i}", stop, poll_interval_s), name=f"index-worker-{i}")
+        for i in range(concurrency)
+    ]
+    threads.append(
+        threading.Thread(target=_backfill_loop, args=(f"{prefix}-backfill", stop, poll_interval_s), name="backfill-worker")
+    )
+    for t in threads:
+        t.start()
+    logger.info("worker.started", extra={"concurrency": concurrency, "worker_prefix": prefix})
+
+    while not stop.wait(settings.index_job_stale_after_s):
+        try:
+            run_maintenance()
+        except Exception:  # noqa: BLE001
+            logger.exception("worker.maintenance_failed")
+
+    for t in threads:
+        t.join()
+    pdf_service.shutdown_pool()
+    logger.info("worker.stopped", extra={"worker_prefix": prefix})
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="RAG Notebook indexing worker")
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency, help="Concurrent jobs per process")
+    parser.add_argument("--poll-interval", type=float, default=settings.worker_poll_interval_s, help="Idle poll interval (s)")
+    args = parser.parse_args()
+
+    configure_logging()
+    stop = threading.Event()
+    # Finish in-flight jobs on SIGTERM/SIGINT; unfinished ones are recovered via heartbeats anyway.
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_workers(concurrency=max(1, args.concurrency), poll_interval_s=args.poll_interval, stop=stop)
+
+
+if __name__ == "__main__":
+    main()
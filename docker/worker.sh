@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+if command -v poetry >/dev/null 2>&1; then
+  exec poetry run python -m app.worker
+fi
+
+exec python -m app.worker
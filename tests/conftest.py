@@ -13,6 +13,7 @@ from app.db.models import Base
 from app.db.session import get_engine
 from app.main import app
 from app.observability.metrics import reset_metrics
+from app.observability.openai import reset_latency_windows
 from app.rag.embedding import set_embedding_client
 from app.rag.prompting import set_chat_client
 from app.rag.query_rewrite import set_rewrite_client
@@ -38,9 +39,11 @@ class _EmbeddingsResponse:
 
 
 class MockEmbeddingsApi:
-    def create(self, model: str, input: list[str]) -> _EmbeddingsResponse:
-        _ = model
-        return _EmbeddingsResponse([_text_to_vector(item) for item in input])
+    def create(
+        self, model: str, input: list[str], dimensions: int | None = None, timeout: float | None = None
+    ) -> _EmbeddingsResponse:
+        _ = model, timeout
+        return _EmbeddingsResponse([_text_to_vector(item, dimensions or 8) for item in input])
 
 
 class _Message:
@@ -59,8 +62,8 @@ class _ChatResponse:
 
 
 class MockChatCompletionsApi:
-    def create(self, model: str, messages: list[dict], temperature: float) -> _ChatResponse:
-        _ = model, temperature
+    def create(self, model: str, messages: list[dict], temperature: float, timeout: float | None = None) -> _ChatResponse:
+        _ = model, temperature, timeout
         system = (messages[0].get("content") or "").lower()
         user = messages[-1].get("content") or ""
 
@@ -147,6 +150,7 @@ class MockChromaClient:
 @pytest.fixture(autouse=True)
 def test_environment(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
     reset_metrics()
+    reset_latency_windows()
     monkeypatch.setenv("OPENAI_API_KEY", "test-key")
     monkeypatch.setenv("UPLOAD_DIR", str(tmp_path / "data"))
     monkeypatch.setenv("CHROMA_DIR", str(tmp_path / "chroma"))
@@ -37,11 +37,48 @@ async def test_upload_endpoint_rejects_invalid_file_extension(api_client) -> Non
     assert response.status_code == 400
 
 
+async def test_upload_endpoint_streams_to_disk_with_hash_and_limits(api_client, monkeypatch) -> None:
+    import hashlib
+
+    from app.config import get_settings
+
+    await _register_and_login(api_client, "stream@example.com", "password123")
+    # Multi-byte characters straddle the 1 MiB read boundary; the incremental decoder must accept them.
+    content = ("é" * (700 * 1024)).encode("utf-8")
+    files = {"file": ("accents.txt", io.BytesIO(content), "text/plain")}
+    response = await api_client.post("/api/upload", files=files)
+    assert response.status_code == 200
+    document = response.json()["document"]
+    assert document["size_bytes"] == len(content)
+    assert document["content_sha256"] == hashlib.sha256(content).hexdigest()
+
+    # Stored content-addressed, sharded by the first two hash byte pairs.
+    sha = document["content_sha256"]
+    assert document["stored_filename"] == f"blobs/{sha[:2]}/{sha[2:4]}/{sha}"
+    assert (get_settings().upload_path / document["stored_filename"]).read_bytes() == content
+
+    monkeypatch.setenv("MAX_UPLOAD_SIZE_MB", "1")
+    get_settings.cache_clear()
+    files = {"file": ("big.txt", io.BytesIO(b"a" * (1024 * 1024 + 1)), "text/plain")}
+    response = await api_client.post("/api/upload", files=files)
+    assert response.status_code == 400
+    assert "1 MB" in response.json()["detail"]
+
+    files = {"file": ("bad.txt", io.BytesIO(b"ok" + b"\xff\xfe"), "text/plain")}
+    response = await api_client.post("/api/upload", files=files)
+    assert response.status_code == 400
+
+    # Rejected uploads leave no partial files behind.
+    blob_root = get_settings().upload_path / "blobs"
+    assert list((blob_root / "tmp").iterdir()) == []
+    assert [p.name for p in blob_root.rglob("*") if p.is_file()] == [sha]
+
+
 async def test_upload_endpoint_accepts_pdf_file(api_client, monkeypatch) -> None:
     # Avoid having to construct a real PDF in tests; just ensure the pipeline calls the extractor.
     from app.services import pdf_service
 
-    monkeypatch.setattr(pdf_service, "extract_text_from_pdf", lambda _b: "PDF extracted text")
+    monkeypatch.setattr(pdf_service, "iter_pdf_pages", lambda _p: iter([pdf_service.PdfPage(1, "PDF extracted text")]))
 
     user_id = await _register_and_login(api_client, "pdf@example.com", "password123")
     files = {"file": ("doc.pdf", io.BytesIO(b"%PDF-1.4 fake"), "application/pdf")}
@@ -112,7 +149,9 @@ async def test_reindex_endpoint_queues_and_allows_reindex(api_client) -> None:
     assert re_resp.status_code == 200
     queued_doc = re_resp.json()
     assert queued_doc["status"] == "queued"
-    assert queued_doc["chunk_count"] == 0
+    # The current chunk set keeps serving until the new version replaces it.
+    assert queued_doc["chunk_count"] >= 1
+    assert queued_doc["active_version"] is not None
 
     index_document_task(user_id, doc_id)
     doc_resp = await api_client.get(f"/api/documents/{doc_id}")
@@ -120,6 +159,7 @@ async def test_reindex_endpoint_queues_and_allows_reindex(api_client) -> None:
     indexed = doc_resp.json()
     assert indexed["status"] == "indexed"
     assert indexed["chunk_count"] >= 1
+    assert indexed["active_version"] > queued_doc["active_version"]
 
 
 async def test_chat_debug_mode_returns_retrieval_trace(api_client) -> None:
@@ -158,3 +198,130 @@ async def test_access_control_user_cannot_delete_other_users_document(api_client
     assert get_resp.status_code == 404
     del_resp = await api_client.delete(f"/api/documents/{doc_id}")
     assert del_resp.status_code == 404
+
+
+async def test_chat_deadline_header_is_validated(api_client) -> None:
+    _ = await _register_and_login(api_client, "deadline@example.com", "password123")
+    response = await api_client.post("/api/chat", json={"query": "What is RAG?"}, headers={"X-Request-Deadline-Ms": "soon"})
+    assert response.status_code == 400
+
+
+async def test_embedding_space_backfill_endpoints(api_client, monkeypatch) -> None:
+    import json
+
+    from app.config import get_settings
+
+    monkeypatch.setenv("EMBEDDING_SPACES", json.dumps({"small-4": {"model": "text-embedding-3-small", "dims": 4}}))
+    monkeypatch.setenv("EMBEDDING_BACKFILL_INTERVAL_S", "0")
+    get_settings.cache_clear()
+    await _register_and_login(api_client, "spaces-api@example.com", "password123")
+    files = {"file": ("notes.txt", io.BytesIO(b"RAG stands for Retrieval Augmented Generation."), "text/plain")}
+    assert (await api_client.post("/api/upload", files=files)).status_code == 200
+
+    listing = (await api_client.get("/api/embedding-spaces")).json()
+    assert listing["active_space"] == "default"
+    assert {s["name"] for s in listing["spaces"]} == {"default", "small-4"}
+
+    assert (await api_client.post("/api/embedding-spaces/nope/backfill")).status_code == 400
+    assert (await api_client.post("/api/embedding-spaces/default/backfill")).status_code == 400
+
+    started = await api_client.post("/api/embedding-spaces/small-4/backfill")
+    assert started.status_code == 200
+    # With INDEX_IN_PROCESS the backfill ran as a background task after the response.
+    after = (await api_client.get("/api/embedding-spaces")).json()
+    assert after["active_space"] == "small-4"
+    assert after["backfills"][0]["coverage_pct"] == 100.0
+
+    chat = await api_client.post("/api/chat", json={"query": "What does RAG stand for?"})
+    assert chat.status_code == 200
+
+
+async def test_batch_upload_accepts_files_and_zip_members(api_client) -> None:
+    import zipfile
+
+    await _register_and_login(api_client, "batch@example.com", "password123")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("docs/one.md", "Zipped note about retrieval.")
+        zf.writestr("docs/two.txt", "Zipped note about generation.")
+        zf.writestr("__MACOSX/docs/._one.md", "resource fork")
+        zf.writestr("docs/.DS_Store", "noise")
+        zf.writestr("docs/tool.exe", "not allowed")
+    archive.seek(0)
+    files = [
+        ("files", ("plain.txt", io.BytesIO(b"A plain text upload."), "text/plain")),
+        ("files", ("bundle.zip", archive, "application/zip")),
+        ("files", ("broken.zip", io.BytesIO(b"not a zip"), "application/zip")),
+    ]
+    response = await api_client.post("/api/upload/batch", files=files)
+    assert response.status_code == 200
+    batch = response.json()
+    assert sorted(d["filename"] for d in batch["documents"]) == ["one.md", "plain.txt", "two.txt"]
+    assert sorted(r["filename"] for r in batch["rejected"]) == ["broken.zip", "tool.exe"]
+
+    # The batch's jobs were indexed together by the in-process background task.
+    status = (await api_client.get(f"/api/upload/batches/{batch['id']}")).json()
+    assert status["done"] is True
+    assert status["progress_pct"] == 100.0
+    assert status["status_counts"] == {"indexed": 3}
+    assert status["chunks_indexed"] == 3
+
+    assert (await api_client.get("/api/upload/batches/not-a-uuid")).status_code == 404
+
+
+async def test_batch_upload_rejects_corrupt_zip_member_and_keeps_the_rest(api_client) -> None:
+    import zipfile
+
+    await _register_and_login(api_client, "corrupt-zip@example.com", "password123")
+    good = "Intact zipped note."
+    bad = "Corrupted zipped note. " * 20
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("good.md", good)
+        zf.writestr("bad.md", bad)
+    # Overwrite bad.md's compressed stream with an invalid deflate block.
+    raw = bytearray(archive.getvalue())
+    with zipfile.ZipFile(io.BytesIO(bytes(raw))) as zf:
+        info = zf.getinfo("bad.md")
+    data_start = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra)
+    raw[data_start : data_start + info.compress_size] = b"\xff" * info.compress_size
+
+    files = [("files", ("bundle.zip", io.BytesIO(bytes(raw)), "application/zip"))]
+    response = await api_client.post("/api/upload/batch", files=files)
+    assert response.status_code == 200
+    batch = response.json()
+    assert [d["filename"] for d in batch["documents"]] == ["good.md"]
+    assert [r["filename"] for r in batch["rejected"]] == ["bad.md"]
+
+    status = (await api_client.get(f"/api/upload/batches/{batch['id']}")).json()
+    assert status["status_counts"] == {"indexed": 1}
+
+
+async def test_documents_endpoint_pages_by_cursor_with_etag(api_client) -> None:
+    await _register_and_login(api_client, "pages@example.com", "password123")
+    for name in ["one.txt", "two.txt", "three.txt"]:
+        resp = await api_client.post("/api/upload", files={"file": (name, io.BytesIO(b"Page me."), "text/plain")})
+        assert resp.status_code == 200
+
+    first = await api_client.get("/api/documents", params={"limit": 2, "fields": "id,filename"})
+    assert first.status_code == 200
+    body = first.json()
+    assert [d["filename"] for d in body["documents"]] == ["three.txt", "two.txt"]
+    assert set(body["documents"][0]) == {"id", "filename"}
+    second = await api_client.get("/api/documents", params={"limit": 2, "cursor": body["next_cursor"]})
+    assert [d["filename"] for d in second.json()["documents"]] == ["one.txt"]
+    assert second.json()["next_cursor"] is None
+
+    etag = first.headers["ETag"]
+    cached = await api_client.get(
+        "/api/documents", params={"limit": 2, "fields": "id,filename"}, headers={"If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+    await api_client.post("/api/upload", files={"file": ("four.txt", io.BytesIO(b"Changed."), "text/plain")})
+    changed = await api_client.get(
+        "/api/documents", params={"limit": 2, "fields": "id,filename"}, headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+    assert (await api_client.get("/api/documents", params={"cursor": "not-a-cursor"})).status_code == 400
+    assert (await api_client.get("/api/documents", params={"fields": "id,secret"})).status_code == 400
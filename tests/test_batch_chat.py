@@ -0,0 +1,76 @@
+import io
+import json
+import uuid
+
+from app.db.models import User
+from app.db.session import get_db
+from app.rag import batch_chat
+from app.rag.embedding import get_embedding_client, get_embedding_space, get_embeddings
+from app.rag.retrieval import retrieve, search_many
+from app.services.auth_service import hash_password
+from app.services.document_service import create_document_record, index_document, index_document_task
+
+
+def test_search_many_matches_single_query_search() -> None:
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="many@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(
+            db=db, user=user, filename="a.txt", content=b"Alpha facts. " * 80 + b"Beta details. " * 80
+        )
+        index_document(db=db, user=user, doc_id=doc.id)
+
+        queries = ["alpha facts", "beta details"]
+        space = get_embedding_space(user.embedding_space)
+        batched = search_many(db, user, get_embeddings(queries, space=space), 3, space)
+        assert [[c.id for c in hits] for hits in batched] == [
+            [c.id for c in retrieve(db, user, q, top_k=3)] for q in queries
+        ]
+        assert search_many(db, user, [], 3, space) == []
+    finally:
+        db.close()
+
+
+async def test_batch_chat_streams_results_with_one_embeddings_call(api_client, monkeypatch) -> None:
+    resp = await api_client.post("/auth/register", data={"email": "batch-chat@example.com", "password": "password123"})
+    user_id = (await api_client.get("/auth/me")).json()["id"]
+    files = {"file": ("guide.md", io.BytesIO(b"RAG uses retrieval and generation with grounding."), "text/markdown")}
+    resp = await api_client.post("/api/upload", files=files)
+    index_document_task(user_id, resp.json()["document"]["id"])
+
+    embeddings_api = get_embedding_client().embeddings
+    calls: list[int] = []
+    original = embeddings_api.create
+
+    def counting_create(**kwargs):
+        calls.append(len(kwargs["input"]))
+        return original(**kwargs)
+
+    monkeypatch.setattr(embeddings_api, "create", counting_create)
+    queries = ["What is RAG?", "How does grounding work?", "Explain retrieval and generation together"]
+    response = await api_client.post("/api/chat/batch", json={"queries": queries, "debug": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert [r["query"] for r in results] == queries
+    assert all(r["response"]["citations"] and r["response"]["debug"]["final_chunks"] for r in results)
+    assert calls == [3]
+
+    def flaky_answer(query, chunks, deadline=None):
+        if query == queries[1]:
+            raise RuntimeError("model unavailable")
+        return original_answer(query=query, chunks=chunks)
+
+    original_answer = batch_chat.generate_answer
+    monkeypatch.setattr(batch_chat, "generate_answer", flaky_answer)
+    response = await api_client.post("/api/chat/batch", json={"queries": queries, "ordered": False})
+    results = {r["index"]: r for r in map(json.loads, response.text.splitlines())}
+    assert sorted(results) == [0, 1, 2]
+    assert "model unavailable" in results[1]["error"] and "response" not in results[1]
+    assert results[0]["response"]["answer"]
+
+    response = await api_client.post("/api/chat/batch", json={"queries": ["ok", "  "]})
+    assert response.status_code == 400
@@ -28,3 +28,28 @@ def test_chunking_invalid_parameters_raise() -> None:
         chunk_text(text="abc", chunk_size=0, overlap=0)
     with pytest.raises(ValueError):
         chunk_text(text="abc", chunk_size=10, overlap=10)
+
+
+def test_iter_chunks_matches_chunk_text_for_any_segmentation() -> None:
+    import random
+
+    from app.rag.chunking import iter_chunks
+
+    rng = random.Random(7)
+    pieces = ["word", " ", ". ", "\n", "\n\n", "\r\n", "\r", "\t", "é"]
+    for _ in range(300):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 300)))
+        chunk_size = rng.randint(1, 80)
+        overlap = rng.randint(0, chunk_size - 1)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 20))))
+        segments = [text[a:b] for a, b in zip([0, *cuts], [*cuts, len(text)])]
+
+        expected = chunk_text(text=text, chunk_size=chunk_size, overlap=overlap)
+        assert list(iter_chunks(segments, chunk_size=chunk_size, overlap=overlap)) == expected
+
+
+def test_chunking_benchmark_smoke(capsys) -> None:
+    from app.eval.bench_chunking import run
+
+    run(size_mb=0.05, repeat=1, chunk_size=500, overlap=50)
+    assert "no_whitespace" in capsys.readouterr().out
@@ -0,0 +1,72 @@
+import uuid
+
+from app.db.models import Chunk, User
+from app.db.session import get_db
+from app.models.schemas import RetrievedChunk
+from app.rag.chunking import chunk_text
+from app.rag.context_packing import pack_context
+from app.rag.embedding import estimate_tokens
+from app.rag.prompting import generate_answer
+from app.services.auth_service import hash_password
+from app.services.document_service import create_document_record, index_document
+
+TEXT = " ".join(f"Sentence number {i} describes the overlap handling in detail." for i in range(40))
+
+
+def _retrieved(doc_id: str, chunks, indexes: list[int]) -> list[RetrievedChunk]:
+    return [
+        RetrievedChunk(
+            id=f"{doc_id}-{i}",
+            text=chunks[i].text,
+            doc_id=doc_id,
+            document_name=f"{doc_id}.txt",
+            chunk_index=i,
+            start_char=chunks[i].start_char,
+            end_char=chunks[i].end_char,
+            score=1.0 - n / 10,
+            token_count=estimate_tokens([chunks[i].text]),
+        )
+        for n, i in enumerate(indexes)
+    ]
+
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap() -> None:
+    chunks = chunk_text(TEXT, chunk_size=200, overlap=40)
+    ranked = _retrieved("a", chunks, [3, 1, 7, 2]) + _retrieved("b", chunks, [4])
+
+    packed = pack_context(ranked, token_budget=0)
+    # 1..3 merge once 2 fills the gap; passages keep the rank of their best chunk.
+    assert [(p.doc_id, p.chunk_index) for p in packed] == [("a", 1), ("a", 7), ("b", 4)]
+    merged = packed[0]
+    assert merged.id == "a-3"
+    assert merged.text == TEXT[chunks[1].start_char : chunks[3].end_char].strip()
+    assert merged.token_count < sum(estimate_tokens([chunks[i].text]) for i in (1, 2, 3))
+
+    # Greedy under a budget: what does not fit is skipped, later smaller chunks still tried.
+    budget = estimate_tokens([chunks[3].text]) + estimate_tokens([chunks[7].text])
+    ranked = _retrieved("a", chunks, [3, 9, 7]) + _retrieved("b", chunks, [1])
+    ranked[1].token_count = budget  # too large once chunk 3 is in
+    packed = pack_context(ranked, token_budget=budget)
+    assert [(p.doc_id, p.chunk_index) for p in packed] == [("a", 3), ("a", 7)]
+    assert sum(p.token_count for p in packed) == budget
+    # The best chunk is kept even when it alone exceeds the budget.
+    assert len(pack_context(_retrieved("a", chunks, [3]), token_budget=1)) == 1
+
+
+def test_token_counts_are_stored_and_citations_follow_passages(monkeypatch) -> None:
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="packing@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="a.txt", content=TEXT.encode())
+        index_document(db=db, user=user, doc_id=doc.id)
+        rows = db.query(Chunk).filter(Chunk.document_id == uuid.UUID(doc.id)).all()
+        assert rows and all(r.token_count == estimate_tokens([r.text]) for r in rows)
+    finally:
+        db.close()
+
+    chunks = chunk_text(TEXT, chunk_size=200, overlap=40)
+    response = generate_answer("How is overlap handled?", _retrieved("a", chunks, [5, 4]) + _retrieved("b", chunks, [0]))
+    assert [(c.number, c.chunk_index) for c in response.citations] == [(1, 4)]
+    assert response.citations[0].text == TEXT[chunks[4].start_char : chunks[5].end_char].strip()
@@ -2,6 +2,7 @@ import uuid
 
 from sqlalchemy import select
 
+from app.config import get_settings
 from app.db.models import User
 from app.db.session import get_db
 from app.services.auth_service import hash_password
@@ -28,3 +29,347 @@ def test_index_document_transitions_statuses() -> None:
     finally:
         db.close()
 
+
+
+def test_index_document_writes_chunks_in_bulk() -> None:
+    from sqlalchemy import event, func
+
+    from app.db.models import Chunk, ChunkEmbedding
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="bulk@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+
+        content = ("Sentence number one is here. " * 2000).encode("utf-8")
+        doc = create_document_record(db=db, user=user, filename="big.txt", content=content)
+
+        statements: list[str] = []
+
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("INSERT"):
+                statements.append(statement)
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            indexed = index_document(db=db, user=user, doc_id=doc.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+
+        assert indexed.status == "indexed"
+        assert indexed.chunk_count > 50
+        # One executemany per table per batch, not one INSERT per row.
+        batches = -(-indexed.chunk_count // get_settings().index_batch_size)
+        assert len(statements) == 2 * batches
+        assert db.execute(select(func.count()).select_from(Chunk)).scalar_one() == indexed.chunk_count
+        assert db.execute(select(func.count()).select_from(ChunkEmbedding)).scalar_one() == indexed.chunk_count
+    finally:
+        db.close()
+
+
+def test_bulk_insert_method_rejects_unknown_values(monkeypatch) -> None:
+    import pytest
+    from pydantic import ValidationError
+
+    from app.config import Settings
+
+    monkeypatch.setenv("BULK_INSERT_METHOD", "COPY")
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_index_document_streams_text_in_blocks(monkeypatch) -> None:
+    from app.rag.chunking import chunk_text
+    from app.services import document_service
+
+    # Small read blocks force chunk windows (and "\r\n" pairs) to straddle block boundaries.
+    monkeypatch.setattr(document_service, "_TEXT_BLOCK_CHARS", 7)
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="stream-idx@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+
+        text = "\r\n  Intro line.\r\n\r\n" + "Para words here. More words\r\n" * 200 + "  \r\n"
+        doc = create_document_record(db=db, user=user, filename="s.txt", content=text.encode("utf-8"))
+        indexed = index_document(db=db, user=user, doc_id=doc.id)
+
+        from app.db.models import Chunk
+
+        rows = db.execute(select(Chunk).order_by(Chunk.chunk_index)).scalars().all()
+        settings = get_settings()
+        expected = chunk_text(text, chunk_size=settings.chunk_size, overlap=settings.chunk_overlap)
+        assert indexed.chunk_count == len(expected)
+        assert [(r.start_char, r.end_char, r.text) for r in rows] == [(c.start_char, c.end_char, c.text) for c in expected]
+    finally:
+        db.close()
+
+
+def test_failed_index_resumes_from_last_committed_batch(monkeypatch) -> None:
+    from app.db.models import Chunk
+    from app.rag.embedding import get_embeddings as real_get_embeddings
+    from app.rag.retrieval import retrieve
+    from app.services import document_service
+
+    monkeypatch.setenv("INDEX_BATCH_SIZE", "10")
+    get_settings.cache_clear()
+    embedded: list[str] = []
+    fail_on_call = {"n": 2}
+
+    def flaky_embeddings(texts, **kwargs):
+        fail_on_call["n"] -= 1
+        if fail_on_call["n"] == 0:
+            raise RuntimeError("transient embedding error")
+        embedded.extend(texts)
+        return real_get_embeddings(texts, **kwargs)
+
+    monkeypatch.setattr(document_service, "get_embeddings", flaky_embeddings)
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="resume@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        content = " ".join(f"Sentence {i} about retrieval." for i in range(600)).encode("utf-8")
+        doc = create_document_record(db=db, user=user, filename="r.txt", content=content)
+
+        failed = index_document(db=db, user=user, doc_id=doc.id)
+        assert failed.status == "failed"
+        assert len(embedded) == 10
+        # The committed first batch is not visible to retrieval until the document completes.
+        assert db.execute(select(Chunk)).scalars().all()
+        assert retrieve(db, user, "retrieval") == []
+
+        resumed = index_document(db=db, user=user, doc_id=doc.id)
+        assert resumed.status == "indexed"
+        rows = db.execute(select(Chunk).order_by(Chunk.chunk_index)).scalars().all()
+        assert [r.chunk_index for r in rows] == list(range(resumed.chunk_count))
+        # Only chunks after the checkpoint were embedded again.
+        assert len(embedded) == resumed.chunk_count
+        assert retrieve(db, user, "retrieval")
+    finally:
+        db.close()
+
+
+def test_reindex_builds_new_version_while_old_one_serves(monkeypatch) -> None:
+    from app.db.models import Chunk
+    from app.rag.embedding import get_embeddings as real_get_embeddings
+    from app.rag.retrieval import retrieve
+    from app.services import document_service
+    from app.services.document_service import mark_queued
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="shadow@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="v.txt", content=b"Versioned retrieval content. " * 80)
+        v1 = index_document(db=db, user=user, doc_id=doc.id)
+        assert v1.active_version == 1
+        v1_ids = {r.id for r in retrieve(db, user, "retrieval", top_k=50)}
+
+        queued = mark_queued(db=db, user=user, doc_id=doc.id)
+        assert queued.chunk_count == v1.chunk_count
+
+        seen_during_build: list[set[str]] = []
+
+        def embeddings_then_probe(texts, **kwargs):
+            # Mid-build, retrieval still sees exactly the old version: no holes, no new rows.
+            with next(get_db()) as probe:
+                seen_during_build.append({r.id for r in retrieve(probe, user, "retrieval", top_k=50)})
+            return real_get_embeddings(texts, **kwargs)
+
+        monkeypatch.setattr(document_service, "get_embeddings", embeddings_then_probe)
+        v2 = index_document(db=db, user=user, doc_id=doc.id)
+        monkeypatch.setattr(document_service, "get_embeddings", real_get_embeddings)
+
+        assert v2.active_version == 2
+        assert seen_during_build and all(ids == v1_ids for ids in seen_during_build)
+        v2_ids = {r.id for r in retrieve(db, user, "retrieval", top_k=50)}
+        assert v2_ids and not (v2_ids & v1_ids)
+        # Old version was garbage-collected after the flip.
+        versions = set(db.execute(select(Chunk.index_version)).scalars().all())
+        assert versions == {2}
+    finally:
+        db.close()
+
+
+def test_failed_reindex_keeps_serving_previous_version(monkeypatch) -> None:
+    from app.rag.retrieval import retrieve
+    from app.services import document_service
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="keep@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="k.txt", content=b"Kept retrieval content.")
+        index_document(db=db, user=user, doc_id=doc.id)
+
+        def broken(texts, **kwargs):
+            raise RuntimeError("embedding outage")
+
+        monkeypatch.setattr(document_service, "get_embeddings", broken)
+        failed = index_document(db=db, user=user, doc_id=doc.id)
+        assert failed.status == "failed"
+        assert failed.active_version == 1
+        assert retrieve(db, user, "retrieval")
+    finally:
+        db.close()
+
+
+def test_duplicate_upload_reuses_blob_and_indexed_chunks(monkeypatch) -> None:
+    from app.db.models import Blob, Chunk
+    from app.rag.retrieval import retrieve
+    from app.services import blob_store, document_service
+    from app.services.document_service import delete_document_everywhere
+
+    db = next(get_db())
+    try:
+        alice = User(id=uuid.uuid4(), email="dup-a@example.com", password_hash=hash_password("password123"))
+        bob = User(id=uuid.uuid4(), email="dup-b@example.com", password_hash=hash_password("password123"))
+        db.add_all([alice, bob])
+        db.commit()
+        content = b"Shared retrieval handbook. " * 100
+
+        first = create_document_record(db=db, user=alice, filename="handbook.txt", content=content)
+        first = index_document(db=db, user=alice, doc_id=first.id)
+
+        def no_embeddings(texts, **kwargs):
+            raise AssertionError("duplicate content must not be re-embedded")
+
+        def no_extraction(*args):
+            raise AssertionError("duplicate content must not be re-extracted")
+
+        monkeypatch.setattr(document_service, "get_embeddings", no_embeddings)
+        monkeypatch.setattr(document_service, "_extract", no_extraction)
+        second = create_document_record(db=db, user=bob, filename="copy.txt", content=content)
+        assert second.stored_filename == first.stored_filename
+        second = index_document(db=db, user=bob, doc_id=second.id)
+
+        assert second.status == "indexed"
+        assert second.chunk_count == first.chunk_count
+
+        def texts(doc_id: str) -> list[str]:
+            stmt = select(Chunk.text).where(Chunk.document_id == uuid.UUID(doc_id)).order_by(Chunk.chunk_index)
+            return list(db.execute(stmt).scalars())
+
+        assert texts(second.id) == texts(first.id)
+        assert {r.doc_id for r in retrieve(db, bob, "retrieval")} == {second.id}
+
+        path = blob_store.blob_path(first.content_sha256)
+        assert db.get(Blob, first.content_sha256).refcount == 2
+        delete_document_everywhere(db=db, user=alice, doc_id=first.id)
+        assert path.exists() and db.get(Blob, first.content_sha256).refcount == 1
+        delete_document_everywhere(db=db, user=bob, doc_id=second.id)
+        assert not path.exists() and db.get(Blob, first.content_sha256) is None
+    finally:
+        db.close()
+
+
+def test_index_documents_packs_small_documents_into_shared_embedding_batches(monkeypatch) -> None:
+    from app.services import document_service
+    from app.services.document_service import index_documents
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="pack@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        docs = [
+            create_document_record(db=db, user=user, filename=f"note-{i}.txt", content=f"Short note number {i}.".encode())
+            for i in range(6)
+        ]
+        docs.append(create_document_record(db=db, user=user, filename="broken.pdf", content=b"not a pdf"))
+
+        calls: list[int] = []
+        real = document_service.get_embeddings
+
+        def counting(texts, **kwargs):
+            calls.append(len(texts))
+            return real(texts, **kwargs)
+
+        monkeypatch.setattr(document_service, "get_embeddings", counting)
+        results = index_documents(db=db, user=user, doc_ids=[d.id for d in docs])
+
+        assert [results[d.id].status for d in docs] == ["indexed"] * 6 + ["failed"]
+        assert all(results[d.id].chunk_count == 1 for d in docs[:6])
+        # Six one-chunk documents share a single embeddings request.
+        assert calls == [6]
+    finally:
+        db.close()
+
+
+def test_blob_acquire_survives_concurrent_insert_and_release_waits_for_commit(monkeypatch) -> None:
+    from app.db.models import Blob
+    from app.services import blob_store
+
+    sha256 = "ab" * 32
+
+    def staged(data: bytes):
+        path = blob_store.staging_dir() / uuid.uuid4().hex
+        path.write_bytes(data)
+        return path
+
+    db = next(get_db())
+    other = next(get_db())
+    try:
+        # The other upload commits its new row after this one looked and found nothing.
+        assert blob_store.acquire(other, sha256, 5, staged(b"bytes")) is False
+        other.commit()
+        locked = blob_store._locked
+        lookups: list[str] = []
+
+        def late_lookup(session, sha):
+            lookups.append(sha)
+            return None if len(lookups) == 1 else locked(session, sha)
+
+        monkeypatch.setattr(blob_store, "_locked", late_lookup)
+        assert blob_store.acquire(db, sha256, 5, staged(b"bytes")) is True
+        assert len(lookups) == 2
+        db.commit()
+        assert db.get(Blob, sha256).refcount == 2
+
+        # The file is only removed once the release that dropped the last reference commits.
+        blob_store.release(db, sha256)
+        assert blob_store.release(db, sha256) == blob_store.blob_path(sha256)
+        db.rollback()
+        assert blob_store.blob_path(sha256).exists() and db.get(Blob, sha256).refcount == 2
+    finally:
+        other.close()
+        db.close()
+
+
+def test_failed_upload_of_new_content_leaves_no_blob_file(monkeypatch) -> None:
+    import hashlib
+
+    import pytest
+
+    from app.services import blob_store, document_service
+
+    def broken_publish(db, doc):
+        raise RuntimeError("database went away")
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="orphan@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        kept = create_document_record(db=db, user=user, filename="kept.txt", content=b"Shared bytes")
+
+        monkeypatch.setattr(document_service, "publish_document_status", broken_publish)
+        content = b"Never committed"
+        with pytest.raises(RuntimeError):
+            create_document_record(db=db, user=user, filename="lost.txt", content=content)
+        # The blob row rolls back with the document (on Postgres; pysqlite commits a savepoint
+        # that opens the transaction), and the file placed for it is removed.
+        assert not blob_store.blob_path(hashlib.sha256(content).hexdigest()).exists()
+
+        # A failed upload of content that is already stored keeps the existing file.
+        with pytest.raises(RuntimeError):
+            create_document_record(db=db, user=user, filename="again.txt", content=b"Shared bytes")
+        assert blob_store.blob_path(kept.content_sha256).read_bytes() == b"Shared bytes"
+    finally:
+        db.close()
@@ -0,0 +1,194 @@
+import json
+import uuid
+
+from sqlalchemy import func, select
+
+from app.config import get_settings
+from app.db.models import ChunkEmbedding, User
+from app.db.session import get_db
+from app.rag.retrieval import retrieve
+from app.services.auth_service import hash_password
+from app.services.document_service import create_document_record, index_document
+from app.services.embedding_backfill import describe_spaces, process_next_backfill, start_backfill
+
+
+def _configure_spaces(monkeypatch) -> None:
+    spaces = {"small-4": {"model": "text-embedding-3-small", "dims": 4, "price_per_mtok": 0.02}}
+    monkeypatch.setenv("EMBEDDING_SPACES", json.dumps(spaces))
+    monkeypatch.setenv("EMBEDDING_BACKFILL_BATCH_SIZE", "3")
+    monkeypatch.setenv("EMBEDDING_BACKFILL_INTERVAL_S", "0")
+    get_settings.cache_clear()
+
+
+def _vector_lengths(db, space: str) -> set[int]:
+    vectors = db.execute(select(ChunkEmbedding.embedding).where(ChunkEmbedding.space == space)).scalars().all()
+    return {len(v) for v in vectors}
+
+
+def test_backfill_switches_retrieval_only_at_full_coverage(monkeypatch) -> None:
+    _configure_spaces(monkeypatch)
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="spaces@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        first = create_document_record(db=db, user=user, filename="a.txt", content=b"Retrieval notes. " * 120)
+        index_document(db=db, user=user, doc_id=first.id)
+        assert _vector_lengths(db, "default") == {8}
+
+        backfill = start_backfill(db, user, "small-4")
+        assert start_backfill(db, user, "small-4").id == backfill.id
+
+        # Documents indexed while the backfill is pending are written to both spaces.
+        second = create_document_record(db=db, user=user, filename="b.txt", content=b"More retrieval notes. " * 40)
+        second = index_document(db=db, user=user, doc_id=second.id)
+        progress = describe_spaces(db, user).backfills[0]
+        assert progress.status == "pending"
+        assert progress.covered_chunks == second.chunk_count
+        assert 0 < progress.coverage_pct < 100
+        assert progress.remaining_cost_estimate_usd > 0
+
+        # Until coverage is complete, retrieval stays on the default space.
+        assert describe_spaces(db, user).active_space == "default"
+        assert retrieve(db, user, "retrieval")
+
+        assert process_next_backfill("test-worker", stop=None) is True
+        db.expire_all()
+        assert db.get(User, user.id).embedding_space == "small-4"
+        assert _vector_lengths(db, "small-4") == {4}
+        first_count = db.execute(select(func.count()).select_from(ChunkEmbedding).where(ChunkEmbedding.space == "small-4"))
+        assert first_count.scalar_one() == progress.total_chunks
+
+        done = describe_spaces(db, user)
+        assert done.active_space == "small-4"
+        assert done.backfills[0].status == "done"
+        assert done.backfills[0].coverage_pct == 100.0
+        assert done.backfills[0].cost_estimate_usd > 0
+        assert retrieve(db, db.get(User, user.id), "retrieval")
+    finally:
+        db.close()
+
+
+def test_failed_backfill_keeps_serving_and_resumes(monkeypatch) -> None:
+    from app.rag.embedding import get_embeddings as real_get_embeddings
+    from app.services import embedding_backfill
+
+    _configure_spaces(monkeypatch)
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="spaces-fail@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="c.txt", content=b"Resumable retrieval. " * 120)
+        doc = index_document(db=db, user=user, doc_id=doc.id)
+
+        calls = {"n": 0}
+
+        def flaky(texts, **kwargs):
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise RuntimeError("embedding outage")
+            return real_get_embeddings(texts, **kwargs)
+
+        monkeypatch.setattr(embedding_backfill, "get_embeddings", flaky)
+        start_backfill(db, user, "small-4")
+        process_next_backfill("test-worker")
+        db.expire_all()
+        status = describe_spaces(db, user)
+        assert status.active_space == "default"
+        assert status.backfills[0].status == "failed"
+        assert status.backfills[0].covered_chunks == 3
+        assert retrieve(db, db.get(User, user.id), "retrieval")
+
+        start_backfill(db, db.get(User, user.id), "small-4")
+        process_next_backfill("test-worker")
+        db.expire_all()
+        resumed = describe_spaces(db, db.get(User, user.id))
+        assert resumed.active_space == "small-4"
+        assert resumed.backfills[0].embedded_chunks == doc.chunk_count - 3
+    finally:
+        db.close()
+
+
+def test_backfill_rechecks_coverage_under_the_tenant_lock(monkeypatch) -> None:
+    from app.services import embedding_backfill
+
+    _configure_spaces(monkeypatch)
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="late-build@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="a.txt", content=b"Late chunks. " * 60)
+        index_document(db=db, user=user, doc_id=doc.id)
+        start_backfill(db, user, "small-4")
+
+        # The first batch sees nothing, as if a build committed its chunks right after it looked.
+        embed = embedding_backfill.embed_missing_chunks
+        calls: list[int] = []
+
+        def late_view(*args, **kwargs):
+            calls.append(1)
+            return (0, 0) if len(calls) == 1 else embed(*args, **kwargs)
+
+        monkeypatch.setattr(embedding_backfill, "embed_missing_chunks", late_view)
+        assert process_next_backfill("test-worker", stop=None) is True
+
+        db.expire_all()
+        assert db.get(User, user.id).embedding_space == "small-4"
+        def count(space: str) -> int:
+            stmt = select(func.count()).select_from(ChunkEmbedding).where(ChunkEmbedding.space == space)
+            return db.execute(stmt).scalar_one()
+
+        assert count("small-4") == count("default") > 0
+    finally:
+        db.close()
+
+
+def test_chunk_writers_lock_the_tenant_without_blocking_its_status_updates() -> None:
+    from sqlalchemy.dialects import postgresql
+
+    from app.services.embedding_backfill import _tenant_lock
+
+    def sql(shared: bool) -> str:
+        return str(_tenant_lock(uuid.uuid4(), shared).compile(dialect=postgresql.dialect()))
+
+    # FOR KEY SHARE blocks the space switch (FOR UPDATE) but not `UPDATE users SET documents_version`.
+    assert sql(shared=True).endswith("FOR KEY SHARE")
+    assert sql(shared=False).endswith("FOR UPDATE")
+
+
+def test_changing_a_spaces_model_is_refused_once_it_holds_vectors(monkeypatch) -> None:
+    import pytest
+
+    from app.db.models import EmbeddingSpacePin
+    from app.services.embedding_backfill import pin_embedding_spaces
+
+    _configure_spaces(monkeypatch)
+    db = next(get_db())
+    try:
+        pin_embedding_spaces(db)
+        assert db.get(EmbeddingSpacePin, "default").model == "text-embedding-3-small"
+
+        # Nothing stored in small-4 yet: reconfiguring it just moves the pin.
+        spaces = {"small-4": {"model": "text-embedding-3-large", "dims": 4}}
+        monkeypatch.setenv("EMBEDDING_SPACES", json.dumps(spaces))
+        get_settings.cache_clear()
+        pin_embedding_spaces(db)
+        db.expire_all()
+        assert db.get(EmbeddingSpacePin, "small-4").model == "text-embedding-3-large"
+
+        user = User(id=uuid.uuid4(), email="pinned@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="a.txt", content=b"Pinned vectors.")
+        index_document(db=db, user=user, doc_id=doc.id)
+
+        monkeypatch.setenv("EMBEDDING_MODEL", "text-embedding-3-large")
+        get_settings.cache_clear()
+        with pytest.raises(RuntimeError, match="'default' holds vectors from text-embedding-3-small"):
+            pin_embedding_spaces(db)
+        db.expire_all()
+        assert db.get(EmbeddingSpacePin, "default").model == "text-embedding-3-small"
+    finally:
+        db.close()
@@ -0,0 +1,75 @@
+import json
+
+from app.models.schemas import RetrievedChunk
+from app.observability.metrics import get_metrics
+from app.rag.gating import get_gate_thresholds, rerank_gate, rewrite_gate
+
+
+def _chunk(cid: str, score: float) -> RetrievedChunk:
+    return RetrievedChunk(
+        id=cid, text=cid, doc_id="d", document_name="doc.txt", chunk_index=0, start_char=0, end_char=1, score=score
+    )
+
+
+def test_rewrite_gate_skips_keyword_queries() -> None:
+    assert rewrite_gate("pgvector index").run is False
+    assert rewrite_gate("How does pgvector index vectors?").run is True
+    assert rewrite_gate("what is rag").run is True
+
+
+def test_rerank_gate_skips_clear_winner() -> None:
+    clear = rerank_gate([_chunk("a", 0.9), _chunk("b", 0.5), _chunk("c", 0.45)])
+    assert clear.run is False
+    assert clear.reason == "score_margin"
+
+    outlier = rerank_gate([_chunk("a", 0.60), _chunk("b", 0.50), _chunk("c", 0.49), _chunk("d", 0.48), _chunk("e", 0.47)])
+    assert outlier.run is False
+    assert outlier.reason == "score_outlier"
+
+    ambiguous = rerank_gate([_chunk("a", 0.52), _chunk("b", 0.50), _chunk("c", 0.49), _chunk("d", 0.30)])
+    assert ambiguous.run is True
+
+
+def test_gates_use_calibrated_thresholds_file(tmp_path, monkeypatch) -> None:
+    from app.config import get_settings
+    from app.eval.calibrate_gates import calibrate
+
+    thresholds = calibrate("eval/golden.jsonl")
+    path = tmp_path / "gate_thresholds.json"
+    path.write_text(json.dumps({**thresholds.to_dict(), "rewrite_max_terms": 1, "rerank_margin": None}))
+    monkeypatch.setenv("GATE_THRESHOLDS_PATH", str(path))
+    get_settings.cache_clear()
+
+    assert get_gate_thresholds().rewrite_max_terms == 1
+    assert rewrite_gate("pgvector index").run is True
+    assert rewrite_gate("pgvector").run is False
+    # A signal calibration found no safe value for never skips rerank.
+    assert rerank_gate([_chunk("a", 0.9), _chunk("b", 0.5)]).run is True
+
+
+async def test_chat_debug_records_gate_decisions_and_metrics(api_client, monkeypatch) -> None:
+    import io
+
+    from app.config import get_settings
+
+    monkeypatch.setenv("ENABLE_ADAPTIVE_GATING", "true")
+    get_settings.cache_clear()
+
+    from app.services.document_service import index_document_task
+
+    resp = await api_client.post("/auth/register", data={"email": "gate@example.com", "password": "password123"})
+    assert resp.status_code == 200
+    user_id = (await api_client.get("/auth/me")).json()["id"]
+    files = {"file": ("guide.md", io.BytesIO(b"RAG uses retrieval and generation with grounding."), "text/markdown")}
+    doc_id = (await api_client.post("/api/upload", files=files)).json()["document"]["id"]
+    index_document_task(user_id, doc_id)
+
+    response = await api_client.post("/api/chat", json={"query": "RAG grounding", "debug": True})
+    assert response.status_code == 200
+    decisions = response.json()["debug"]["gate_decisions"]
+    assert decisions[0] == {"stage": "rewrite", "run": False, "reason": "keyword_query", "value": 2.0}
+    assert response.json()["debug"]["rewritten_query"] == "RAG grounding"
+
+    gating = get_metrics().snapshot()["gating"]
+    assert gating["rewrite"]["skipped"] == 1
+    assert gating["rewrite"]["skip_rate"] == 1.0
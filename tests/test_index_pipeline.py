@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from app.services.index_pipeline import StagePipeline
+
+
+def test_stages_overlap_and_report_stats() -> None:
+    pipeline = StagePipeline(queue_size=2)
+
+    def slow_double(items):
+        for item in items:
+            time.sleep(0.05)
+            yield item * 2
+
+    try:
+        source = pipeline.source("extract", range(6))
+        doubled = pipeline.stage("embed", source, slow_double)
+        started = time.perf_counter()
+        out = []
+        for item in pipeline.consume("write", doubled):
+            time.sleep(0.05)
+            out.append(item)
+        elapsed = time.perf_counter() - started
+    finally:
+        pipeline.close()
+
+    assert out == [0, 2, 4, 6, 8, 10]
+    # Serial would be 6 * (0.05 + 0.05) = 0.6s; overlapped it is ~0.35s.
+    assert elapsed < 0.5
+    stats = pipeline.stats()
+    assert set(stats) == {"extract", "embed", "write"}
+    assert stats["embed"]["items"] == 6
+    assert stats["write"]["items"] == 6
+    assert stats["embed"]["work_ms"] >= 250
+    assert stats["extract"]["max_queue_depth"] <= 2
+
+
+def test_stage_failure_surfaces_on_consumer_and_stops_threads() -> None:
+    pipeline = StagePipeline(queue_size=1)
+    produced = []
+
+    def endless():
+        i = 0
+        while True:
+            produced.append(i)
+            yield i
+            i += 1
+
+    def explode(items):
+        for item in items:
+            if item == 3:
+                raise RuntimeError("embedding failed")
+            yield item
+
+    try:
+        upstream = pipeline.stage("embed", pipeline.source("extract", endless()), explode)
+        with pytest.raises(RuntimeError, match="embedding failed"):
+            list(pipeline.consume("write", upstream))
+    finally:
+        pipeline.close()
+
+    assert not [t for t in threading.enumerate() if t.name.startswith("index-")]
+    # Backpressure: the source ran at most a couple of queue slots ahead of the failure.
+    assert len(produced) < 10
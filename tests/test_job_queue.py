@@ -0,0 +1,207 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.db.models import Document, IndexJob, User
+from app.db.session import get_db
+from app.services.auth_service import hash_password
+from app.services.document_service import create_document_record
+from app.services.job_queue import (
+    claim_job,
+    enqueue_index_job,
+    process_next_job,
+    recover_stale_jobs,
+    requeue_stuck_documents,
+)
+
+
+def _user(db) -> User:
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4()}@example.com", password_hash=hash_password("password123"))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_worker_claims_and_indexes_queued_document() -> None:
+    db = next(get_db())
+    try:
+        user = _user(db)
+        meta = create_document_record(db=db, user=user, filename="a.txt", content=b"Hello queue")
+        job = enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(meta.id))
+        # Enqueueing twice reuses the pending job.
+        assert enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(meta.id)).id == job.id
+
+        assert process_next_job("test-worker") is True
+        assert process_next_job("test-worker") is False
+
+        db.expire_all()
+        job_row = db.get(IndexJob, job.id)
+        assert job_row.status == "succeeded"
+        assert job_row.attempts == 1
+        assert db.get(Document, uuid.UUID(meta.id)).status == "indexed"
+    finally:
+        db.close()
+
+
+def test_failed_job_is_retried_then_dead_lettered(monkeypatch) -> None:
+    from app.services import document_service
+
+    def _boom(texts, **kwargs):
+        raise RuntimeError("embedding API down")
+
+    monkeypatch.setattr(document_service, "get_embeddings", _boom)
+    db = next(get_db())
+    try:
+        user = _user(db)
+        meta = create_document_record(db=db, user=user, filename="a.txt", content=b"Hello retry")
+        job = enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(meta.id))
+        job.max_attempts = 2
+        db.commit()
+
+        assert process_next_job("test-worker") is True
+        db.expire_all()
+        job_row = db.get(IndexJob, job.id)
+        assert job_row.status == "pending"
+        assert job_row.attempts == 1
+        assert "embedding API down" in (job_row.last_error or "")
+        assert db.get(Document, job.document_id).status == "queued"
+
+        # Make it due again and exhaust the retries.
+        job_row.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+        assert process_next_job("test-worker") is True
+        db.expire_all()
+        job_row = db.get(IndexJob, job.id)
+        assert job_row.status == "dead"
+        assert db.get(Document, job.document_id).status == "failed"
+    finally:
+        db.close()
+
+
+def test_recovery_requeues_stale_jobs_and_stuck_documents() -> None:
+    db = next(get_db())
+    try:
+        user = _user(db)
+        stale_meta = create_document_record(db=db, user=user, filename="stale.txt", content=b"Stale")
+        stale_job = enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(stale_meta.id))
+        claimed = claim_job(db, "dead-worker")
+        assert claimed is not None and claimed.id == stale_job.id
+        claimed.heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db.commit()
+
+        # Uploaded before the queue existed (or lost on restart): no job at all.
+        orphan_meta = create_document_record(db=db, user=user, filename="orphan.txt", content=b"Orphan")
+
+        assert recover_stale_jobs(db) == 1
+        assert requeue_stuck_documents(db) == 1
+        db.expire_all()
+        assert db.get(IndexJob, stale_job.id).status == "pending"
+        orphan_jobs = db.execute(select(IndexJob).where(IndexJob.document_id == uuid.UUID(orphan_meta.id))).scalars().all()
+        assert [j.status for j in orphan_jobs] == ["pending"]
+    finally:
+        db.close()
+
+
+def test_reindex_during_a_run_waits_for_it(monkeypatch) -> None:
+    from app.services import job_queue
+
+    db = next(get_db())
+    other = next(get_db())
+    try:
+        user = _user(db)
+        meta = create_document_record(db=db, user=user, filename="a.txt", content=b"Reindex me")
+        doc_id = uuid.UUID(meta.id)
+        first = enqueue_index_job(db, user_id=user.id, document_id=doc_id)
+
+        index_documents = job_queue.index_documents
+        builds: list[list[str]] = []
+        queued: list[IndexJob] = []
+
+        def reindex_midway(db, user, doc_ids):
+            builds.append(doc_ids)
+            if len(builds) == 1:
+                queued.append(enqueue_index_job(other, user_id=user.id, document_id=doc_id))
+                # Not the running job, and no other worker may start a second build.
+                assert queued[0].id != first.id
+                assert claim_job(other, "second-worker") is None
+            return index_documents(db=db, user=user, doc_ids=doc_ids)
+
+        monkeypatch.setattr(job_queue, "index_documents", reindex_midway)
+        assert process_next_job("test-worker") is True
+
+        # The deferred job ran right after the first one, in the same process.
+        assert builds == [[meta.id], [meta.id]]
+        db.expire_all()
+        assert {db.get(IndexJob, j.id).status for j in (first, queued[0])} == {"succeeded"}
+        assert db.get(Document, doc_id).active_version == 2
+    finally:
+        other.close()
+        db.close()
+
+
+def test_stale_job_out_of_attempts_stays_dead_lettered() -> None:
+    db = next(get_db())
+    try:
+        user = _user(db)
+        meta = create_document_record(db=db, user=user, filename="crash.txt", content=b"Crashes workers")
+        job = enqueue_index_job(db, user_id=user.id, document_id=uuid.UUID(meta.id))
+        job.max_attempts = 1
+        db.commit()
+        claimed = claim_job(db, "crashed-worker")
+        claimed.heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db.get(Document, claimed.document_id).status = "indexing"
+        db.commit()
+
+        assert recover_stale_jobs(db) == 1
+        assert requeue_stuck_documents(db) == 0
+        db.expire_all()
+        doc = db.get(Document, uuid.UUID(meta.id))
+        assert doc.status == "failed"
+        assert doc.error_message == "Worker heartbeat lost"
+        jobs = db.execute(select(IndexJob).where(IndexJob.document_id == doc.id)).scalars().all()
+        assert [(j.status, j.attempts) for j in jobs] == [("dead", 1)]
+
+        # A document left `indexing` behind a dead job (before this was fixed) is not requeued either.
+        doc.status = "indexing"
+        db.commit()
+        assert requeue_stuck_documents(db) == 0
+    finally:
+        db.close()
+
+
+def test_concurrent_enqueues_and_retries_leave_one_pending_job(monkeypatch) -> None:
+    from app.services import job_queue
+    from app.services.job_queue import finish_job
+
+    db = next(get_db())
+    other = next(get_db())
+    try:
+        user = _user(db)
+        meta = create_document_record(db=db, user=user, filename="a.txt", content=b"Race me")
+        doc_id = uuid.UUID(meta.id)
+        first = enqueue_index_job(other, user_id=user.id, document_id=doc_id)
+
+        # `db` checks before `other` commits, so its insert hits the unique index.
+        pending_job = job_queue._pending_job
+        lookups: list[int] = []
+
+        def stale_lookup(session, document_id):
+            lookups.append(1)
+            return None if len(lookups) == 1 else pending_job(session, document_id)
+
+        monkeypatch.setattr(job_queue, "_pending_job", stale_lookup)
+        assert enqueue_index_job(db, user_id=user.id, document_id=doc_id).id == first.id
+        monkeypatch.undo()
+
+        # A reindex queued behind a running job; the running one then fails and would retry.
+        running = claim_job(db, "test-worker")
+        queued = enqueue_index_job(db, user_id=user.id, document_id=doc_id)
+        finish_job(db, running, "embedding API down")
+
+        db.expire_all()
+        statuses = db.execute(select(IndexJob.id, IndexJob.status).where(IndexJob.document_id == doc_id)).all()
+        assert sorted(statuses, key=lambda r: r.status) == [(queued.id, "pending"), (running.id, "superseded")]
+    finally:
+        other.close()
+        db.close()
@@ -0,0 +1,224 @@
+import threading
+import time
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from app.observability.metrics import get_metrics
+from app.observability.openai import (
+    CallPolicy,
+    OpenAICallTimeout,
+    call_timeout,
+    get_call_policy,
+    instrument_openai_call,
+    observed_p95_ms,
+    reset_latency_windows,
+)
+
+
+class _Usage:
+    def __init__(self, total_tokens: int) -> None:
+        self.total_tokens = total_tokens
+
+
+class _Resp:
+    def __init__(self, value: str, tokens: int = 10) -> None:
+        self.value = value
+        self.usage = _Usage(tokens)
+
+
+def _rate_limit_error(retry_after: str | None = None) -> RateLimitError:
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    response = httpx.Response(429, headers=headers, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def test_retries_transient_errors_then_succeeds() -> None:
+    calls = {"n": 0}
+
+    def fn() -> _Resp:
+        calls["n"] += 1
+        if calls["n"] < 3:
+            raise _rate_limit_error(retry_after="0")
+        return _Resp("ok")
+
+    policy = CallPolicy(name="test", max_retries=3, backoff_base_ms=1, backoff_max_ms=2)
+    resp = instrument_openai_call(operation="embeddings.create", model="m", fn=fn, policy=policy)
+
+    assert resp.value == "ok"
+    assert calls["n"] == 3
+    counters = get_metrics().snapshot()["counters"]
+    assert counters["openai_retries_total"] == 2
+    assert counters["openai_calls_total"] == 3
+
+
+def test_non_retryable_errors_are_raised_immediately() -> None:
+    calls = {"n": 0}
+
+    def fn() -> _Resp:
+        calls["n"] += 1
+        raise ValueError("bad request shape")
+
+    policy = CallPolicy(name="test", max_retries=3, backoff_base_ms=1)
+    with pytest.raises(ValueError):
+        instrument_openai_call(operation="embeddings.create", model="m", fn=fn, policy=policy)
+    assert calls["n"] == 1
+
+
+def test_deadline_raises_timeout_and_counts_late_tokens_as_wasted() -> None:
+    release = threading.Event()
+    finished = threading.Event()
+
+    def fn() -> _Resp:
+        release.wait(timeout=2.0)
+        finished.set()
+        return _Resp("late", tokens=7)
+
+    policy = CallPolicy(name="test", deadline_s=0.05)
+    with pytest.raises(OpenAICallTimeout):
+        instrument_openai_call(operation="chat.completions.create", model="m", fn=fn, policy=policy)
+    assert get_metrics().snapshot()["counters"]["openai_timeouts_total"] == 1
+
+    release.set()
+    finished.wait(timeout=2.0)
+    time.sleep(0.05)
+    assert get_metrics().snapshot()["counters"]["openai_wasted_tokens_total"] == 7
+
+
+def test_hedged_request_wins_when_primary_is_slow() -> None:
+    reset_latency_windows()
+    policy = CallPolicy(name="hedge-test", deadline_s=2.0, hedge=True, hedge_min_delay_ms=10)
+    # Warm up the p95 window with fast calls.
+    for _ in range(25):
+        instrument_openai_call(operation="embeddings.create", model="m", fn=lambda: _Resp("fast"), policy=policy)
+
+    calls = {"n": 0}
+
+    def fn() -> _Resp:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            time.sleep(0.3)
+            return _Resp("primary", tokens=5)
+        return _Resp("hedge")
+
+    resp = instrument_openai_call(operation="embeddings.create", model="m", fn=fn, policy=policy)
+    assert resp.value == "hedge"
+
+    time.sleep(0.4)  # let the abandoned primary finish so its tokens are accounted
+    counters = get_metrics().snapshot()["counters"]
+    assert counters["openai_hedges_total"] == 1
+    assert counters["openai_hedge_wins_total"] == 1
+    assert counters["openai_wasted_tokens_total"] == 5
+
+
+def test_sdk_call_gets_remaining_deadline_and_hedges_are_capped(monkeypatch) -> None:
+    from app.observability import openai as observed
+
+    timeouts: list[float | None] = []
+
+    def fn() -> _Resp:
+        timeouts.append(call_timeout())
+        return _Resp("ok")
+
+    instrument_openai_call(operation="embeddings.create", model="m", fn=fn, policy=CallPolicy(name="t", deadline_s=2.0))
+    assert timeouts[0] is not None and 0 < timeouts[0] <= 2.0
+    assert call_timeout() is None
+
+    reset_latency_windows()
+    policy = CallPolicy(name="hedge-cap", deadline_s=2.0, hedge=True, hedge_min_delay_ms=10)
+    for _ in range(25):
+        instrument_openai_call(operation="embeddings.create", model="m", fn=lambda: _Resp("fast"), policy=policy)
+    monkeypatch.setattr(observed, "_hedges_in_flight", observed._MAX_HEDGES_IN_FLIGHT)
+
+    def slow() -> _Resp:
+        time.sleep(0.1)
+        return _Resp("primary")
+
+    assert instrument_openai_call(operation="embeddings.create", model="m", fn=slow, policy=policy).value == "primary"
+    assert get_metrics().snapshot()["counters"].get("openai_hedges_total", 0) == 0
+
+
+def test_hedging_is_never_enabled_for_generation(monkeypatch) -> None:
+    from app.config import get_settings
+
+    monkeypatch.setenv("ENABLE_HEDGED_REQUESTS", "true")
+    monkeypatch.setenv("OPENAI_CALL_POLICIES", '{"answer": {"hedge": true, "max_retries": 0}}')
+    get_settings.cache_clear()
+
+    assert get_call_policy("embedding").hedge is True
+    answer = get_call_policy("answer")
+    assert answer.hedge is False
+    assert answer.max_retries == 0
+
+
+def test_indexing_batches_do_not_inflate_the_chat_embedding_estimate(monkeypatch) -> None:
+    from app.config import get_settings
+    from app.observability import openai as observed
+    from app.rag.deadline import stage_cost_ms
+    from app.rag.embedding import get_embeddings
+
+    monkeypatch.setenv("OPENAI_CALL_POLICIES", '{"embedding": {"max_retries": 0}}')
+    get_settings.cache_clear()
+    reset_latency_windows()
+    for _ in range(25):
+        observed._latency_window("embedding").observe(4000.0)  # 100-text indexing batches
+    get_embeddings(["what is rag"], policy="query_embedding")
+
+    # The chat estimate ignores indexing latency: too few query samples yet, so the configured budget.
+    assert observed_p95_ms("embedding") == 4000.0
+    assert stage_cost_ms("query_embedding") == get_settings().embedding_budget_ms
+    # Query embeddings keep the operator's "embedding" overrides.
+    assert get_call_policy("query_embedding").max_retries == 0
+
+
+def test_cancel_scope_stops_waiting_on_in_flight_call() -> None:
+    from app.rag.cancellation import CancelScope, RequestCancelled, bind_cancel_scope
+
+    release = threading.Event()
+
+    def fn() -> _Resp:
+        release.wait(timeout=2.0)
+        return _Resp("unread")
+
+    scope = CancelScope()
+    threading.Timer(0.05, scope.cancel, args=("client_disconnected",)).start()
+    start = time.perf_counter()
+    try:
+        with bind_cancel_scope(scope), pytest.raises(RequestCancelled):
+            instrument_openai_call(operation="chat.completions.create", model="m", fn=fn, policy=CallPolicy(name="answer"))
+        assert time.perf_counter() - start < 1.0
+    finally:
+        release.set()
+
+
+async def test_disconnect_runs_cancel_callbacks_off_the_event_loop() -> None:
+    from app.api.chat import _cancel_on_disconnect
+    from app.rag.cancellation import CancelScope
+
+    class _GoneRequest:
+        async def is_disconnected(self) -> bool:
+            return True
+
+    callback_threads: list[int] = []
+    scope = CancelScope()
+    with scope.on_cancel(lambda: callback_threads.append(threading.get_ident())):
+        await _cancel_on_disconnect(_GoneRequest(), scope)
+
+    assert scope.reason == "client_disconnected"
+    assert callback_threads and callback_threads[0] != threading.get_ident()
+
+
+def test_cancelled_scope_short_circuits_rerank() -> None:
+    from app.models.schemas import RetrievedChunk
+    from app.rag.cancellation import CancelScope, RequestCancelled, bind_cancel_scope
+    from app.rag.rerank import rerank
+
+    chunk = RetrievedChunk(
+        id="a", text="A", doc_id="d", document_name="doc.txt", chunk_index=0, start_char=0, end_char=1, score=0.5
+    )
+    scope = CancelScope()
+    scope.cancel()
+    with bind_cancel_scope(scope), pytest.raises(RequestCancelled):
+        rerank(query="q", chunks=[chunk], top_n=1)
@@ -0,0 +1,131 @@
+import io
+import uuid
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.config import get_settings
+from app.db.models import User
+from app.db.session import get_db
+from app.models.schemas import Chunk
+from app.services import pdf_service
+from app.services.auth_service import hash_password
+from app.services.document_service import _PageMap
+
+
+def _make_pdf(page_texts: list[str]) -> bytes:
+    writer = PdfWriter()
+    font = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }
+    )
+    for text in page_texts:
+        page = writer.add_blank_page(width=612, height=792)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def test_iter_pdf_pages_keeps_page_numbers_and_skips_blank_pages() -> None:
+    pages = list(pdf_service.iter_pdf_pages(_make_pdf(["First page", "", "Third page"])))
+    assert [(p.number, p.text) for p in pages] == [(1, "First page"), (3, "Third page")]
+
+
+def test_parallel_extraction_matches_serial(tmp_path, monkeypatch) -> None:
+    texts = [f"Page {i} body" if i % 5 else "" for i in range(1, 24)]
+    path = tmp_path / "many.pdf"
+    path.write_bytes(_make_pdf(texts))
+    serial = list(pdf_service.iter_pdf_pages(path.read_bytes()))
+
+    monkeypatch.setenv("PDF_PARALLEL_MIN_PAGES", "2")
+    monkeypatch.setenv("PDF_PAGES_PER_TASK", "4")
+    monkeypatch.setenv("PDF_EXTRACT_WORKERS", "2")
+    get_settings.cache_clear()
+    try:
+        parallel = list(pdf_service.iter_pdf_pages(path))
+    finally:
+        pdf_service.shutdown_pool()
+
+    assert parallel == serial
+    assert [p.number for p in parallel] == [i for i in range(1, 24) if i % 5]
+
+
+def test_page_map_maps_chunk_offsets_to_pages() -> None:
+    page_map = _PageMap()
+    pages = [pdf_service.PdfPage(1, "aaaa"), pdf_service.PdfPage(4, "bb\r\nbb")]
+    # Joined + normalized: "aaaa\n\nbb\nbb" -> page 4 starts at offset 6.
+    assert "".join(page_map.segments(pages)) == "aaaa\n\nbb\r\nbb"
+    chunks = [
+        Chunk(text="aaaa", chunk_index=0, start_char=0, end_char=4),
+        Chunk(text="a\n\nbb", chunk_index=1, start_char=3, end_char=8),
+        Chunk(text="bb", chunk_index=2, start_char=9, end_char=11),
+    ]
+    assert [(c.page_start, c.page_end) for c in map(page_map.attach, chunks)] == [(1, 1), (1, 4), (4, 4)]
+
+
+def test_index_document_stores_pdf_page_numbers() -> None:
+    from sqlalchemy import select
+
+    from app.db.models import Chunk as ChunkRow
+    from app.services.document_service import create_document_record, index_document
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="pdfpages@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        meta = create_document_record(db=db, user=user, filename="p.pdf", content=_make_pdf(["Alpha page", "Beta page"]))
+        indexed = index_document(db=db, user=user, doc_id=meta.id)
+        assert indexed.status == "indexed"
+        rows = db.execute(select(ChunkRow).order_by(ChunkRow.chunk_index)).scalars().all()
+        assert rows[0].page_start == 1
+        assert rows[-1].page_end == 2
+    finally:
+        db.close()
+
+
+def test_reindex_reads_cached_extraction_until_extractor_changes(monkeypatch) -> None:
+    from sqlalchemy import select
+
+    from app.db.models import Chunk as ChunkRow
+    from app.services import text_cache
+    from app.services.document_service import create_document_record, index_document
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="pdfcache@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        meta = create_document_record(db=db, user=user, filename="c.pdf", content=_make_pdf(["Cached alpha", "Cached beta"]))
+        first = index_document(db=db, user=user, doc_id=meta.id)
+        assert text_cache.cache_path(meta.content_sha256).is_file()
+
+        def _pages(doc):
+            rows = db.execute(
+                select(ChunkRow).where(ChunkRow.index_version == doc.active_version).order_by(ChunkRow.chunk_index)
+            ).scalars()
+            return [(r.text, r.page_start, r.page_end) for r in rows]
+
+        expected = _pages(first)
+        # With the parser unavailable, a reindex can only succeed from the cache.
+        monkeypatch.setattr(pdf_service, "PdfReader", None)
+        second = index_document(db=db, user=user, doc_id=meta.id)
+        assert second.status == "indexed"
+        assert _pages(second) == expected
+
+        # A new extractor version misses the cache and parses again.
+        monkeypatch.undo()
+        monkeypatch.setattr(text_cache, "EXTRACTOR_VERSION", "pypdf-test.2")
+        fourth = index_document(db=db, user=user, doc_id=meta.id)
+        assert fourth.status == "indexed" and _pages(fourth) == expected
+        assert text_cache.cache_path(meta.content_sha256).name.endswith(".pypdf-test.2.jsonl.gz")
+        assert text_cache.cache_path(meta.content_sha256).is_file()
+    finally:
+        db.close()
@@ -24,6 +24,7 @@ def test_similarity_ranking_prefers_relevant_chunk() -> None:
             filename="sample.md",
             stored_filename="x",
             status="indexed",
+            active_version=1,
             chunk_count=2,
             uploaded_at=datetime.now(timezone.utc),
             indexed_at=datetime.now(timezone.utc),
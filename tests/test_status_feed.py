@@ -0,0 +1,88 @@
+import asyncio
+import json
+import uuid
+
+from app.api.documents import document_events
+from app.db.models import Document, User
+from app.db.session import get_db
+from app.services.auth_service import hash_password
+from app.services.document_service import (
+    create_document_record,
+    delete_document_everywhere,
+    index_document,
+    publish_document_status,
+)
+from app.services.status_feed import broadcaster
+
+
+def _drain(queue: asyncio.Queue) -> list[dict]:
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+async def test_index_transitions_are_pushed_with_progress() -> None:
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="feed@example.com", password_hash=hash_password("password123"))
+        other = User(id=uuid.uuid4(), email="feed-other@example.com", password_hash=hash_password("password123"))
+        db.add_all([user, other])
+        db.commit()
+        queue = broadcaster.subscribe(user.id)
+        other_queue = broadcaster.subscribe(other.id)
+
+        doc = create_document_record(db=db, user=user, filename="a.txt", content=b"Progress events. " * 400)
+        index_document(db=db, user=user, doc_id=doc.id)
+        await asyncio.sleep(0)  # deliveries are scheduled on this loop
+        events = _drain(queue)
+
+        statuses = [e["document"]["status"] for e in events]
+        assert statuses[0] == "queued" and statuses[-1] == "indexed"
+        assert "indexing" in statuses
+        progress = [e["progress_pct"] for e in events if e["document"]["status"] == "indexing"]
+        assert progress == sorted(progress) and all(0 <= p < 100 for p in progress)
+        assert events[-1]["progress_pct"] == 100.0
+        assert _drain(other_queue) == []
+
+        # Nothing is sent for a transaction that rolls back.
+        row = db.get(Document, uuid.UUID(doc.id))
+        row.status = "failed"
+        publish_document_status(db, row)
+        db.rollback()
+        await asyncio.sleep(0)
+        assert _drain(queue) == []
+
+        delete_document_everywhere(db=db, user=user, doc_id=doc.id)
+        await asyncio.sleep(0)
+        assert _drain(queue) == [{"type": "deleted", "id": doc.id}]
+        broadcaster.unsubscribe(user.id, queue)
+        broadcaster.unsubscribe(other.id, other_queue)
+    finally:
+        db.close()
+
+
+async def test_document_events_stream_starts_with_snapshot() -> None:
+    db = next(get_db())
+    writer = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="sse@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        existing = create_document_record(db=db, user=user, filename="old.txt", content=b"Already here.")
+
+        response = await document_events(db=db, user=user)
+        assert response.media_type == "text/event-stream"
+        stream = response.body_iterator
+        snapshot = await stream.__anext__()
+        assert snapshot.startswith("event: snapshot\n")
+        assert [d["id"] for d in json.loads(snapshot.split("data: ", 1)[1])["documents"]] == [existing.id]
+
+        added = create_document_record(db=writer, user=writer.get(User, user.id), filename="new.txt", content=b"Pushed.")
+        pushed = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        assert pushed.startswith("event: document\n")
+        assert json.loads(pushed.split("data: ", 1)[1])["document"]["id"] == added.id
+        await stream.aclose()
+    finally:
+        writer.close()
+        db.close()
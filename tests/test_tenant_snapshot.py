@@ -0,0 +1,83 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models import Chunk, ChunkEmbedding, User
+from app.db.session import get_db
+from app.rag.retrieval import retrieve
+from app.services import document_service
+from app.services.auth_service import hash_password
+from app.services.document_service import create_document_record, index_document
+from app.services.tenant_snapshot import export_snapshot, import_snapshot, verify_snapshot
+
+
+def _chunks_and_vectors(db, doc_id: str) -> list[tuple[str, int, int, list[float]]]:
+    rows = db.execute(
+        select(Chunk.text, Chunk.start_char, Chunk.end_char, ChunkEmbedding.embedding)
+        .join(ChunkEmbedding, ChunkEmbedding.chunk_id == Chunk.id)
+        .where(Chunk.document_id == uuid.UUID(doc_id))
+        .order_by(Chunk.chunk_index)
+    ).all()
+    return [(r.text, r.start_char, r.end_char, [round(v, 5) for v in r.embedding]) for r in rows]
+
+
+def test_snapshot_round_trip_restores_without_embedding(monkeypatch, tmp_path) -> None:
+    db = next(get_db())
+    try:
+        source = User(id=uuid.uuid4(), email="snap-src@example.com", password_hash=hash_password("password123"))
+        target = User(id=uuid.uuid4(), email="snap-dst@example.com", password_hash=hash_password("password123"))
+        db.add_all([source, target])
+        db.commit()
+        docs = [
+            create_document_record(db=db, user=source, filename="guide.md", content=b"Snapshot restore guide. " * 80),
+            create_document_record(db=db, user=source, filename="notes.txt", content=b"Short note."),
+        ]
+        docs = [index_document(db=db, user=source, doc_id=d.id) for d in docs]
+
+        manifest = export_snapshot(db, source, tmp_path / "snap")
+        assert manifest["documents"] == 2
+        assert manifest["chunks"] == sum(d.chunk_count for d in docs)
+        assert manifest["space"]["dims"] == 8
+
+        def no_embeddings(texts, **kwargs):
+            raise AssertionError("a restore must not call the embeddings API")
+
+        monkeypatch.setattr(document_service, "get_embeddings", no_embeddings)
+        restored = import_snapshot(db, target, tmp_path / "snap")
+
+        assert [d.filename for d in restored.documents] == ["guide.md", "notes.txt"]
+        for original, copy in zip(docs, restored.documents):
+            assert copy.status == "indexed" and copy.chunk_count == original.chunk_count
+            # Original uploads travel with the snapshot, so the blob is shared, not reassembled.
+            assert copy.content_sha256 == original.content_sha256
+            assert _chunks_and_vectors(db, copy.id) == _chunks_and_vectors(db, original.id)
+        assert {r.doc_id for r in retrieve(db, target, "restore guide")} <= {d.id for d in restored.documents}
+    finally:
+        db.close()
+
+
+def test_snapshot_import_rejects_corrupted_files(tmp_path) -> None:
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="snap-bad@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        doc = create_document_record(db=db, user=user, filename="a.txt", content=b"Checksummed content.")
+        index_document(db=db, user=user, doc_id=doc.id)
+        export_snapshot(db, user, tmp_path / "snap", include_files=False)
+        verify_snapshot(tmp_path / "snap")
+        # Without the original files, the text is reassembled from the chunks.
+        restored = import_snapshot(db, user, tmp_path / "snap").documents[0]
+        assert (restored.filename, restored.chunk_count) == ("a.txt", 1)
+
+        vectors = tmp_path / "snap" / "vectors.f32"
+        data = bytearray(vectors.read_bytes())
+        data[0] ^= 0xFF
+        vectors.write_bytes(bytes(data))
+        with pytest.raises(ValueError, match="Checksum mismatch: vectors.f32"):
+            import_snapshot(db, user, tmp_path / "snap")
+        with pytest.raises(ValueError, match="Not a snapshot"):
+            import_snapshot(db, user, tmp_path)
+    finally:
+        db.close()
@@ -0,0 +1,113 @@
+import io
+import json
+import uuid
+from array import array
+
+import pytest
+
+from app.db.models import User
+from app.db.session import get_db
+from app.rag.retrieval import retrieve
+from app.services import blob_store, document_service
+from app.services.auth_service import hash_password
+from app.services.document_service import list_documents
+from app.services.embedding_backfill import active_space
+from app.services.vector_import import import_vectors, iter_binary_records, iter_jsonl_records
+from tests.conftest import _text_to_vector
+
+
+def _lines(document: str, texts: list[str], overlap: int = 0, with_embedding: bool = True) -> list[str]:
+    lines, start = [], 0
+    for text in texts:
+        record = {"document": document, "text": text, "start_char": start, "end_char": start + len(text)}
+        if with_embedding:
+            record["embedding"] = _text_to_vector(text)
+        lines.append(json.dumps(record))
+        start += len(text) - overlap
+    return lines
+
+
+def _no_embeddings(texts, **kwargs):
+    raise AssertionError("imported chunks must not be embedded")
+
+
+def test_import_writes_chunks_and_vectors_without_embedding_calls(monkeypatch) -> None:
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="byov@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        monkeypatch.setattr(document_service, "get_embeddings", _no_embeddings)
+        space = active_space(user)
+
+        jsonl = _lines("guide.pdf", ["Vectors computed offline. ", "offline. Retrieval works."], overlap=9)
+        jsonl += _lines("notes.md", ["Second document."])
+        result = import_vectors(db, user, iter_jsonl_records(jsonl), space)
+        assert result.dims == 8 and result.chunk_count == 3
+        assert [d.filename for d in result.documents] == ["guide.pdf.txt", "notes.md"]
+        assert all(d.status == "indexed" and d.active_version == 1 for d in result.documents)
+
+        # The stored source is reassembled from the offsets, overlap written once.
+        guide = result.documents[0]
+        assert blob_store.blob_path(guide.content_sha256).read_text() == "Vectors computed offline. Retrieval works."
+
+        binary = _lines("binary.txt", ["Binary payload chunk."], with_embedding=False)
+        payload = array("f", _text_to_vector("Binary payload chunk.")).tobytes()
+        imported = import_vectors(db, user, iter_binary_records(binary, io.BytesIO(payload), 8), space)
+        assert imported.documents[0].chunk_count == 1
+
+        assert {r.doc_id for r in retrieve(db, user, "offline retrieval")} >= {guide.id}
+        assert len(list_documents(db, user)) == 3
+
+        wrong_dims = [json.dumps({"document": "bad.txt", "text": "abc", "start_char": 0, "end_char": 3, "embedding": [0.1] * 4})]
+        with pytest.raises(ValueError, match="4 dimensions, expected 8"):
+            import_vectors(db, user, iter_jsonl_records(wrong_dims), space)
+        with pytest.raises(ValueError, match="ended early"):
+            list(iter_binary_records(binary, io.BytesIO(payload[:-4]), 8))
+        # A rejected document leaves no rows behind.
+        assert len(list_documents(db, user)) == 3
+    finally:
+        db.close()
+
+
+def test_import_into_an_empty_space_must_match_its_model(monkeypatch) -> None:
+    from app.rag.embedding import EmbeddingSpace
+    from app.services.vector_import import expected_dims
+
+    db = next(get_db())
+    try:
+        user = User(id=uuid.uuid4(), email="byov-fresh@example.com", password_hash=hash_password("password123"))
+        db.add(user)
+        db.commit()
+        # No configured dims and nothing stored yet: the model's own output size decides.
+        fresh = EmbeddingSpace(name="fresh", model="text-embedding-3-small")
+        assert expected_dims(db, fresh) == 8
+
+        short = [json.dumps({"document": "a.txt", "text": "abc", "start_char": 0, "end_char": 3, "embedding": [0.1] * 4})]
+        with pytest.raises(ValueError, match="4 dimensions, expected 8"):
+            import_vectors(db, user, iter_jsonl_records(short), fresh)
+        assert list_documents(db, user) == []
+    finally:
+        db.close()
+
+
+async def test_import_vectors_endpoint(api_client) -> None:
+    resp = await api_client.post("/auth/register", data={"email": "byov-api@example.com", "password": "password123"})
+    assert resp.status_code == 200
+
+    chunks = "\n".join(_lines("handbook.txt", ["Imported over HTTP. ", "Still imported."], with_embedding=False))
+    vectors = b"".join(array("f", _text_to_vector(t)).tobytes() for t in ["Imported over HTTP. ", "Still imported."])
+
+    def files(payload: bytes) -> dict:
+        return {
+            "chunks": ("chunks.jsonl", io.BytesIO(chunks.encode()), "application/jsonl"),
+            "vectors": ("vectors.f32", io.BytesIO(payload), "application/octet-stream"),
+        }
+
+    response = await api_client.post("/api/import/vectors", files=files(vectors), data={"dims": "8"})
+    assert response.status_code == 200
+    assert response.json()["chunk_count"] == 2
+
+    response = await api_client.post("/api/import/vectors", files=files(vectors[:-4]), data={"dims": "8"})
+    assert response.status_code == 400
+    assert "ended early" in response.json()["detail"]
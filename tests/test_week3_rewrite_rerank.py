@@ -35,3 +35,187 @@ def test_rerank_returns_ranked_ids_in_order() -> None:
     result = rerank(query="Which chunk is best?", chunks=chunks, top_n=1)
     assert len(result.ranked_ids) == 1
     assert result.ranked_ids[0] in {"a", "b"}
+
+
+def _seed_user_with_chunks(texts: list[str]):
+    import uuid
+    from datetime import datetime, timezone
+
+    from app.db.models import Chunk as ChunkRow
+    from app.db.models import ChunkEmbedding, Document, User
+    from app.db.session import get_db
+    from app.rag.embedding import get_embeddings
+
+    db = next(get_db())
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4()}@example.com", password_hash="x")
+    db.add(user)
+    doc = Document(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        filename="doc.md",
+        stored_filename="x",
+        status="indexed",
+        active_version=1,
+        chunk_count=len(texts),
+        uploaded_at=datetime.now(timezone.utc),
+    )
+    db.add(doc)
+    db.flush()
+    for idx, (text, emb) in enumerate(zip(texts, get_embeddings(texts))):
+        chunk = ChunkRow(id=uuid.uuid4(), document_id=doc.id, chunk_index=idx, start_char=0, end_char=len(text), text=text)
+        db.add(chunk)
+        db.flush()
+        db.add(ChunkEmbedding(chunk_id=chunk.id, embedding=emb))
+    db.commit()
+    return db, user
+
+
+def test_tight_deadline_skips_rewrite_and_rerank() -> None:
+    from app.rag.deadline import Deadline
+    from app.rag.retrieval import retrieve_with_debug
+
+    db, user = _seed_user_with_chunks(["FastAPI builds APIs.", "Bananas are yellow."])
+    try:
+        # Enough for nothing but vector search: both LLM stages must be skipped.
+        result = retrieve_with_debug(db=db, user=user, user_query="What builds APIs?", deadline=Deadline(100))
+        assert result.debug.skipped_stages == ["rewrite", "rerank"]
+        assert result.debug.rewritten_query == "What builds APIs?"
+        assert [c.id for c in result.final_chunks] == [c.id for c in result.debug.initial_chunks]
+
+        relaxed = retrieve_with_debug(db=db, user=user, user_query="What builds APIs?", deadline=Deadline(60_000))
+        assert relaxed.debug.skipped_stages == []
+        assert relaxed.debug.rewritten_query.startswith("retrieval:")
+    finally:
+        db.close()
+
+
+def test_rerank_timeout_is_recorded_as_skipped(monkeypatch) -> None:
+    from app.observability.openai import OpenAICallTimeout
+    from app.rag import rerank as rerank_module
+    from app.rag.deadline import Deadline
+    from app.rag.retrieval import retrieve_with_debug
+
+    def _timeout(**kwargs):
+        raise OpenAICallTimeout("chat.completions.create (rerank) exceeded deadline")
+
+    db, user = _seed_user_with_chunks(["FastAPI builds APIs.", "Bananas are yellow."])
+    monkeypatch.setattr(rerank_module, "instrument_openai_call", _timeout)
+    try:
+        result = retrieve_with_debug(db=db, user=user, user_query="What builds APIs?", deadline=Deadline(60_000))
+        assert result.debug.skipped_stages == ["rerank"]
+        assert [c.id for c in result.final_chunks] == [c.id for c in result.debug.initial_chunks]
+    finally:
+        db.close()
+
+
+def test_local_rerank_prefers_lexical_match_without_llm(monkeypatch) -> None:
+    from app.rag import rerank as rerank_module
+
+    def _no_llm():
+        raise AssertionError("local rerank must not call the LLM")
+
+    monkeypatch.setattr(rerank_module, "get_rerank_client", _no_llm)
+    chunks = [
+        RetrievedChunk(
+            id="fruit",
+            text="Bananas are yellow fruits.",
+            doc_id="d1",
+            document_name="fruits.txt",
+            chunk_index=0,
+            start_char=0,
+            end_char=26,
+            score=0.9,
+        ),
+        RetrievedChunk(
+            id="api",
+            text="FastAPI is a Python framework for building APIs.",
+            doc_id="d2",
+            document_name="frameworks.txt",
+            chunk_index=0,
+            start_char=0,
+            end_char=49,
+            score=0.8,
+        ),
+    ]
+    result = rerank(query="Which Python framework builds APIs?", chunks=chunks, top_n=2, mode="local")
+    assert result.ranked_ids == ["api", "fruit"]
+    assert result.used_fallback is False
+
+
+def test_unknown_rerank_mode_raises() -> None:
+    import pytest
+
+    chunk = RetrievedChunk(
+        id="a", text="A", doc_id="d", document_name="doc.txt", chunk_index=0, start_char=0, end_char=1, score=0.5
+    )
+    with pytest.raises(ValueError):
+        rerank(query="q", chunks=[chunk], top_n=1, mode="nope")
+
+
+def test_rerank_settings_reject_unknown_values(monkeypatch) -> None:
+    import pytest
+    from pydantic import ValidationError
+
+    from app.config import Settings
+
+    monkeypatch.setenv("RERANK_MODE", "lcoal")
+    with pytest.raises(ValidationError):
+        Settings()
+
+    monkeypatch.setenv("RERANK_MODE", "local")
+    monkeypatch.setenv("RERANK_SHARD_MERGE", "round-robin")
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_sharded_rerank_runs_shards_concurrently_and_merges(monkeypatch) -> None:
+    import json
+    import threading
+    import time
+
+    from app.config import get_settings
+    from app.rag.rerank import set_rerank_client
+
+    monkeypatch.setenv("RERANK_SHARD_SIZE", "10")
+    monkeypatch.setenv("RERANK_MAX_CONCURRENCY", "4")
+    get_settings.cache_clear()
+
+    class _SlowRerankApi:
+        def __init__(self) -> None:
+            self.prompt_sizes: list[int] = []
+            self._lock = threading.Lock()
+
+        def create(self, model, messages, temperature, **kwargs):
+            from tests.conftest import _ChatResponse
+
+            payload = json.loads(messages[-1]["content"])
+            with self._lock:
+                self.prompt_sizes.append(len(payload["candidates"]))
+            time.sleep(0.2)
+            # Prefer higher chunk_index, so the best candidates are spread over every shard.
+            ranked = sorted(payload["candidates"], key=lambda c: -c["chunk_index"])
+            return _ChatResponse(json.dumps({"ranked_ids": [c["id"] for c in ranked[: payload["top_n"]]]}))
+
+    api = _SlowRerankApi()
+
+    class _Client:
+        class chat:
+            completions = api
+
+    set_rerank_client(_Client())
+    chunks = [
+        RetrievedChunk(
+            id=f"c{i}", text=f"Chunk {i}", doc_id="d", document_name="doc.txt", chunk_index=i, start_char=0, end_char=1, score=1.0 - i / 100
+        )
+        for i in range(30)
+    ]
+
+    start = time.perf_counter()
+    result = rerank(query="q", chunks=chunks, top_n=3)
+    elapsed = time.perf_counter() - start
+
+    # Three shards of 10 run in parallel, then one tournament round over the 9 winners.
+    assert sorted(api.prompt_sizes) == [9, 10, 10, 10]
+    assert elapsed < 0.2 * 3
+    assert result.ranked_ids == ["c29", "c28", "c27"]
+    assert result.used_fallback is False